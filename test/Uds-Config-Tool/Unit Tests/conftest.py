@@ -0,0 +1,146 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from uds.config import Config
+from uds.uds_communications.TransportProtocols.Can.AsyncCanTp import AsyncCanTp
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.Uds.AsyncUds import AsyncUds
+from uds.uds_communications.Uds.Uds import Uds
+
+ODX_FILE = Path(__file__).parent.joinpath("Bootloader.odx")
+
+TP_CONFIG = {
+    "addressing_type": "NORMAL",
+    "n_sa": 0xFF,
+    "n_ta": 0xFF,
+    "n_ae": 0xFF,
+    "m_type": "DIAGNOSTICS",
+    "discard_neg_resp": False,
+    "req_id": 0x7E0,
+    "res_id": 0x7E8,
+}
+
+UDS_CONFIG = {"transport_protocol": "CAN", "p2_can_client": 5, "p2_can_server": 1}
+
+
+class FakeEcu:
+    """ECU answering the requests sent through CanTp and AsyncCanTp, whose
+    send, recv and recv_functional methods it replaces.
+
+    The responses to a request are taken in order from
+    responses[tuple(request)], or returned by respond(tp, request) if set,
+    recv raising a TimeoutError when no response is left. The responses to
+    the functional requests are taken in order from functional_rounds.
+    """
+
+    def __init__(self):
+        #: requests sent, and whether they were functional ones
+        self.sent = []
+        self.functional = []
+        #: timeouts given to recv, and responders given to recv_functional
+        self.timeouts = []
+        self.waited_for = []
+        self.responses = {}
+        self.respond = None
+        self.functional_rounds = []
+        #: awaited by AsyncCanTp.recv before answering
+        self.latency = 0
+
+    def send(self, tp, payload, functional_req, tp_wait_time):
+        tp.last_request = list(payload)
+        self.sent.append(tp.last_request)
+        self.functional.append(functional_req)
+        tp.frames_sent += 1 if len(payload) <= 7 else 2
+
+    def recv(self, tp, timeout_s):
+        self.timeouts.append(timeout_s)
+        if self.respond is not None:
+            response = self.respond(tp, tp.last_request)
+        else:
+            responses = self.responses.get(tuple(tp.last_request))
+            if not responses:
+                raise TimeoutError("Timed out while waiting for message in state IDLE")
+            response = responses.pop(0)
+        tp.frames_received += 1
+        return response
+
+    def recv_functional(self, tp, timeout_s, responders=None):
+        self.waited_for.append(responders)
+        return self.functional_rounds.pop(0) if self.functional_rounds else {}
+
+
+@pytest.fixture
+def patch_ecu(monkeypatch):
+    """Return a function handing the requests sent through CanTp and
+    AsyncCanTp over to the given FakeEcu.
+    """
+
+    def patch(ecu: FakeEcu) -> FakeEcu:
+        async def async_send(tp, *args):
+            ecu.send(tp, *args)
+            # let the other tasks run, a concurrent request must not sneak in before the response
+            await asyncio.sleep(0)
+
+        async def async_recv(tp, timeout_s):
+            await asyncio.sleep(ecu.latency)
+            return ecu.recv(tp, timeout_s)
+
+        async def async_recv_functional(tp, *args):
+            await asyncio.sleep(0)
+            return ecu.recv_functional(tp, *args)
+
+        monkeypatch.setattr(CanTp, "send", lambda tp, *args: ecu.send(tp, *args))
+        monkeypatch.setattr(CanTp, "recv", lambda tp, timeout_s: ecu.recv(tp, timeout_s))
+        monkeypatch.setattr(CanTp, "recv_functional", lambda tp, *args: ecu.recv_functional(tp, *args))
+        monkeypatch.setattr(AsyncCanTp, "send", async_send)
+        monkeypatch.setattr(AsyncCanTp, "recv", async_recv)
+        monkeypatch.setattr(AsyncCanTp, "recv_functional", async_recv_functional)
+        return ecu
+
+    return patch
+
+
+@pytest.fixture
+def ecu(patch_ecu):
+    return patch_ecu(FakeEcu())
+
+
+@pytest.fixture
+def tp_config():
+    """ISO-TP configuration of the module's tests, on top of TP_CONFIG."""
+    return {}
+
+
+@pytest.fixture
+def uds_config():
+    """UDS configuration of the module's tests, on top of UDS_CONFIG."""
+    return {}
+
+
+@pytest.fixture
+def load_config(tp_config, uds_config):
+    """Return a function loading TP_CONFIG and UDS_CONFIG, updated with
+    the tp_config and uds_config fixtures and then with its arguments.
+    """
+
+    def load(tp_overrides=None, **uds_overrides):
+        Config.load_com_layer_config(
+            {**TP_CONFIG, **tp_config, **(tp_overrides or {})},
+            {**UDS_CONFIG, **uds_config, **uds_overrides},
+        )
+
+    return load
+
+
+@pytest.fixture
+def uds(load_config, ecu):
+    load_config()
+    return Uds(ODX_FILE)
+
+
+@pytest.fixture
+def async_uds(load_config, ecu):
+    load_config()
+    return AsyncUds(ODX_FILE)
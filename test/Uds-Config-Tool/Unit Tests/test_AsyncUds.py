@@ -0,0 +1,66 @@
+import asyncio
+from types import SimpleNamespace
+
+SERIAL_NUMBER_RESPONSE = [0x62, 0xF1, 0x8C] + list(b"ABC0011223344556")
+
+
+def test_async_send(async_uds, ecu):
+    ecu.responses[(0x22, 0xF1, 0x8C)] = [SERIAL_NUMBER_RESPONSE]
+
+    response = asyncio.run(async_uds.send([0x22, 0xF1, 0x8C]))
+
+    assert response == SERIAL_NUMBER_RESPONSE
+    assert async_uds.last_resp_time is not None
+    assert not async_uds.isTransmitting()
+
+
+def test_async_read_data_by_identifier_response_pending(async_uds, ecu):
+    ecu.responses[(0x22, 0xF1, 0x8C)] = [[0x7F, 0x22, 0x78], SERIAL_NUMBER_RESPONSE]
+
+    actual = asyncio.run(async_uds.readDataByIdentifier("ECU Serial Number"))
+
+    assert actual == {"ECU_Serial_Number": "ABC0011223344556"}
+    assert ecu.sent == [[0x22, 0xF1, 0x8C]]
+    assert len(async_uds.last_pending_resp_times) == 1
+
+
+def test_async_concurrent_services(async_uds, ecu):
+    ecu.responses[(0x22, 0xF1, 0x8C)] = [SERIAL_NUMBER_RESPONSE] * 3
+
+    async def run_all():
+        return await asyncio.gather(*(async_uds.readDataByIdentifier("ECU Serial Number") for _ in range(3)))
+
+    assert asyncio.run(run_all()) == [{"ECU_Serial_Number": "ABC0011223344556"}] * 3
+    assert ecu.sent == [[0x22, 0xF1, 0x8C]] * 3
+
+
+def test_async_negative_response(async_uds, ecu):
+    ecu.responses[(0x22, 0xF1, 0x8C)] = [[0x7F, 0x22, 0x31]]
+
+    actual = asyncio.run(async_uds.readDataByIdentifier("ECU Serial Number"))
+
+    assert actual["NRC"] == 0x31
+
+
+def test_async_transfer_data_blocks(async_uds, ecu):
+    blocks = SimpleNamespace(transmitChunks=lambda: [[0x01, 0x02], [0x03, 0x04], [0x05, 0x06]])
+    for counter, chunk in enumerate(blocks.transmitChunks(), start=1):
+        ecu.responses[(0x36, counter, *chunk)] = [[0x76, counter]]
+
+    asyncio.run(async_uds.transferData(transferBlocks=blocks))
+
+    assert ecu.sent == [
+        [0x36, 0x01, 0x01, 0x02],
+        [0x36, 0x02, 0x03, 0x04],
+        [0x36, 0x03, 0x05, 0x06],
+    ]
+
+
+def test_async_send_functional(async_uds, ecu):
+    ecu.functional_rounds.extend([{0xB1: [[0x7F, 0x10, 0x78]], 0xB3: [[0x50, 0x03]]}, {0xB1: [[0x50, 0x03]]}])
+
+    responses = asyncio.run(async_uds.send_functional([0x10, 0x03]))
+
+    assert responses == {0xB1: [0x50, 0x03], 0xB3: [0x50, 0x03]}
+    assert ecu.sent == [[0x10, 0x03]]
+    assert ecu.waited_for == [None, [0xB1]]
@@ -0,0 +1,165 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from uds.uds_communications.Uds.AsyncUds import AsyncUds
+from uds.uds_communications.Uds.DidCache import DidCache
+from uds.uds_communications.Uds.Uds import Uds
+
+ODX_FILE = Path(__file__).parent.joinpath("Bootloader.odx")
+
+SERIAL_NUMBER = {"ECU_Serial_Number": "ABC0011223344556"}
+SERIAL_NUMBER_RESPONSE = [0x62, 0xF1, 0x8C] + list(b"ABC0011223344556")
+PART_NUMBER = {"PBL_Part_Number": "PN0123456789012345678901"}
+PART_NUMBER_RESPONSE = [0x62, 0xFD, 0x02] + list(b"PN0123456789012345678901")
+BOOT_VERSION_RESPONSE = [0x62, 0xF1, 0x09, 0x01, 0x02, 0x03]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def uds_config():
+    return {"did_cache_size": 16, "did_cache_semantic_policies": {"IDENTIFICATION": None}}
+
+
+def test_policies():
+    cache = DidCache(default_ttl=60.0, policies={0xF190: 0, 0x0100: None}, semantic_policies={"CURRENTDATA": 0})
+
+    # ISO 14229-1 identification DIDs, but the active diagnostic session
+    assert cache.ttl(0xF18C) is None
+    assert cache.ttl(0xF186) == 0
+    assert cache.ttl(0xF190) == 0
+    assert cache.ttl(0x0100, "CURRENTDATA") is None
+    assert cache.ttl(0x0101, "CURRENTDATA") == 0
+    assert cache.ttl(0x0101, "STOREDDATA") == 60.0
+
+
+def test_ttl_and_lru():
+    clock = FakeClock()
+    cache = DidCache(max_entries=2, default_ttl=1.0, clock=clock)
+    cache.put(0x0001, {"a": 1})
+    cache.put(0xF18C, {"b": [2]})
+    cache.put(0xF186, {"session": 1})
+
+    assert cache.get(0x0001) == {"a": 1}
+    assert cache.get(0xF186) is None
+    clock.now = 1.0
+    assert cache.get(0x0001) is None
+    # static, and a copy
+    cache.get(0xF18C)["b"].append(3)
+    assert cache.get(0xF18C) == {"b": [2]}
+
+    cache.put(0x0002, {"c": 3})
+    cache.put(0x0003, {"d": 4})
+    assert cache.get(0xF18C) is None
+    assert len(cache) == 2
+    assert cache.statistics() == {"entries": 2, "hits": 3, "misses": 2, "evictions": 1}
+
+
+def test_observe():
+    cache = DidCache(default_ttl=None)
+    for did in (0x0001, 0x0002):
+        cache.put(did, {})
+
+    cache.observe([0x2E, 0x00, 0x01, 0xAA], [0x7F, 0x2E, 0x31])
+    assert len(cache) == 2
+    cache.observe([0x2E, 0x00, 0x01, 0xAA], [0x6E, 0x00, 0x01])
+    assert cache.get(0x0001) is None and cache.get(0x0002) == {}
+    cache.observe([0x10, 0x03], [0x50, 0x03, 0x00, 0x32, 0x01, 0xF4])
+    assert len(cache) == 0
+
+
+def test_disabled_by_default(load_config):
+    load_config(did_cache_size=0)
+
+    assert Uds().did_cache is None
+
+
+def test_read_data_by_identifier_cached(uds, ecu):
+    ecu.responses[(0x22, 0xF1, 0x8C)] = [SERIAL_NUMBER_RESPONSE]
+    ecu.responses[(0x22, 0xF1, 0x09)] = [BOOT_VERSION_RESPONSE] * 2
+
+    for _ in range(3):
+        assert uds.readDataByIdentifier("ECU Serial Number") == SERIAL_NUMBER
+    # volatile
+    uds.readDataByIdentifier("Boot Software Version Number")
+    uds.readDataByIdentifier("Boot Software Version Number")
+
+    assert ecu.sent == [[0x22, 0xF1, 0x8C], [0x22, 0xF1, 0x09], [0x22, 0xF1, 0x09]]
+    assert (uds.did_cache.hits, uds.did_cache.misses) == (2, 1)
+
+
+def test_read_multiple_dids_partly_cached(uds, ecu):
+    ecu.responses[(0x22, 0xFD, 0x02)] = [PART_NUMBER_RESPONSE]
+    ecu.responses[(0x22, 0xF1, 0x8C, 0xF1, 0x09)] = [SERIAL_NUMBER_RESPONSE + BOOT_VERSION_RESPONSE[1:]]
+
+    uds.readDataByIdentifier("PBL Part Number")
+    actual = uds.readDataByIdentifier(["ECU Serial Number", "PBL Part Number", "Boot Software Version Number"])
+
+    assert actual == (SERIAL_NUMBER, PART_NUMBER, {"Boot_Software_Version_Number": [0x01, 0x02, 0x03]})
+    assert ecu.sent[-1] == [0x22, 0xF1, 0x8C, 0xF1, 0x09]
+
+
+def test_negative_response_not_cached(uds, ecu):
+    ecu.responses[(0x22, 0xF1, 0x8C)] = [[0x7F, 0x22, 0x31], SERIAL_NUMBER_RESPONSE]
+
+    assert uds.readDataByIdentifier("ECU Serial Number")["NRC"] == 0x31
+    assert uds.readDataByIdentifier("ECU Serial Number") == SERIAL_NUMBER
+
+
+def test_invalidated_by_write_and_session(uds, ecu):
+    ecu.responses[(0x22, 0xF1, 0x8C)] = [SERIAL_NUMBER_RESPONSE]
+    ecu.responses[(0x22, 0xF1, 0x8C, 0xFD, 0x02)] = [SERIAL_NUMBER_RESPONSE + PART_NUMBER_RESPONSE[1:]] * 2
+    ecu.responses[(0x2E, 0xF1, 0x8C) + tuple(b"ABC0011223344556")] = [[0x6E, 0xF1, 0x8C]]
+    ecu.responses[(0x10, 0x02)] = [[0x50, 0x02, 0x00, 0x32, 0x01, 0xF4]]
+
+    uds.readDataByIdentifier(["ECU Serial Number", "PBL Part Number"])
+    uds.writeDataByIdentifier("ECU Serial Number", "ABC0011223344556")
+    uds.readDataByIdentifier(["ECU Serial Number", "PBL Part Number"])
+    uds.send([0x10, 0x02])
+    uds.readDataByIdentifier(["ECU Serial Number", "PBL Part Number"])
+
+    reads = [request for request in ecu.sent if request[0] == 0x22]
+    assert reads == [[0x22, 0xF1, 0x8C, 0xFD, 0x02], [0x22, 0xF1, 0x8C], [0x22, 0xF1, 0x8C, 0xFD, 0x02]]
+
+
+def test_async_read_data_by_identifier_cached(load_config, ecu):
+    ecu.responses[(0x22, 0xF1, 0x8C)] = [SERIAL_NUMBER_RESPONSE]
+    ecu.responses[(0x22, 0xF1, 0x09)] = [BOOT_VERSION_RESPONSE]
+    load_config(did_cache_semantic_policies={})
+    uds = AsyncUds(ODX_FILE)
+
+    async def read():
+        await uds.readDataByIdentifier("ECU Serial Number")
+        return await uds.readDataByIdentifier(["ECU Serial Number", "Boot Software Version Number"])
+
+    assert asyncio.run(read())[0] == SERIAL_NUMBER
+    assert ecu.sent == [[0x22, 0xF1, 0x8C], [0x22, 0xF1, 0x09]]
+    assert uds.did_cache.statistics() == {"entries": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+
+@pytest.mark.parametrize(
+    "send_request",
+    [
+        pytest.param(lambda uds: uds.diagnosticSessionControl("Default Session", suppressResponse=True), id="DSC"),
+        pytest.param(lambda uds: uds.ecuReset("Hard Reset", suppressResponse=True), id="ECUReset"),
+        pytest.param(lambda uds: uds.send_functional([0x10, 0x83], responseRequired=False), id="functional DSC"),
+    ],
+)
+def test_invalidated_by_unanswered_request(uds, ecu, send_request):
+    ecu.responses[(0x22, 0xF1, 0x8C)] = [SERIAL_NUMBER_RESPONSE] * 2
+
+    uds.readDataByIdentifier("ECU Serial Number")
+    send_request(uds)
+    uds.readDataByIdentifier("ECU Serial Number")
+
+    assert [request for request in ecu.sent if request[0] == 0x22] == [[0x22, 0xF1, 0x8C]] * 2
+    # the positive responses were suppressed
+    assert all(request[1] & 0x80 for request in ecu.sent if request[0] != 0x22)
@@ -0,0 +1,104 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from uds.uds_communications.Uds.AsyncUds import AsyncUds
+from uds.uds_config_tool.odx.diag_coded_types import MinMaxLengthType, StandardLengthType
+
+ODX_FILE = Path(__file__).parent.joinpath("Bootloader.odx")
+
+# DID -> data of the simulated ECU
+ECU_DATA = {
+    0xF18C: list(b"ABC0011223344556"),
+    0xFD02: list(b"PBL-PART-0123456789ABCDE"),
+    0xFD03: list(b"PBL-VERSION-0123456789AB"),
+    0xD100: [0x01],
+    0xF109: [0x01, 0x02, 0x03],
+}
+
+
+def ecu_response(request, max_dids):
+    dids = [(request[i] << 8) | request[i + 1] for i in range(1, len(request), 2)]
+    if len(dids) > max_dids:
+        return [0x7F, 0x22, 0x14]
+    if 0xF109 in dids:
+        return [0x7F, 0x22, 0x31]
+    response = [0x62]
+    for did in dids:
+        response += [did >> 8, did & 0xFF] + ECU_DATA[did]
+    return response
+
+
+@pytest.fixture
+def uds_config():
+    return {"rdbi_max_response_length": 60}
+
+
+@pytest.fixture
+def uds(uds, ecu):
+    ecu.respond = lambda tp, request: ecu_response(request, max_dids=2)
+    return uds
+
+
+def test_max_length():
+    assert StandardLengthType("A_UINT32", 4).calculate_max_length() == 4
+    assert MinMaxLengthType("A_ASCIISTRING", 1, 10, "ZERO").calculate_max_length() == 11
+    assert MinMaxLengthType("A_ASCIISTRING", 1, None, "HEX-FF").calculate_max_length() is None
+    assert MinMaxLengthType("A_ASCIISTRING", 1, 10, "END-OF-PDU").calculate_max_length() is None
+
+
+def test_pack(uds):
+    container = uds.readDataByIdentifierContainer
+    dids = ["ECU Serial Number", "PBL Part Number", "PBL Version Number", "Active Diagnostic Session"]
+
+    assert container.pos_response_objects["PBL Part Number"].calculate_max_length() == 26
+    # first fit decreasing: 1 + 26 + 26 + 3 and 1 + 18 bytes responses
+    assert container.pack(dids, 0, 60) == [
+        ["PBL Part Number", "PBL Version Number", "Active Diagnostic Session"],
+        ["ECU Serial Number"],
+    ]
+    assert container.pack(dids, 2, 60) == [
+        ["PBL Part Number", "PBL Version Number"],
+        ["ECU Serial Number", "Active Diagnostic Session"],
+    ]
+    assert container.pack(dids, 0, 0) == [
+        ["PBL Part Number", "PBL Version Number", "ECU Serial Number", "Active Diagnostic Session"]
+    ]
+
+
+def test_batch_split_on_response_too_long(uds, ecu):
+    actual = uds.readDataByIdentifierBatch(
+        ["ECU Serial Number", "PBL Part Number", "PBL Version Number", "Active Diagnostic Session", "PBL Part Number"]
+    )
+
+    assert actual == {
+        "ECU Serial Number": {"ECU_Serial_Number": "ABC0011223344556"},
+        "PBL Part Number": {"PBL_Part_Number": "PBL-PART-0123456789ABCDE"},
+        "PBL Version Number": {"PBL_Version_Number": "PBL-VERSION-0123456789AB"},
+        "Active Diagnostic Session": {"Active_Diagnostic_Session": [0x01]},
+    }
+    assert ecu.sent == [
+        [0x22, 0xFD, 0x02, 0xFD, 0x03, 0xD1, 0x00],
+        [0x22, 0xFD, 0x02],
+        [0x22, 0xFD, 0x03, 0xD1, 0x00],
+        [0x22, 0xF1, 0x8C],
+    ]
+
+
+def test_batch_negative_response(uds):
+    actual = uds.readDataByIdentifierBatch(["Boot Software Version Number", "ECU Serial Number"], max_dids=1)
+
+    assert actual["Boot Software Version Number"]["NRC"] == 0x31
+    assert actual["ECU Serial Number"] == {"ECU_Serial_Number": "ABC0011223344556"}
+
+
+def test_async_batch(load_config, ecu):
+    load_config(rdbi_max_dids=2)
+    ecu.respond = lambda tp, request: ecu_response(request, max_dids=1)
+    uds = AsyncUds(ODX_FILE)
+
+    actual = asyncio.run(uds.readDataByIdentifierBatch(["ECU Serial Number", "Active Diagnostic Session"]))
+
+    assert list(actual) == ["ECU Serial Number", "Active Diagnostic Session"]
+    assert ecu.sent == [[0x22, 0xF1, 0x8C, 0xD1, 0x00], [0x22, 0xF1, 0x8C], [0x22, 0xD1, 0x00]]
@@ -0,0 +1,62 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from uds.uds_communications.TransportProtocols.Can.AsyncCanTp import AsyncCanTp
+from uds.uds_communications.TransportProtocols.Can.KernelCanTp import KernelCanTp
+from uds.uds_communications.TransportProtocols.Can.ProcessCanTp import ProcessCanTp
+from uds.uds_communications.TransportProtocols.DoIP.DoIP import DoIP
+
+
+@pytest.fixture
+def tp_config():
+    return {"func_req_id": 0x7DF, "func_responders": {0x7E8: 0x7E0, 0x7E9: 0x7E1}}
+
+
+def test_send_functional(uds, ecu):
+    ecu.functional_rounds.append({0x7E8: [[0x50, 0x03]], 0x7E9: [[0x50, 0x03]]})
+
+    responses = uds.send_functional([0x10, 0x03])
+
+    assert responses == {0x7E8: [0x50, 0x03], 0x7E9: [0x50, 0x03]}
+    assert (ecu.sent, ecu.functional) == ([[0x10, 0x03]], [True])
+    assert ecu.waited_for == [None]
+    assert not uds.isTransmitting()
+
+
+def test_send_functional_response_pending(uds, ecu):
+    ecu.functional_rounds.append({0x7E8: [[0x50, 0x03]], 0x7E9: [[0x7F, 0x10, 0x78]]})
+    ecu.functional_rounds.append({0x7E9: [[0x50, 0x03]]})
+
+    responses = uds.send_functional([0x10, 0x03])
+
+    assert responses == {0x7E8: [0x50, 0x03], 0x7E9: [0x50, 0x03]}
+    assert ecu.waited_for == [None, [0x7E9]]
+
+
+def test_send_functional_no_response_required(uds, ecu):
+    assert uds.send_functional([0x3E, 0x80], responseRequired=False) == {}
+    assert (ecu.sent, ecu.functional) == ([[0x3E, 0x80]], [True])
+    assert ecu.waited_for == []
+
+
+@pytest.mark.parametrize("transport", [DoIP, KernelCanTp, ProcessCanTp])
+def test_send_functional_not_supported(uds, transport):
+    # functional requests are sent, but the responses of several ECUs are not collected
+    uds.tp = mock.create_autospec(transport, instance=True)
+
+    with pytest.raises(NotImplementedError):
+        uds.send_functional([0x10, 0x03])
+    uds.tp.send.assert_not_called()
+
+    assert uds.send_functional([0x3E, 0x80], responseRequired=False) == {}
+    uds.tp.send.assert_called_once_with([0x3E, 0x80], True, 0.01)
+
+
+def test_async_send_functional_not_supported(async_uds):
+    async_uds.tp = mock.create_autospec(AsyncCanTp, instance=True)
+    del async_uds.tp.recv_functional
+
+    with pytest.raises(NotImplementedError):
+        asyncio.run(async_uds.send_functional([0x10, 0x03]))
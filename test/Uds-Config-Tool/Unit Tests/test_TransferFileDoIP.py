@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+from uds.config import Config, DoIPConfig, UdsConfig
+from uds.uds_communications.TransportProtocols.DoIP.DoIPConnection import DoIPConnection
+from uds.uds_communications.TransportProtocols.DoIP.DoIPServer import DoIPServer
+from uds.uds_communications.Uds.Uds import Uds
+
+ODX_FILE = Path(__file__).parent.joinpath("Bootloader.odx")
+ECU_ADDRESS = 0x1010
+
+
+def write_ihex(path: Path, data: bytes, record_length: int = 32) -> None:
+    """Write the data as an Intel hex file, at 0x00080000."""
+    lines = [":020000040008F2"]
+    for address in range(0, len(data), record_length):
+        chunk = data[address : address + record_length]
+        record = bytes([len(chunk), address >> 8, address & 0xFF, 0x00]) + chunk
+        lines.append(":" + (record + bytes([-sum(record) & 0xFF])).hex().upper())
+    lines.append(":00000001FF")
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def flash_server():
+    blocks = []
+
+    def handler(target_address, request):
+        if request[0] == 0x34:
+            # maxNumberOfBlockLength of 0x4002 bytes
+            return [bytes([0x74, 0x20, 0x40, 0x02])]
+        if request[0] == 0x36:
+            blocks.append(request[2:])
+            return [bytes([0x76, request[1]])]
+        if request[0] == 0x37:
+            return [bytes([0x77])]
+        return [bytes([0x7F, request[0], 0x11])]
+
+    with DoIPServer(handler, nodes=(ECU_ADDRESS,)) as server:
+        host, port = server.address
+        Config.uds = UdsConfig(transport_protocol="DoIP", p2_can_client=1, p2_can_server=1)
+        Config.doip = DoIPConfig(host=host, port=port, target_address=ECU_ADDRESS)
+        yield server, blocks
+        DoIPConnection.close_all()
+
+
+def test_transfer_file_large_blocks(flash_server, tmp_path):
+    server, blocks = flash_server
+    image = bytes(index * 7 & 0xFF for index in range(0x8000))
+    hex_file = tmp_path / "image.hex"
+    write_ihex(hex_file, image)
+    uds = Uds(ODX_FILE)
+
+    uds.transferFile(str(hex_file), 0x4000)
+
+    assert [len(block) for block in blocks] == [0x4000, 0x4000]
+    assert b"".join(blocks) == image
+    assert server.received[0][1] == bytes([0x34, 0x00, 0x44, 0x00, 0x08, 0x00, 0x00, 0x00, 0x00, 0x80, 0x00])
+    uds.tp.close()
+
+    # the next instance reuses the connection
+    uds = Uds(ODX_FILE)
+    uds.transferFile(str(hex_file), 0x4000)
+    assert server.connection_count == 1
+    uds.tp.close()
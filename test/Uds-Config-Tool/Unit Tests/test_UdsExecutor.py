@@ -0,0 +1,126 @@
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+from uds.uds_communications.Uds.AsyncUds import AsyncUds
+from uds.uds_communications.Uds.Uds import Uds
+from uds.uds_communications.Uds.UdsExecutor import EcuJob, UdsExecutor
+
+ODX_FILE = Path(__file__).parent.joinpath("Bootloader.odx")
+
+ECU_COUNT = 5
+
+
+def serial_number_response(req_id):
+    return [0x62, 0xF1, 0x8C] + list(f"SERIAL{req_id:010X}".encode())
+
+
+class Ecus:
+    """Simulated ECUs keeping track of the requests in progress, on top of
+    the FakeEcu answering them.
+    """
+
+    def __init__(self, ecu):
+        self.ecu = ecu
+        self.ecu.respond = self.respond
+        self.latency = 0
+        # every ECU has to be waiting for its response before any of them answers
+        self.barrier = threading.Barrier(ECU_COUNT, timeout=5)
+        self.lock = threading.Lock()
+        self.active = {}
+        self.max_active_per_ecu = 0
+        self.max_active = 0
+
+    def send(self, tp, payload, *args):
+        with self.lock:
+            self.active[tp.reqIdAddress] = self.active.get(tp.reqIdAddress, 0) + 1
+            self.max_active_per_ecu = max(self.max_active_per_ecu, self.active[tp.reqIdAddress])
+            self.max_active = max(self.max_active, sum(self.active.values()))
+        self.ecu.send(tp, payload, *args)
+
+    def recv(self, tp, timeout_s):
+        if self.barrier is not None:
+            self.barrier.wait()
+        with self.lock:
+            self.active[tp.reqIdAddress] -= 1
+        return self.ecu.recv(tp, timeout_s)
+
+    @staticmethod
+    def respond(tp, request):
+        if request[0] == 0x10:
+            return [0x50, request[1], 0x00, 0x32, 0x01, 0xF4]
+        return serial_number_response(tp.reqIdAddress)
+
+    def create(self, load_config, client_class):
+        """Create a client per ECU, indexed by ECU number."""
+        clients = {}
+        for index in range(ECU_COUNT):
+            load_config({"req_id": 0x700 + index, "res_id": 0x708 + index})
+            clients[index] = client_class(ODX_FILE)
+        return clients
+
+
+@pytest.fixture
+def ecus(ecu, patch_ecu, load_config):
+    ecus = patch_ecu(Ecus(ecu))
+    ecus.uds = {f"ECU{index}": uds for index, uds in ecus.create(load_config, Uds).items()}
+    return ecus
+
+
+def test_run_ecus_concurrently(ecus):
+    jobs = []
+    for ecu in ecus.uds:
+        jobs.append((ecu, "send", ([0x10, 0x03],)))
+        jobs.append(EcuJob(ecu, "readDataByIdentifier", ("ECU Serial Number",)))
+
+    results = list(UdsExecutor(ecus.uds).run(jobs))
+
+    assert len(results) == 2 * ECU_COUNT
+    assert all(result.ok for result in results)
+    assert ecus.max_active == ECU_COUNT
+    assert ecus.max_active_per_ecu == 1
+    for index, ecu in enumerate(ecus.uds):
+        ecu_results = [result for result in results if result.job.ecu == ecu]
+        # in order, per ECU
+        assert [result.job.service for result in ecu_results] == ["send", "readDataByIdentifier"]
+        assert ecu_results[1].result == {"ECU_Serial_Number": f"SERIAL{0x700 + index:010X}"}
+
+
+def test_max_per_bus(ecus):
+    ecus.barrier = None
+    jobs = [(ecu, "readDataByIdentifier", ("ECU Serial Number",)) for ecu in ecus.uds] * 2
+
+    results = list(UdsExecutor(ecus.uds, max_per_bus=2, buses={ecu: "can0" for ecu in ecus.uds}).run(jobs))
+
+    assert len(results) == 2 * ECU_COUNT
+    assert ecus.max_active <= 2
+
+
+def test_errors_and_unknown_ecu(ecus):
+    ecus.barrier = None
+    executor = UdsExecutor(ecus.uds)
+
+    results = list(executor.run([("ECU0", "readDataByIdentifier", ("Unknown DID",))]))
+    assert isinstance(results[0].error, KeyError)
+    assert not results[0].ok
+    with pytest.raises(KeyError):
+        list(executor.run([("ECU9", "send", ([0x3E, 0x00],))]))
+
+
+def test_run_async(ecu, patch_ecu, load_config):
+    ecus = patch_ecu(Ecus(ecu))
+    ecus.barrier = None
+    ecus.latency = 0.01
+    uds = ecus.create(load_config, AsyncUds)
+    jobs = [(index, "readDataByIdentifier", ("ECU Serial Number",)) for index in uds] * 3
+
+    async def run():
+        return [result async for result in UdsExecutor(uds).run_async(jobs)]
+
+    results = asyncio.run(run())
+
+    assert len(results) == 3 * ECU_COUNT
+    assert all(result.result == {"ECU_Serial_Number": f"SERIAL{0x700 + result.job.ecu:010X}"} for result in results)
+    assert ecus.max_active == ECU_COUNT
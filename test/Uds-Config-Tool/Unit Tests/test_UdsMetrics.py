@@ -0,0 +1,81 @@
+import pytest
+
+from uds.uds_communications.Uds.UdsMetrics import ServiceKey, UdsMetrics
+
+
+@pytest.mark.parametrize(
+    "request_, expected_key",
+    [
+        ([0x22, 0xF1, 0x90], ServiceKey(0x22, None, 0xF190)),
+        ([0x22, 0xF1, 0x90, 0xF1, 0x8C], ServiceKey(0x22, None, 0xF190)),
+        ([0x2E, 0xF1, 0x90, 0x01], ServiceKey(0x2E, None, 0xF190)),
+        ([0x10, 0x03], ServiceKey(0x10, 0x03)),
+        # suppress positive response bit
+        ([0x3E, 0x80], ServiceKey(0x3E, 0x00)),
+        ([0x31, 0x01, 0xFF, 0x00], ServiceKey(0x31, 0x01, 0xFF00)),
+        ([0x36, 0x01, 0xAA], ServiceKey(0x36)),
+        # SecuredDataTransmission has no sub-function, its second byte is not one
+        ([0x84, 0x81, 0x00], ServiceKey(0x84)),
+    ],
+)
+def test_service_key(request_, expected_key):
+    assert ServiceKey.of(request_) == expected_key
+
+
+def test_metrics(uds, ecu):
+    ecu.responses[(0x22, 0xF1, 0x90)] = [[0x62, 0xF1, 0x90] + [0x41] * 17, [0x7F, 0x22, 0x31]]
+    ecu.responses[(0x31, 0x01, 0xFF, 0x00)] = [[0x7F, 0x31, 0x78], [0x7F, 0x31, 0x78], [0x71, 0x01, 0xFF, 0x00]]
+
+    uds.send([0x22, 0xF1, 0x90])
+    uds.send([0x22, 0xF1, 0x90])
+    uds.send([0x31, 0x01, 0xFF, 0x00])
+    uds.send([0x3E, 0x80], responseRequired=False)
+    with pytest.raises(TimeoutError):
+        uds.send([0x22, 0xF1, 0x8C])
+
+    snapshot = {(entry["sid"], entry["did"]): entry for entry in uds.metrics.snapshot()}
+    assert list(snapshot) == [(0x22, 0xF18C), (0x22, 0xF190), (0x31, 0xFF00), (0x3E, None)]
+
+    read = snapshot[0x22, 0xF190]
+    assert read["requests"] == 2
+    assert read["negative_responses"] == {0x31: 1}
+    assert read["request_bytes"] == 6
+    assert read["response_bytes"] == 23
+    assert (read["frames_sent"], read["frames_received"]) == (2, 2)
+    assert read["latency"]["count"] == 2
+    assert read["transmit"]["count"] == 2
+    assert 0 < read["latency"]["p50"] <= read["latency"]["max"]
+
+    routine = snapshot[0x31, 0xFF00]
+    assert routine["sub_function"] == 0x01
+    assert routine["pending"] == 2
+    assert routine["negative_responses"] == {}
+    assert routine["frames_received"] == 3
+
+    assert snapshot[0x3E, None]["latency"]["count"] == 0
+    assert snapshot[0x22, 0xF18C]["timeouts"] == 1
+
+    uds.metrics.reset()
+    assert uds.metrics.snapshot() == []
+
+
+def test_prometheus():
+    metrics = UdsMetrics({"ecu": "0x7E0"})
+    metrics.record([0x22, 0xF1, 0x90], [0x62, 0xF1, 0x90, 0x00], 0.001, 0.020, frames=(1, 1))
+    metrics.record([0x22, 0xF1, 0x90], [0x7F, 0x22, 0x31], 0.001, 0.010)
+    metrics.record([0x10, 0x03], None, 0.001, timeout=True)
+
+    lines = metrics.prometheus().splitlines()
+
+    assert "# TYPE uds_requests_total counter" in lines
+    assert 'uds_requests_total{ecu="0x7E0",sid="0x10",sub_function="0x03"} 1' in lines
+    assert 'uds_requests_total{ecu="0x7E0",sid="0x22",did="0xF190"} 2' in lines
+    assert 'uds_timeouts_total{ecu="0x7E0",sid="0x10",sub_function="0x03"} 1' in lines
+    assert 'uds_negative_responses_total{ecu="0x7E0",sid="0x22",did="0xF190",nrc="0x31"} 1' in lines
+    assert 'uds_frames_sent_total{ecu="0x7E0",sid="0x22",did="0xF190"} 1' in lines
+    assert "# TYPE uds_request_latency_seconds summary" in lines
+    median = next(line for line in lines if line.startswith('uds_request_latency_seconds{ecu="0x7E0",sid="0x22"'))
+    assert median.startswith('uds_request_latency_seconds{ecu="0x7E0",sid="0x22",did="0xF190",quantile="0.5"} ')
+    assert float(median.split()[-1]) == pytest.approx(0.010, rel=1 / 64)
+    assert 'uds_request_latency_seconds_sum{ecu="0x7E0",sid="0x22",did="0xF190"} 0.030000' in lines
+    assert 'uds_request_latency_seconds_count{ecu="0x7E0",sid="0x22",did="0xF190"} 2' in lines
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from uds.uds_communications.Uds.AsyncUds import AsyncUds
+from uds.uds_communications.Uds.Uds import Uds
+
+PENDING = [0x7F, 0x31, 0x78]
+# extended session, P2Server_max 50 ms, P2*Server_max 2000 ms
+EXTENDED_SESSION_RESPONSE = [0x50, 0x03, 0x00, 0x32, 0x00, 0xC8]
+
+
+@pytest.fixture
+def uds_config():
+    return {"p2_can_client": 1}
+
+
+@pytest.fixture
+def exchange(ecu):
+    """Responses to return whatever the request, and timeouts given to recv."""
+    responses = []
+    ecu.respond = lambda tp, request: responses.pop(0)
+    return responses, ecu.timeouts
+
+
+def test_p2_star_after_response_pending(load_config, exchange):
+    load_config(p2_star_can_client=8)
+    responses, timeouts = exchange
+    responses.extend([PENDING, PENDING, [0x71, 0x01, 0xFF, 0x00]])
+
+    response = Uds().send([0x31, 0x01, 0xFF, 0x00])
+
+    assert response == [0x71, 0x01, 0xFF, 0x00]
+    assert timeouts == [1, 8, 8]
+
+
+def test_session_timing(load_config, exchange):
+    load_config(p2_star_can_client=8, p2_margin=0.01)
+    responses, timeouts = exchange
+    uds = Uds()
+
+    responses.append(EXTENDED_SESSION_RESPONSE)
+    uds.send([0x10, 0x03])
+    assert uds.timing.server_p2 == pytest.approx(0.05)
+    assert uds.timing.server_p2_star == pytest.approx(2.0)
+
+    responses.extend([PENDING, [0x71, 0x01, 0xFF, 0x00]])
+    uds.send([0x31, 0x01, 0xFF, 0x00])
+    assert timeouts[1:] == [pytest.approx(0.06), pytest.approx(2.01)]
+
+    # back to the default session
+    responses.extend([[0x51, 0x01], [0x62, 0xF1, 0x90]])
+    uds.send([0x11, 0x01])
+    uds.send([0x22, 0xF1, 0x90])
+    assert timeouts[-1] == 1
+
+
+@pytest.mark.parametrize(
+    "send_reset",
+    [
+        pytest.param(lambda uds: uds.send([0x11, 0x81], responseRequired=False), id="suppressed response"),
+        pytest.param(lambda uds: uds.send_functional([0x11, 0x81], responseRequired=False), id="functional"),
+    ],
+)
+def test_session_timing_reset_without_response(load_config, exchange, send_reset):
+    load_config()
+    responses, timeouts = exchange
+    uds = Uds()
+    responses.extend([EXTENDED_SESSION_RESPONSE, [0x62, 0xF1, 0x90]])
+
+    uds.send([0x10, 0x03])
+    send_reset(uds)
+    uds.send([0x22, 0xF1, 0x90])
+
+    assert uds.timing.server_p2 is None
+    assert timeouts[-1] == 1
+
+
+def test_session_timing_disabled(load_config, exchange):
+    load_config(session_timing=False)
+    responses, timeouts = exchange
+    uds = Uds()
+    responses.extend([EXTENDED_SESSION_RESPONSE, [0x62, 0xF1, 0x90]])
+
+    uds.send([0x10, 0x03])
+    uds.send([0x22, 0xF1, 0x90])
+
+    assert timeouts == [1, 1]
+    assert uds.timing.server_p2 is None
+
+
+def test_service_timing(load_config, exchange):
+    load_config(service_timing={0x31: (0.2, 30)})
+    responses, timeouts = exchange
+    uds = Uds()
+    responses.extend([EXTENDED_SESSION_RESPONSE, PENDING, [0x71, 0x01, 0xFF, 0x00], [0x62, 0xF1, 0x90]])
+
+    uds.send([0x10, 0x03])
+    uds.send([0x31, 0x01, 0xFF, 0x00])
+    uds.send([0x22, 0xF1, 0x90])
+
+    assert timeouts[1:] == [0.2, 30, pytest.approx(0.15)]
+
+
+def test_measure_pending(load_config, exchange):
+    load_config(measure_pending=True)
+    responses, _ = exchange
+    uds = Uds()
+    responses.extend([PENDING, PENDING, [0x71, 0x01, 0xFF, 0x00], [0x62, 0xF1, 0x90]])
+
+    uds.send([0x31, 0x01, 0xFF, 0x00])
+    uds.send([0x22, 0xF1, 0x90])
+
+    assert list(uds.timing.pending_durations) == [0x31]
+    assert len(uds.timing.pending_durations[0x31]) == 2
+    assert len(uds.last_pending_resp_times) == 0
+
+
+def test_async_p2_star(load_config, exchange):
+    load_config(p2_star_can_client=8)
+    responses, timeouts = exchange
+    responses.extend([EXTENDED_SESSION_RESPONSE, PENDING, [0x71, 0x01, 0xFF, 0x00]])
+    uds = AsyncUds()
+
+    async def run():
+        await uds.send([0x10, 0x03])
+        return await uds.send([0x31, 0x01, 0xFF, 0x00])
+
+    assert asyncio.run(run()) == [0x71, 0x01, 0xFF, 0x00]
+    assert timeouts == [1, pytest.approx(0.15), pytest.approx(2.1)]
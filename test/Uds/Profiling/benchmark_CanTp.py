@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+
+"""Benchmark suite of CanTp, with results stored as JSON and compared
+against a baseline to catch performance regressions.
+
+Every scenario transfers messages from a tester CanTp to an ECU CanTp
+over an instant VirtualCanBus, so that only the transport protocol code
+is measured (apart from the STmin requested by the ECU). Measured per
+scenario:
+ - frames/s and us/frame: frames of a transfer, flow controls included,
+   over the wall time of the transfer
+ - CPU ms/KB: CPU time of the process, tester and ECU together, per KB
+   of payload
+
+Scenarios: single frames, 4095 bytes transfers under several block size
+and STmin combinations and addressing types, CAN FD 64 bytes frames.
+
+Usage:
+    python benchmark_CanTp.py run [-o results.json] [-k pattern] [--baseline baseline.json]
+    python benchmark_CanTp.py compare baseline.json results.json [--threshold 20]
+
+compare (and run with --baseline) exits with status 1 when a metric of a
+scenario got worse than the baseline by more than threshold percent.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import threading
+from datetime import datetime, timezone
+from time import perf_counter, process_time
+from typing import Dict, List, NamedTuple
+
+from uds.config import Config, IsoTpConfig
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.TransportProtocols.Can.VirtualCanBus import VirtualCanBus
+
+RESULTS_VERSION = 1
+DEFAULT_THRESHOLD = 20.0
+
+# metric -> True if higher is better
+METRICS = {"frames_per_s": True, "us_per_frame": False, "cpu_ms_per_kb": False}
+
+# tester addresses, swapped for the ECU
+ADDRESSES = {
+    "NORMAL": dict(req_id=0x7E0, res_id=0x7E8, n_sa=0xFF, n_ta=0xFF, n_ae=0xFF),
+    "NORMAL_FIXED": dict(req_id=0, res_id=0, n_sa=0xF1, n_ta=0x10, n_ae=0xFF),
+    "EXTENDED": dict(req_id=0x7E0, res_id=0x7E8, n_sa=0xF1, n_ta=0x10, n_ae=0xFF),
+    "MIXED": dict(req_id=0x7E0, res_id=0x7E8, n_sa=0xFF, n_ta=0xFF, n_ae=0x55),
+}
+
+
+class Scenario(NamedTuple):
+    name: str
+    length: int
+    transfers: int
+    is_fd: bool = False
+    addressing_type: str = "NORMAL"
+    block_size: int = 0
+    st_min: float = 0.0
+
+
+SCENARIOS = [
+    Scenario("single_frame", 7, 5000),
+    Scenario("single_frame_fd_64", 62, 5000, is_fd=True),
+    Scenario("transfer_4095_bs0_stmin0", 4095, 50),
+    Scenario("transfer_4095_bs8_stmin0", 4095, 50, block_size=8),
+    Scenario("transfer_4095_bs0_stmin100us", 4095, 5, st_min=100e-6),
+    Scenario("transfer_4095_bs8_stmin1ms", 4095, 2, block_size=8, st_min=1e-3),
+    Scenario("transfer_4095_normal_fixed", 4095, 50, addressing_type="NORMAL_FIXED"),
+    Scenario("transfer_4095_extended", 4095, 50, addressing_type="EXTENDED"),
+    Scenario("transfer_4095_mixed", 4095, 50, addressing_type="MIXED"),
+    Scenario("transfer_4095_fd_64", 4095, 200, is_fd=True),
+    Scenario("transfer_4095_fd_64_bs8", 4095, 200, is_fd=True, block_size=8),
+]
+
+
+def make_tp(scenario: Scenario, ecu: bool) -> CanTp:
+    addresses = dict(ADDRESSES[scenario.addressing_type])
+    if ecu:
+        addresses.update(
+            req_id=addresses["res_id"], res_id=addresses["req_id"], n_sa=addresses["n_ta"], n_ta=addresses["n_sa"]
+        )
+    Config.isotp = IsoTpConfig(
+        addressing_type=scenario.addressing_type,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        rx_block_size=scenario.block_size,
+        rx_st_min=scenario.st_min,
+        capture_size=0,
+        **addresses,
+    )
+    return CanTp(is_fd=scenario.is_fd)
+
+
+def run_scenario(scenario: Scenario, repeats: int = 5) -> Dict[str, float]:
+    """Run a scenario and return its metrics, the median of the repeats."""
+    bus = VirtualCanBus()
+    tester = make_tp(scenario, ecu=False)
+    ecu = make_tp(scenario, ecu=True)
+    tester.connection = bus.connector(tester.callback_onReceive)
+    ecu.connection = bus.connector(ecu.callback_onReceive)
+    payload = bytes(range(256)) * (scenario.length // 256) + bytes(scenario.length % 256)
+
+    def receive(count, received):
+        for _ in range(count):
+            received.append(ecu.decode_isotp_bytes(2))
+
+    # warm up, the first transfer being left out of the measures
+    warm_up = threading.Thread(target=receive, args=(1, []))
+    warm_up.start()
+    tester.send(payload)
+    warm_up.join()
+
+    samples: Dict[str, List[float]] = {metric: [] for metric in METRICS}
+    sent_before_repeats = bus.sent
+    for _ in range(repeats):
+        received = []
+        ecu_thread = threading.Thread(target=receive, args=(scenario.transfers, received))
+        ecu_thread.start()
+        sent_before = bus.sent
+        start, cpu_start = perf_counter(), process_time()
+        for _ in range(scenario.transfers):
+            tester.send(payload)
+        ecu_thread.join()
+        elapsed, cpu = perf_counter() - start, process_time() - cpu_start
+        if len(received) != scenario.transfers or received[-1] != payload:
+            raise RuntimeError(f"{scenario.name}: messages not received")
+
+        frames = bus.sent - sent_before
+        samples["frames_per_s"].append(frames / elapsed)
+        samples["us_per_frame"].append(elapsed / frames * 1e6)
+        samples["cpu_ms_per_kb"].append(cpu * 1e3 / (scenario.length * scenario.transfers / 1024))
+
+    metrics = {metric: statistics.median(values) for metric, values in samples.items()}
+    metrics["frames_per_transfer"] = (bus.sent - sent_before_repeats) / repeats / scenario.transfers
+    return metrics
+
+
+def run(pattern: str = "", repeats: int = 5) -> dict:
+    results = {}
+    for scenario in SCENARIOS:
+        if pattern not in scenario.name:
+            continue
+        metrics = run_scenario(scenario, repeats)
+        results[scenario.name] = metrics
+        print(
+            f"{scenario.name:<30} {metrics['frames_per_s']:10.0f} frames/s {metrics['us_per_frame']:8.2f} us/frame "
+            f"{metrics['cpu_ms_per_kb']:8.3f} CPU ms/KB"
+        )
+    return {
+        "version": RESULTS_VERSION,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Compare results against a baseline.
+
+    :param baseline: results of the reference run
+    :param current: results to check
+    :param threshold: change in percent beyond which a metric regressed
+    :return: the descriptions of the regressions
+    """
+    regressions = []
+    for name, metrics in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            print(f"{name:<30} not in the baseline")
+            continue
+        changes = []
+        for metric, higher_is_better in METRICS.items():
+            change = (metrics[metric] - reference[metric]) / reference[metric] * 100
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = " REGRESSION"
+                regressions.append(f"{name}: {metric} {reference[metric]:.3f} -> {metrics[metric]:.3f} ({change:+.1f}%)")
+            changes.append(f"{metric} {change:+6.1f}%{flag}")
+        print(f"{name:<30} " + "   ".join(changes))
+    return regressions
+
+
+def load(path: str) -> dict:
+    with open(path) as results_file:
+        results = json.load(results_file)
+    if results.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{path} does not hold benchmark results of version {RESULTS_VERSION}")
+    return results
+
+
+def report(regressions: List[str]) -> int:
+    if not regressions:
+        print("No regression")
+        return 0
+    print(f"{len(regressions)} regression(s):")
+    for regression in regressions:
+        print(f"  {regression}")
+    return 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="JSON file to write the results to")
+    run_parser.add_argument("-k", "--pattern", default="", help="only run the scenarios whose name contains it")
+    run_parser.add_argument("-r", "--repeats", type=int, default=5, help="runs of each scenario, the median is kept")
+    run_parser.add_argument("--baseline", help="JSON results to compare the run against")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="tolerated change in percent")
+    compare_parser = commands.add_parser("compare", help="compare results against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="tolerated change in percent")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        return report(compare(load(args.baseline), load(args.results), args.threshold))
+
+    results = run(args.pattern, args.repeats)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        return report(compare(load(args.baseline), results, args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+"""Compare the allocation cost of building CanTp frames through the legacy
+list based implementation and through the bytes based frame pipeline, as
+well as the cost of segmenting a 4095 bytes message.
+
+For every frame type the script reports:
+ - the memory still allocated per built frame
+ - the peak of traced memory per built frame
+ - the best time needed to build a frame over several runs
+"""
+
+import timeit
+import tracemalloc
+
+from uds import CanTp, fillArray
+from uds.config import Config, IsoTpConfig
+from uds.uds_communications.TransportProtocols.Can.CanTp import as_memoryview
+from uds.uds_communications.TransportProtocols.Can.CanTpTypes import CanTpMessageType
+
+FRAME_COUNT = 10000
+
+
+# ----------------------------------------------------------------
+# Legacy list implementation, kept here as reference
+# ----------------------------------------------------------------
+def legacy_add_padding(tp, payload):
+    if not tp.is_fd:
+        return fillArray(payload, length=tp._max_frame_length, fillValue=tp.PADDING_PATTERN)
+    padded_length = next(size for size in tp.CAN_FD_DATA_LENGTHS if size >= len(payload))
+    return fillArray(payload, length=padded_length, fillValue=tp.PADDING_PATTERN)
+
+
+def legacy_consecutive_frame(tp, payload, sequence_number=1):
+    return legacy_add_padding(tp, [(CanTpMessageType.CONSECUTIVE_FRAME << 4) + sequence_number, *payload])
+
+
+def legacy_receive(msg_data, start_index=0):
+    return list(msg_data[start_index:])
+
+
+def legacy_segmentation(tp, payload):
+    block = tp.create_blockList(payload, 585)[0]
+    return [legacy_consecutive_frame(tp, block.pop(0), (i + 1) % 16) for i in range(len(block))]
+
+
+# ----------------------------------------------------------------
+# Measurement helpers
+# ----------------------------------------------------------------
+def measure(name, build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    frames = [build(i) for i in range(FRAME_COUNT)]
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    duration = min(timeit.repeat(lambda: [build(i) for i in range(FRAME_COUNT)], number=1, repeat=5))
+
+    print(
+        f"{name:<36} {retained / FRAME_COUNT:>8.1f} B/frame retained "
+        f"{peak / FRAME_COUNT:>8.1f} B/frame peak {duration / FRAME_COUNT * 1e6:>6.2f} us/frame"
+    )
+    return frames
+
+
+def main():
+    Config.isotp = IsoTpConfig(
+        req_id=0x600,
+        res_id=0x650,
+        addressing_type="NORMAL",
+        n_sa=0xFF,
+        n_ta=0xFF,
+        n_ae=0xFF,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+    )
+
+    for is_fd in (False, True):
+        tp = CanTp(is_fd=is_fd)
+        pdu_length = tp._max_pdu_length
+        list_payload = [0x5A] * pdu_length
+        view_payload = as_memoryview(bytes(list_payload))
+        msg_data = bytearray([0x21] + list_payload)
+
+        print(f"--- {'CAN FD' if is_fd else 'CAN'} ({pdu_length} bytes per consecutive frame)")
+        measure("consecutive frame (legacy list)", lambda i: legacy_consecutive_frame(tp, list_payload, i % 16))
+        measure("consecutive frame (list API)", lambda i: tp.make_consecutive_frame(list_payload, i % 16))
+        measure("consecutive frame (bytes)", lambda i: tp._build_consecutive_frame(view_payload, i % 16))
+        measure("received frame (legacy list)", lambda i: legacy_receive(msg_data))
+        measure("received frame (bytes)", lambda i: msg_data)
+
+    tp = CanTp(is_fd=False)
+    list_payload = [0x5A] * 4089
+    view_payload = as_memoryview(bytes(list_payload))
+    frame_count = len(tp.plan_consecutive_frames(view_payload))
+    for name, segment in (
+        ("legacy block list", lambda: legacy_segmentation(tp, list_payload)),
+        ("segmentation plan", lambda: [frame for frame in tp.plan_consecutive_frames(view_payload)]),
+    ):
+        duration = min(timeit.repeat(segment, number=10, repeat=5)) / 10
+        print(f"4095 bytes message, {name:<20} {duration / frame_count * 1e6:>6.2f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""Compare the cost of delivering a received frame to one of many CanTp
+instances sharing a bus:
+ - every frame offered to the callback_onReceive of every instance
+ - every frame routed by a CanTpDispatcher
+"""
+
+import timeit
+
+import can
+
+from uds.config import Config, IsoTpConfig
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.TransportProtocols.Can.CanTpDispatcher import CanTpDispatcher
+
+ECU_COUNT = 40
+FRAME_COUNT = 20000
+
+
+def make_transports():
+    transports = []
+    for index in range(ECU_COUNT):
+        Config.isotp = IsoTpConfig(
+            req_id=0x600 + index,
+            res_id=0x680 + index,
+            addressing_type="NORMAL",
+            n_ae=0,
+            n_sa=0,
+            n_ta=0,
+            m_type="DIAGNOSTICS",
+            discard_neg_resp=False,
+        )
+        transports.append(CanTp(is_fd=False))
+    return transports
+
+
+def main():
+    transports = make_transports()
+    messages = [
+        can.Message(arbitration_id=0x680 + index % ECU_COUNT, data=[0x01, 0x50], is_extended_id=False)
+        for index in range(FRAME_COUNT)
+    ]
+    callbacks = [tp.callback_onReceive for tp in transports]
+
+    def broadcast():
+        for msg in messages:
+            for callback in callbacks:
+                callback(msg)
+        for tp in transports:
+            tp.clearBufferedMessages()
+
+    dispatcher = CanTpDispatcher()
+    for tp in transports:
+        dispatcher.register(tp)
+
+    def dispatch():
+        for msg in messages:
+            dispatcher(msg)
+        for tp in transports:
+            tp.clearBufferedMessages()
+
+    for name, run in (("broadcast", broadcast), ("dispatcher", dispatch)):
+        cost = min(timeit.repeat(run, number=1, repeat=5)) / FRAME_COUNT
+        print(f"{name:<12} {cost * 1e6:6.2f} us/frame with {ECU_COUNT} transports")
+
+
+if __name__ == "__main__":
+    main()
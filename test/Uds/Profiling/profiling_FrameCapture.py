@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+"""Measure the overhead of the frame capture of CanTp:
+ - cost of recording a classic CAN and a CAN FD frame in a CaptureRing
+ - cost of CanTp.transmit_to and CanTp.callback_onReceive with and
+   without the capture
+ - time to save a full capture as ASC, BLF and binary trace
+"""
+
+import os
+import tempfile
+import timeit
+from time import perf_counter
+
+import can
+
+from uds.config import Config, IsoTpConfig
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.TransportProtocols.Can.FrameCapture import CaptureRing
+
+FRAME_COUNT = 100000
+
+
+class NullConnector:
+    accepts_bytes = True
+
+    def transmit(self, data, req_id):
+        pass
+
+
+def per_frame(statement):
+    return min(timeit.repeat(statement, number=FRAME_COUNT, repeat=5)) / FRAME_COUNT
+
+
+def make_tp(capture_size):
+    Config.isotp = IsoTpConfig(
+        req_id=0x7E0,
+        res_id=0x7E8,
+        addressing_type="NORMAL",
+        n_sa=0xFF,
+        n_ta=0xFF,
+        n_ae=0xFF,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        rx_buffer_size=FRAME_COUNT * 5,
+        capture_size=capture_size,
+    )
+    tp = CanTp(NullConnector(), is_fd=False)
+    return tp
+
+
+def main():
+    ring = CaptureRing(4096)
+    for length in (8, 64):
+        frame = bytearray(length)
+        cost = per_frame(lambda: ring.record(1.0, 0x7E8, frame))
+        print(f"CaptureRing.record, {length:2} bytes frame   {cost * 1e9:6.0f} ns")
+
+    frame = bytearray(8)
+    message = can.Message(arbitration_id=0x7E8, data=frame)
+    for capture_size in (0, 4096):
+        tp = make_tp(capture_size)
+        transmit = per_frame(lambda: tp.transmit_to(frame, 0x7E0))
+        receive = per_frame(lambda: tp.callback_onReceive(message))
+        state = "with" if capture_size else "without"
+        print(
+            f"CanTp {state:<7} capture   transmit_to {transmit * 1e9:6.0f} ns   "
+            f"callback_onReceive {receive * 1e9:6.0f} ns"
+        )
+
+    with tempfile.TemporaryDirectory() as directory:
+        for suffix in (".asc", ".blf", ".bin"):
+            path = os.path.join(directory, "trace" + suffix)
+            start = perf_counter()
+            tp.capture.save(path)
+            elapsed = perf_counter() - start
+            print(
+                f"save {len(tp.capture)} frames as {suffix:<4}   {elapsed * 1e3:7.1f} ms   "
+                f"{os.path.getsize(path) / 1024:7.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+"""Compare the throughput of the pure Python CanTp with the one of the
+Linux kernel ISO-TP implementation (KernelCanTp) on a virtual CAN bus.
+
+An ECU simulated with a kernel ISO-TP socket echoes every message it
+receives. For both transports the script sends messages of several
+sizes, waits for their echo and reports the round trips per second and
+the achieved payload throughput.
+
+Needs Linux 5.10 or later and a vcan interface:
+
+    sudo modprobe vcan can-isotp
+    sudo ip link add dev vcan0 type vcan
+    sudo ip link set up vcan0
+"""
+
+import threading
+import time
+
+import can
+
+from uds.config import Config, IsoTpConfig
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.TransportProtocols.Can.KernelCanTp import KernelCanTp
+
+CHANNEL = "vcan0"
+MESSAGE_SIZES = (7, 62, 512, 4095)
+DURATION = 2.0
+
+
+class BusConnector:
+    """CanTp connector sending the frames on a python-can bus."""
+
+    accepts_bytes = True
+
+    def __init__(self, bus):
+        self.bus = bus
+
+    def transmit(self, data, req_id):
+        self.bus.send(can.Message(arbitration_id=req_id, data=data, is_extended_id=False))
+
+
+def configure(req_id, res_id):
+    Config.isotp = IsoTpConfig(
+        req_id=req_id,
+        res_id=res_id,
+        addressing_type="NORMAL",
+        n_sa=0xFF,
+        n_ta=0xFF,
+        n_ae=0xFF,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        rx_st_min=0,
+    )
+
+
+def echo(ecu, stop):
+    while not stop.is_set():
+        try:
+            ecu.send(ecu.decode_isotp_bytes(0.1))
+        except TimeoutError:
+            pass
+
+
+def measure(name, tp):
+    for size in MESSAGE_SIZES:
+        payload = bytes(size)
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < DURATION:
+            tp.send(payload)
+            tp.recv(1)
+            count += 1
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:<10} {size:>5} bytes {count / elapsed:>8.1f} round trips/s "
+            f"{2 * size * count / elapsed / 1024:>8.1f} kB/s"
+        )
+
+
+def main():
+    configure(0x7E8, 0x7E0)
+    ecu = KernelCanTp(channel=CHANNEL, is_fd=False)
+    stop = threading.Event()
+    echo_thread = threading.Thread(target=echo, args=(ecu, stop), daemon=True)
+    echo_thread.start()
+
+    try:
+        configure(0x7E0, 0x7E8)
+        kernel_tp = KernelCanTp(channel=CHANNEL, is_fd=False)
+        measure("kernel", kernel_tp)
+        kernel_tp.close()
+
+        configure(0x7E0, 0x7E8)
+        with can.Bus(interface="socketcan", channel=CHANNEL) as bus:
+            python_tp = CanTp(connector=BusConnector(bus), is_fd=False)
+            notifier = can.Notifier(bus, [python_tp.callback_onReceive])
+            measure("CanTp", python_tp)
+            notifier.stop()
+    finally:
+        stop.set()
+        echo_thread.join()
+        ecu.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""Compare the CAN FD bus load of a flashing sequence with the different
+CanTp padding types, and the cost of looking up the padded length of a
+frame.
+
+The flashing sequence is made of TransferData requests with 4093 bytes
+of data, each one answered with a positive response. For every padding
+type the script reports the bytes sent on the bus, compared to the
+mandatory padding.
+"""
+
+import timeit
+
+from uds import CanTp
+from uds.config import Config, IsoTpConfig
+
+REQUEST_COUNT = 100
+DATA_LENGTH = 4093
+
+
+class FrameRecorder:
+    accepts_bytes = True
+
+    def __init__(self):
+        self.frames = []
+
+    def transmit(self, data, req_id):
+        self.frames.append(bytes(data))
+
+
+def flashing_frames(padding):
+    Config.isotp = IsoTpConfig(
+        req_id=0x600,
+        res_id=0x650,
+        addressing_type="NORMAL",
+        n_sa=0xFF,
+        n_ta=0xFF,
+        n_ae=0xFF,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        padding=padding,
+    )
+    recorder = FrameRecorder()
+    tp = CanTp(connector=recorder, is_fd=True)
+    # the flow control frames and the responses, as the ECU would send them with the same padding
+    flow_control = tp._build_flow_control_frame(0, 0)
+    tp.getNextBufferedMessage = lambda timeout=0: flow_control
+
+    for counter in range(REQUEST_COUNT):
+        tp.encode_isotp(bytes([0x36, counter & 0xFF]) + bytes(DATA_LENGTH))
+        recorder.frames.append(bytes(flow_control))
+        recorder.frames.append(bytes(tp._build_single_frame(memoryview(bytes([0x76, counter & 0xFF])))))
+    return recorder.frames
+
+
+def main():
+    print(f"--- {REQUEST_COUNT} TransferData requests of {DATA_LENGTH} bytes over CAN FD")
+    reference = None
+    for padding in ("MANDATORY", "OPTIMIZED_FD", "NONE"):
+        frames = flashing_frames(padding)
+        total = sum(len(frame) for frame in frames)
+        reference = reference or total
+        print(
+            f"{padding:<14} {len(frames):>6} frames {total:>8} bytes "
+            f"{(reference - total) / reference * 100:>5.2f} % saved"
+        )
+
+    tp = CanTp(is_fd=True)
+    lengths = [length % 64 + 1 for length in range(1000)]
+    for name, lookup in (
+        ("next() over the data lengths", lambda: [next(size for size in tp.CAN_FD_DATA_LENGTHS if size >= length) for length in lengths]),
+        ("precomputed table", lambda: [tp._padded_length(length) for length in lengths]),
+    ):
+        duration = min(timeit.repeat(lookup, number=100, repeat=5)) / 100
+        print(f"padded length, {name:<30} {duration / len(lengths) * 1e9:>6.1f} ns/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+
+"""Measure what running CanTp in a worker process (ProcessCanTp) costs
+and saves compared to running it in the process of the tests.
+
+- SharedMessageRing against multiprocessing.Queue: round trip latency of
+  a small message between two processes and throughput of 4 KiB
+  messages
+- CanTp against ProcessCanTp: round trip of a request answered with a
+  4095 bytes response by an ECU simulated in another process, the frames
+  going through a pipe, with the tests process idle or busy with pure
+  Python work competing for the GIL
+"""
+
+import multiprocessing
+import statistics
+import threading
+from time import perf_counter
+
+import can
+
+from uds.config import Config, IsoTpConfig
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.TransportProtocols.Can.ProcessCanTp import ProcessCanTp
+from uds.uds_communications.Utilities.SharedMessageRing import SharedMessageRing
+
+REQ_ID = 0x7E0
+RES_ID = 0x7E8
+RESPONSE_LENGTH = 4095
+ROUND_TRIPS = 200
+RING_MESSAGES = 20000
+
+
+def make_config():
+    return IsoTpConfig(
+        req_id=REQ_ID,
+        res_id=RES_ID,
+        addressing_type="NORMAL",
+        n_sa=0xFF,
+        n_ta=0xFF,
+        n_ae=0xFF,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        rx_st_min=0,
+    )
+
+
+def ring_echo(requests, responses):
+    while True:
+        kind, message = requests.get()
+        if kind:
+            return
+        responses.put(message)
+
+
+def queue_echo(requests, responses):
+    while True:
+        message = requests.get()
+        if message is None:
+            return
+        responses.put(message)
+
+
+def compare_rings(context):
+    rings = SharedMessageRing(1 << 20, context), SharedMessageRing(1 << 20, context)
+    queues = context.Queue(), context.Queue()
+    candidates = (
+        ("SharedMessageRing", ring_echo, rings, lambda r, m: r.put(m), lambda r: r.get()[1], lambda r: r.put(b"", 1)),
+        ("multiprocessing.Queue", queue_echo, queues, lambda q, m: q.put(m), lambda q: q.get(), lambda q: q.put(None)),
+    )
+    for name, echo, (requests, responses), put, get, stop in candidates:
+        process = context.Process(target=echo, args=(requests, responses))
+        process.start()
+
+        latencies = []
+        for _ in range(2000):
+            start = perf_counter()
+            put(requests, b"\x22\xF1\x90")
+            get(responses)
+            latencies.append(perf_counter() - start)
+
+        message = bytes(4096)
+        start = perf_counter()
+        for index in range(RING_MESSAGES):
+            put(requests, message)
+            if index >= 64:
+                get(responses)
+        for _ in range(min(RING_MESSAGES, 64)):
+            get(responses)
+        elapsed = perf_counter() - start
+
+        stop(requests)
+        process.join()
+        print(
+            f"{name:<22} round trip median {statistics.median(latencies) * 1e6:6.1f} us   "
+            f"4 KiB messages {RING_MESSAGES * 2 * len(message) / elapsed / 1e6:7.1f} MB/s"
+        )
+    for ring in rings:
+        ring.close()
+
+
+class PipeBus:
+    """Connector factory exchanging the frames through a pipe, standing
+    in for a CAN bus between two processes.
+    """
+
+    accepts_bytes = True
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, callback):
+        threading.Thread(target=self.receive, args=(callback,), daemon=True).start()
+        return self
+
+    def transmit(self, data, req_id):
+        self.connection.send_bytes(req_id.to_bytes(4, "big") + bytes(data))
+
+    def receive(self, callback):
+        while True:
+            try:
+                raw = self.connection.recv_bytes()
+            except (EOFError, OSError):
+                return
+            callback(can.Message(arbitration_id=int.from_bytes(raw[:4], "big"), data=raw[4:], is_extended_id=False))
+
+
+def run_ecu(connection, isotp_config):
+    Config.isotp = isotp_config
+    ecu = CanTp(is_fd=False)
+    ecu.reqIdAddress = RES_ID
+    ecu.resIdAddress = REQ_ID
+    ecu.connection = PipeBus(connection)(ecu.callback_onReceive)
+    response = bytes([0x62, 0xF1, 0x90]).ljust(RESPONSE_LENGTH, b"\xAA")
+    while True:
+        try:
+            ecu.decode_isotp_bytes(1)
+        except TimeoutError:
+            continue
+        ecu.send(response)
+
+
+def busy_work(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def round_trips(tp, busy):
+    stop = threading.Event()
+    threads = [threading.Thread(target=busy_work, args=(stop,)) for _ in range(2 if busy else 0)]
+    for thread in threads:
+        thread.start()
+    durations = []
+    try:
+        for _ in range(ROUND_TRIPS):
+            start = perf_counter()
+            tp.send([0x22, 0xF1, 0x90])
+            tp.recv(2)
+            durations.append(perf_counter() - start)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return durations
+
+
+def compare_transports(context):
+    Config.isotp = make_config()
+    for name in ("CanTp", "ProcessCanTp"):
+        tester_end, ecu_end = context.Pipe()
+        ecu = context.Process(target=run_ecu, args=(ecu_end, Config.isotp), daemon=True)
+        ecu.start()
+        if name == "CanTp":
+            tp = CanTp(is_fd=False)
+            tp.connection = PipeBus(tester_end)(tp.callback_onReceive)
+        else:
+            tp = ProcessCanTp(PipeBus(tester_end), is_fd=False)
+        for busy in (False, True):
+            durations = round_trips(tp, busy)
+            print(
+                f"{name:<13} {'busy' if busy else 'idle'}   "
+                f"round trip median {statistics.median(durations) * 1e3:6.2f} ms, max {max(durations) * 1e3:6.2f} ms   "
+                f"{RESPONSE_LENGTH * len(durations) / sum(durations) / 1e3:7.1f} kB/s"
+            )
+        if name == "ProcessCanTp":
+            tp.close()
+        ecu.terminate()
+
+
+def main():
+    context = multiprocessing.get_context("spawn")
+    compare_rings(context)
+    compare_transports(context)
+
+
+if __name__ == "__main__":
+    main()
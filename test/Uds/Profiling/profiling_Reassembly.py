@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""Compare the cost of reassembling received messages of growing sizes
+by extending a bytearray frame after frame and converting it to a list,
+as CanTp used to, with writing the frames in place into a buffer
+allocated from the first frame's length.
+
+For every message size the script reports the best time over several
+runs, per message and per frame, of:
+ - the data handling alone, legacy and in place
+ - the whole decode_isotp_bytes, allocating the message or writing it
+   into a buffer reused from one message to the next
+
+followed by the peak of memory allocated by the data handling alone.
+"""
+
+import timeit
+import tracemalloc
+
+from uds import CanTp
+from uds.config import Config, IsoTpConfig
+
+MESSAGE_SIZES = (64, 512, 4095, 65535, 1048576)
+
+
+def legacy_reassembly(frames, payload_length):
+    payload = bytearray()
+    payload += frames[0][2:]
+    for frame in frames[1:]:
+        payload += frame[1:]
+    return list(payload[:payload_length])
+
+
+def in_place_reassembly(frames, payload_length):
+    payload = bytearray(payload_length)
+    data = frames[0][2 : 2 + payload_length]
+    payload[: len(data)] = data
+    payload_ptr = len(data)
+    for frame in frames[1:]:
+        data = frame[1 : 1 + payload_length - payload_ptr]
+        payload[payload_ptr : payload_ptr + len(data)] = data
+        payload_ptr += len(data)
+    return payload
+
+
+def main():
+    Config.isotp = IsoTpConfig(
+        req_id=0x600,
+        res_id=0x650,
+        addressing_type="NORMAL",
+        n_sa=0xFF,
+        n_ta=0xFF,
+        n_ae=0xFF,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+    )
+    flow_control = CanTp(is_fd=False)._build_flow_control_frame(0, 0)
+
+    print(
+        f"{'message':>9} {'frames':>7}   {'extend + list':>20}   {'in place':>20}   "
+        f"{'decode_isotp_bytes':>20}   {'with reused buffer':>20}   {'peak legacy':>12}   {'peak in place':>12}"
+    )
+    for size in MESSAGE_SIZES:
+        # the frames of the message, as the other side sends them
+        sender = CanTp(is_fd=False)
+        frames = []
+        sender.transmit = lambda data, *args: frames.append(bytes(data))
+        sender.getNextBufferedMessage = lambda timeout=0: flow_control
+        sender.encode_isotp(bytes(index % 256 for index in range(size)))
+
+        receiver = CanTp(is_fd=False)
+        receiver.transmit = lambda data, *args: None
+        buffer = bytearray(size)
+
+        def decode(**kwargs):
+            received = iter(frames)
+            receiver.getNextBufferedMessage = lambda timeout=0: next(received)
+            return receiver.decode_isotp_bytes(**kwargs)
+
+        repeat = max(1, 20000 // len(frames))
+        results = []
+        for reassemble in (
+            lambda: legacy_reassembly(frames, size),
+            lambda: in_place_reassembly(frames, size),
+            decode,
+            lambda: decode(buffer=buffer),
+        ):
+            duration = min(timeit.repeat(reassemble, number=repeat, repeat=5)) / repeat
+            results.append(f"{duration * 1e3:>8.3f} ms {duration / len(frames) * 1e6:>5.2f} us/f")
+        for reassemble in (legacy_reassembly, in_place_reassembly):
+            tracemalloc.start()
+            reassemble(frames, size)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append(f"{peak / 1024:>9.1f} kB")
+        print(f"{size:>9} {len(frames):>7}   " + "   ".join(results))
+
+
+if __name__ == "__main__":
+    main()
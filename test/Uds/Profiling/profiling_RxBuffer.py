@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+"""Compare queue.Queue with the FrameRingBuffer used by CanTp to buffer the
+received frames:
+ - cost of a put/get pair from a single thread
+ - latency between a put from a producer thread and the consumer waking up
+"""
+
+import queue
+import statistics
+import threading
+import timeit
+from time import perf_counter
+
+from uds.uds_communications.Utilities.RingBuffer import FrameRingBuffer
+
+FRAME = bytearray(8)
+FRAME_COUNT = 100000
+LATENCY_SAMPLES = 2000
+
+
+def put_get_cost(put, get):
+    def run():
+        for _ in range(FRAME_COUNT):
+            put(FRAME)
+            get()
+
+    return min(timeit.repeat(run, number=1, repeat=5)) / FRAME_COUNT
+
+
+def wake_up_latency(put, get):
+    latencies = []
+
+    def consumer():
+        for _ in range(LATENCY_SAMPLES):
+            sent = get()
+            latencies.append(perf_counter() - sent)
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    for _ in range(LATENCY_SAMPLES):
+        put(perf_counter())
+        # let the consumer go back to waiting
+        threading.Event().wait(0.0002)
+    thread.join()
+    return statistics.median(latencies), max(latencies)
+
+
+def main():
+    std_queue = queue.Queue()
+    ring = FrameRingBuffer()
+    candidates = (
+        ("queue.Queue", std_queue.put, lambda: std_queue.get(timeout=1)),
+        ("FrameRingBuffer", ring.put, lambda: ring.get(1)),
+    )
+    for name, put, get in candidates:
+        cost = put_get_cost(put, get)
+        median, worst = wake_up_latency(put, get)
+        print(
+            f"{name:<16} put/get {cost * 1e6:6.2f} us   "
+            f"wake up median {median * 1e6:7.1f} us, max {worst * 1e6:7.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
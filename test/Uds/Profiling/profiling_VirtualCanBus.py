@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+"""Measure the multi-frame throughput and latency of CanTp over a
+VirtualCanBus, without hardware:
+ - instant delivery: cost of encode_isotp/decode_isotp alone
+ - classic CAN at 500 kbit/s and CAN FD at 500 kbit/s / 2 Mbit/s: time
+   of a transfer against the time its frames take on the bus
+
+The bus is seeded, so that the jitter of two runs is the same.
+"""
+
+import statistics
+import threading
+from time import perf_counter
+
+from uds.config import Config, IsoTpConfig
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.TransportProtocols.Can.VirtualCanBus import VirtualCanBus
+
+REQ_ID = 0x7E0
+RES_ID = 0x7E8
+LENGTHS = (64, 512, 4095)
+TRANSFERS = 20
+
+BUSES = (
+    ("instant", dict(), False),
+    ("CAN 500k", dict(bitrate=500000, latency=50e-6, jitter=20e-6), False),
+    ("CAN FD 500k/2M", dict(bitrate=500000, data_bitrate=2000000, is_fd=True, latency=50e-6, jitter=20e-6), True),
+)
+
+
+def make_config():
+    Config.isotp = IsoTpConfig(
+        req_id=REQ_ID,
+        res_id=RES_ID,
+        addressing_type="NORMAL",
+        n_sa=0xFF,
+        n_ta=0xFF,
+        n_ae=0xFF,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        rx_st_min=0,
+        capture_size=0,
+    )
+
+
+def transfer_durations(bus, is_fd, length):
+    tester = CanTp(is_fd=is_fd)
+    ecu = CanTp(is_fd=is_fd)
+    ecu.reqIdAddress = RES_ID
+    ecu.resIdAddress = REQ_ID
+    tester.connection = bus.connector(tester.callback_onReceive)
+    ecu.connection = bus.connector(ecu.callback_onReceive)
+    payload = bytes(length)
+
+    durations = []
+    for _ in range(TRANSFERS):
+        received = []
+        ecu_thread = threading.Thread(target=lambda: received.append(ecu.decode_isotp_bytes(2)))
+        ecu_thread.start()
+        sent_before = bus.sent
+        start = perf_counter()
+        tester.send(payload)
+        ecu_thread.join()
+        durations.append(perf_counter() - start)
+        assert received[0] == payload
+    frames = bus.sent - sent_before
+    return durations, frames
+
+
+def main():
+    make_config()
+    for name, parameters, is_fd in BUSES:
+        with VirtualCanBus(seed=0, **parameters) as bus:
+            for length in LENGTHS:
+                durations, frames = transfer_durations(bus, is_fd, length)
+                median = statistics.median(durations)
+                on_bus = frames * bus.frame_duration(64 if is_fd else 8)
+                efficiency = f"   bus time {on_bus * 1e3:6.2f} ms ({on_bus / median:4.0%})" if on_bus else ""
+                print(
+                    f"{name:<15} {length:5} bytes {frames:4} frames   median {median * 1e3:7.2f} ms, "
+                    f"max {max(durations) * 1e3:7.2f} ms   {length / median / 1e3:8.1f} kB/s{efficiency}"
+                )
+
+
+if __name__ == "__main__":
+    main()
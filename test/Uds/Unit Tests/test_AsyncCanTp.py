@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from uds.config import Config, IsoTpConfig
+from uds.uds_communications.TransportProtocols.Can.AsyncCanTp import AsyncCanTp
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+
+
+class EcuConnector:
+    """Answers the first frames with the given flow control frame and
+    records everything transmitted.
+    """
+
+    accepts_bytes = True
+
+    def __init__(self, flow_control=(0x30, 0x00, 0x00)):
+        self.tp = None
+        self.flow_control = bytes(flow_control)
+        self.frames = []
+
+    def transmit(self, data, req_id):
+        self.frames.append(bytes(data))
+        if data[0] >> 4 == 1:
+            self.tp.callback_onReceive(SimpleNamespace(arbitration_id=0x21, data=self.flow_control, timestamp=0.0))
+
+
+@pytest.fixture
+def async_tp_inst():
+    Config.isotp = IsoTpConfig(
+        req_id=0x12,
+        res_id=0x21,
+        addressing_type="NORMAL",
+        n_ae=0,
+        n_sa=0,
+        n_ta=0,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+    )
+    CanTp.PADDING_PATTERN = 0xCC
+    return AsyncCanTp(is_fd=False)
+
+
+def test_send_single_frame(async_tp_inst):
+    connector = EcuConnector()
+    connector.tp = async_tp_inst
+    async_tp_inst.connection = connector
+
+    asyncio.run(async_tp_inst.send([0x22, 0xF1, 0x8C]))
+
+    assert connector.frames == [bytes([0x03, 0x22, 0xF1, 0x8C, 0xCC, 0xCC, 0xCC, 0xCC])]
+
+
+def test_send_multi_frame(async_tp_inst):
+    connector = EcuConnector(flow_control=(0x30, 0x02, 0x01))
+    connector.tp = async_tp_inst
+    async_tp_inst.connection = connector
+    payload = bytes(range(20))
+
+    asyncio.run(async_tp_inst.send(payload))
+
+    assert connector.frames[0] == bytes([0x10, 20]) + payload[:6]
+    assert connector.frames[1:] == [
+        bytes([0x21]) + payload[6:13],
+        bytes([0x22]) + payload[13:20],
+    ]
+
+
+def test_recv_multi_frame_from_another_thread(async_tp_inst):
+    sent = []
+    async_tp_inst.connection = SimpleNamespace(transmit=lambda data, req_id: sent.append(bytes(data)))
+    payload = bytes(range(20))
+    frames = [
+        bytes([0x10, 20]) + payload[:6],
+        bytes([0x21]) + payload[6:13],
+        bytes([0x22]) + payload[13:20] + b"\xcc",
+    ]
+
+    def notifier():
+        for frame in frames:
+            async_tp_inst.callback_onReceive(SimpleNamespace(arbitration_id=0x21, data=frame, timestamp=0.0))
+
+    async def receive():
+        receiver = asyncio.ensure_future(async_tp_inst.recv(timeout_s=1))
+        await asyncio.sleep(0.01)
+        threading.Thread(target=notifier).start()
+        return await receiver
+
+    assert asyncio.run(receive()) == list(payload)
+    assert sent == [bytes([0x30, 0x00, 0x1E, 0xCC, 0xCC, 0xCC, 0xCC, 0xCC])]
+
+
+def test_recv_timeout(async_tp_inst):
+    with pytest.raises(TimeoutError):
+        asyncio.run(async_tp_inst.recv(timeout_s=0.01))
+
+
+def test_concurrent_conversations(async_tp_inst):
+    responses = []
+    for res_id in (0x21, 0x22, 0x23):
+        Config.isotp.res_id = res_id
+        responses.append(AsyncCanTp(is_fd=False))
+
+    async def conversation(tp, value):
+        received = asyncio.ensure_future(tp.recv(timeout_s=1))
+        await asyncio.sleep(0)
+        tp.callback_onReceive(
+            SimpleNamespace(arbitration_id=tp.resIdAddress, data=bytes([0x01, value]), timestamp=0.0)
+        )
+        return await received
+
+    async def run_all():
+        return await asyncio.gather(*(conversation(tp, index) for index, tp in enumerate(responses)))
+
+    assert asyncio.run(run_all()) == [[0], [1], [2]]
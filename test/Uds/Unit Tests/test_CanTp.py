@@ -1,10 +1,13 @@
+import time
 
-
+import can
 import pytest
 from pytest_mock import MockerFixture
 
 from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
-from uds.uds_communications.TransportProtocols.Can.CanTpTypes import CanTpAddressingTypes
+from uds.uds_communications.TransportProtocols.Can.CanTpFlowControl import ReceiveFlowControl
+from uds.uds_communications.TransportProtocols.Can.CanTpTypes import CanTpAddressingTypes, CanTpMessageType
+from uds.uds_communications.TransportProtocols.Can.FrameCapture import FrameCapture, load_trace
 from uds.config import Config, IsoTpConfig
 
 
@@ -44,6 +47,7 @@ def can_fd_tp_inst(mocker: MockerFixture):
     "expected_stmin_value, expected_stmin_time",
     [
         (0x01, 1e-3), (0x7f, 127e-3), (0xF1, 1e-4), (0xF5, 5e-4), (0xF9, 9e-4),
+        (0x00, 0), (0x1D, 29e-3), (0xF3, 3e-4),
     ]
 )
 def test_stmin_decode_encode(expected_stmin_value, expected_stmin_time):
@@ -134,7 +138,7 @@ def test_encode_isotp_canfd(can_fd_tp_inst: CanTp, mocker: MockerFixture, payloa
     assert mock_recv.call_count == expected_recv_call_count
     assert mock_send.call_count == len(expected_transmit_calls)
     for call, expected_sent_data in zip(mock_send.call_args_list, expected_transmit_calls):
-        assert call.args[0] == expected_sent_data
+        assert list(call.args[0]) == expected_sent_data
 
 
 FIRST_FRAME_HEADER_LEN = 2
@@ -209,4 +213,745 @@ def test_encode_isotp_can(can_tp_inst: CanTp, mocker: MockerFixture, payload_to_
     assert mock_recv.call_count == expected_recv_call_count
     assert mock_send.call_count == len(expected_transmit_calls)
     for call, expected_sent_data in zip(mock_send.call_args_list, expected_transmit_calls):
-        assert call.args[0] == expected_sent_data
\ No newline at end of file
+        assert list(call.args[0]) == expected_sent_data
+
+def test_encode_isotp_accepts_bytes(can_tp_inst: CanTp, mocker: MockerFixture):
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", return_value=bytes([0x30, 0x00, 0x00]))
+    mock_send = mocker.patch.object(can_tp_inst, "transmit")
+
+    can_tp_inst.encode_isotp(bytes([0x12] * 8))
+
+    assert [bytes(call.args[0]) for call in mock_send.call_args_list] == [
+        bytes([0x10, 8] + [0x12] * 6),
+        bytes([0x21] + [0x12] * 2 + [0xCC] * 5),
+    ]
+
+
+def test_callback_on_receive_keeps_message_data(can_tp_inst: CanTp, mocker: MockerFixture):
+    msg = mocker.MagicMock(arbitration_id=0x21, data=bytearray([0x03, 0x62, 0xF1, 0x8C, 0, 0, 0, 0]))
+
+    can_tp_inst.callback_onReceive(msg)
+
+    assert can_tp_inst.getNextBufferedMessage() is msg.data
+
+
+def test_decode_isotp_multi_frame(can_tp_inst: CanTp, mocker: MockerFixture):
+    frames = [
+        bytearray([0x10, 0x0A, 0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43]),
+        bytearray([0x21, 0x44, 0x45, 0x46, 0x47, 0xCC, 0xCC, 0xCC]),
+    ]
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", side_effect=frames)
+    mock_send = mocker.patch.object(can_tp_inst, "transmit")
+
+    response = can_tp_inst.decode_isotp_bytes()
+
+    assert response == bytearray([0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43, 0x44, 0x45, 0x46, 0x47])
+    assert list(mock_send.call_args.args[0]) == [0x30, 0x00, 0x1E, 0xCC, 0xCC, 0xCC, 0xCC, 0xCC]
+
+
+def test_decode_isotp_block_size(can_tp_inst: CanTp, mocker: MockerFixture):
+    can_tp_inst.rx_flow_control.block_size = 2
+    can_tp_inst.st_min = 0.005
+    payload = bytes(range(30))
+    frames = [bytes([0x10, 30]) + payload[:6]]
+    frames += [bytes([0x21 + index]) + payload[6 + 7 * index : 13 + 7 * index] for index in range(4)]
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", side_effect=frames)
+    mock_send = mocker.patch.object(can_tp_inst, "transmit")
+
+    response = can_tp_inst.decode_isotp_bytes()
+
+    assert response == payload
+    # one flow control after the first frame, one after the first block, none at the end of the message
+    assert [list(call.args[0]) for call in mock_send.call_args_list] == [
+        [0x30, 0x02, 0x05, 0xCC, 0xCC, 0xCC, 0xCC, 0xCC],
+    ] * 2
+
+
+def test_decode_isotp_wait_frames(can_tp_inst: CanTp, mocker: MockerFixture):
+    can_tp_inst.rx_flow_control = ReceiveFlowControl(wait_frames=2, wft_max=2)
+    mocker.patch.object(ReceiveFlowControl, "wait_interval", 0)
+    frames = [
+        bytearray([0x10, 0x0A, 0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43]),
+        bytearray([0x21, 0x44, 0x45, 0x46, 0x47, 0xCC, 0xCC, 0xCC]),
+    ]
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", side_effect=frames)
+    mock_send = mocker.patch.object(can_tp_inst, "transmit")
+
+    can_tp_inst.decode_isotp_bytes()
+
+    assert [call.args[0][0] for call in mock_send.call_args_list] == [0x31, 0x31, 0x30]
+
+
+def test_decode_isotp_adaptive_flow_control(can_tp_inst: CanTp, mocker: MockerFixture):
+    can_tp_inst.rx_flow_control.adaptive = True
+    frames = [
+        bytearray([0x10, 0x0A, 0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43]),
+        bytearray([0x21, 0x44, 0x45, 0x46, 0x47, 0xCC, 0xCC, 0xCC]),
+    ]
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", side_effect=frames * 2)
+    mock_send = mocker.patch.object(can_tp_inst, "transmit")
+
+    can_tp_inst.decode_isotp_bytes()
+    can_tp_inst.decode_isotp_bytes()
+
+    # STmin is halved after the first clean transfer
+    assert [call.args[0][2] for call in mock_send.call_args_list] == [30, 15]
+
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", side_effect=[frames[0], None])
+    with pytest.raises(TimeoutError):
+        can_tp_inst.decode_isotp_bytes()
+    assert can_tp_inst.rx_flow_control.current_st_min == 0.014
+    assert can_tp_inst.rx_flow_control.current_block_size == 16
+
+
+def test_rx_flow_control_config(mocker: MockerFixture):
+    Config.isotp = IsoTpConfig(
+        req_id=0x12,
+        res_id=0x21,
+        addressing_type="NORMAL",
+        n_ae=0,
+        n_sa=0,
+        n_ta=0,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        rx_block_size=8,
+        rx_st_min=0.001,
+        rx_wait_frames=1,
+        rx_wft_max=0,
+    )
+
+    with pytest.raises(ValueError):
+        CanTp(is_fd=False)
+
+    Config.isotp.rx_wft_max = 1
+    tp = CanTp(is_fd=False)
+
+    assert tp.st_min == 0.001
+    assert list(tp.make_flow_control_frame(8, tp.st_min)[:3]) == [0x30, 0x08, 0x01]
+
+
+def test_decode_isotp_returns_list(can_tp_inst: CanTp, mocker: MockerFixture):
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", return_value=[0x03, 0x7F, 0x22, 0x13, 0xCC])
+
+    assert can_tp_inst.decode_isotp() == [0x7F, 0x22, 0x13]
+
+
+def test_plan_consecutive_frames(can_tp_inst: CanTp):
+    payload = bytes(range(256)) * 2
+
+    plan = can_tp_inst.plan_consecutive_frames(memoryview(payload))
+
+    assert len(plan) == 74
+    assert bytes(plan[0]) == bytes([0x21, 0, 1, 2, 3, 4, 5, 6])
+    assert plan[14][0] == 0x2F
+    assert plan[15][0] == 0x20
+    assert plan[16][0] == 0x21
+    # 512 bytes = 73 * 7 + 1, the last frame is padded
+    assert bytes(plan[73]) == bytes([0x2A, 0xFF] + [0xCC] * 6)
+    assert b"".join(plan.block(0, len(plan)))[1::8] == payload[::7]
+
+
+def test_encode_isotp_block_size(can_tp_inst: CanTp, mocker: MockerFixture):
+    # block size of 2 frames, STmin 0
+    mock_recv = mocker.patch.object(can_tp_inst, "getNextBufferedMessage", return_value=[0x30, 0x02, 0x00])
+    mock_send = mocker.patch.object(can_tp_inst, "transmit")
+
+    can_tp_inst.encode_isotp([0x12] * 34)
+
+    # first frame (6 bytes) + 4 consecutive frames (28 bytes) -> 2 blocks
+    assert mock_recv.call_count == 2
+    assert [call.args[0][0] for call in mock_send.call_args_list] == [0x10, 0x21, 0x22, 0x23, 0x24]
+
+
+def test_encode_isotp_flow_control_wait(can_tp_inst: CanTp, mocker: MockerFixture):
+    can_tp_inst.n_bs = 0.5
+    mock_recv = mocker.patch.object(
+        can_tp_inst, "getNextBufferedMessage", side_effect=[[0x31, 0x00, 0x00], [0x31, 0x00, 0x00], [0x30, 0x00, 0x00]]
+    )
+    mock_send = mocker.patch.object(can_tp_inst, "transmit")
+
+    can_tp_inst.encode_isotp([0x12] * 20)
+
+    assert [call.args[0][0] for call in mock_send.call_args_list] == [0x10, 0x21, 0x22]
+    # N_Bs is restarted by every WAIT frame
+    assert all(0.4 < call.args[0] <= 0.5 for call in mock_recv.call_args_list)
+
+
+def test_encode_isotp_too_many_wait_frames(can_tp_inst: CanTp, mocker: MockerFixture):
+    can_tp_inst.tx_wft_max = 2
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", return_value=[0x31, 0x00, 0x00])
+    mocker.patch.object(can_tp_inst, "transmit")
+
+    with pytest.raises(Exception, match="WAIT"):
+        can_tp_inst.encode_isotp([0x12] * 20)
+
+
+def test_decode_isotp_n_cr(can_tp_inst: CanTp, mocker: MockerFixture):
+    can_tp_inst.n_cr = 0.2
+    frames = [
+        bytearray([0x10, 0x0A, 0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43]),
+        bytearray([0x21, 0x44, 0x45, 0x46, 0x47, 0xCC, 0xCC, 0xCC]),
+    ]
+    mock_recv = mocker.patch.object(can_tp_inst, "getNextBufferedMessage", side_effect=frames)
+    mocker.patch.object(can_tp_inst, "transmit")
+
+    can_tp_inst.decode_isotp_bytes(timeout_s=5)
+
+    first_timeout, consecutive_timeout = (call.args[0] for call in mock_recv.call_args_list)
+    assert 4.9 < first_timeout <= 5
+    assert 0.1 < consecutive_timeout <= 0.2
+
+
+def test_transmit_n_as(can_tp_inst: CanTp, mocker: MockerFixture):
+    can_tp_inst.connection = mocker.Mock()
+    can_tp_inst.transmit(bytes(8))
+
+    can_tp_inst.n_as = -1
+    with pytest.raises(TimeoutError):
+        can_tp_inst.transmit(bytes(8))
+
+
+@pytest.mark.parametrize("is_fd, payload_length", [(True, 70000), (False, 5000), (True, 4095)])
+def test_escape_first_frame_round_trip(mocker: MockerFixture, is_fd, payload_length):
+    Config.isotp = IsoTpConfig(
+        req_id=0x12,
+        res_id=0x21,
+        addressing_type="NORMAL",
+        n_ae=0,
+        n_sa=0,
+        n_ta=0,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+    )
+    tp = CanTp(is_fd=is_fd)
+    payload = bytes(index % 251 for index in range(payload_length))
+    mocker.patch.object(tp, "getNextBufferedMessage", return_value=[0x30, 0x00, 0x00])
+    mock_send = mocker.patch.object(tp, "transmit")
+
+    tp.encode_isotp(payload)
+
+    frames = [bytes(call.args[0]) for call in mock_send.call_args_list]
+    if payload_length > 4095:
+        assert frames[0][:6] == bytes([0x10, 0x00]) + payload_length.to_bytes(4, "big")
+    else:
+        assert frames[0][:2] == bytes([0x1F, 0xFF])
+
+    mocker.patch.object(tp, "getNextBufferedMessage", side_effect=frames)
+    assert tp.decode_isotp_bytes() == payload
+
+
+def test_decode_isotp_longer_than_max_message_length(can_fd_tp_inst: CanTp, mocker: MockerFixture):
+    can_fd_tp_inst.rx_max_message_length = 5000
+    # 4 GiB announced by an escape sequence first frame
+    first_frame = bytes([0x10, 0x00, 0xFF, 0xFF, 0xFF, 0xFF]) + bytes(58)
+    mocker.patch.object(can_fd_tp_inst, "getNextBufferedMessage", return_value=first_frame)
+    mock_send = mocker.patch.object(can_fd_tp_inst, "transmit")
+    new_buffer = mocker.spy(CanTp, "_new_reassembly_buffer")
+
+    with pytest.raises(ValueError, match="maximum of 5000"):
+        can_fd_tp_inst.decode_isotp_bytes()
+
+    # overflow flow control
+    assert bytes(mock_send.call_args.args[0])[:3] == bytes([0x32, 0x00, 0x00])
+    new_buffer.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "single_frame",
+    [
+        pytest.param([0x05, 0x62, 0xF1], id="SF_DL longer than the frame"),
+        pytest.param([0x0F, 0x62, 0xF1, 0x8C, 0x01, 0x02, 0x03, 0x04], id="SF_DL of 15 bytes in a classic frame"),
+        pytest.param([0x00, 0x00] + [0xCC] * 10, id="escape sequence SF_DL of 0 bytes"),
+        pytest.param([0x00, 0x20] + [0x62] * 10, id="escape sequence SF_DL longer than the frame"),
+    ],
+)
+@pytest.mark.parametrize("use_buffer", [False, True], ids=["allocated", "caller buffer"])
+def test_decode_isotp_invalid_single_frame(can_fd_tp_inst: CanTp, mocker: MockerFixture, single_frame, use_buffer):
+    mocker.patch.object(can_fd_tp_inst, "getNextBufferedMessage", return_value=bytes(single_frame))
+
+    with pytest.raises(ValueError, match="Single frame"):
+        can_fd_tp_inst.decode_isotp_bytes(buffer=bytearray(64) if use_buffer else None)
+
+
+@pytest.mark.parametrize(
+    "is_fd, first_frame",
+    [
+        pytest.param(True, [0x10, 0x00, 0x00, 0x00, 0x0F, 0xFF] + [0x11] * 58, id="escape sequence of 4095 bytes"),
+        pytest.param(False, [0x10, 0x07] + [0x11] * 6, id="7 bytes in a classic first frame"),
+        pytest.param(True, [0x10, 0x3E] + [0x11] * 62, id="62 bytes in a CAN FD first frame"),
+    ],
+)
+def test_decode_isotp_first_frame_too_short(is_fd, first_frame, mocker: MockerFixture):
+    Config.isotp = IsoTpConfig(
+        req_id=0x12,
+        res_id=0x21,
+        addressing_type="NORMAL",
+        n_ae=0,
+        n_sa=0,
+        n_ta=0,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+    )
+    tp = CanTp(is_fd=is_fd)
+    mocker.patch.object(tp, "getNextBufferedMessage", return_value=bytes(first_frame))
+    mock_send = mocker.patch.object(tp, "transmit")
+
+    with pytest.raises(ValueError, match="short enough"):
+        tp.decode_isotp_bytes()
+    mock_send.assert_not_called()
+
+
+def test_encode_isotp_too_large(can_fd_tp_inst: CanTp, mocker: MockerFixture):
+    # avoid allocating 4 GB
+    mocker.patch("uds.uds_communications.TransportProtocols.Can.CanTp.CANTP_MAX_ESCAPE_PAYLOAD_LENGTH", 5000)
+
+    with pytest.raises(ValueError):
+        can_fd_tp_inst.encode_isotp(bytes(5001))
+
+
+@pytest.mark.parametrize(
+    "flow_control, expected_transmit_many_calls, expected_transmit_calls",
+    [
+        pytest.param([0x30, 0x00, 0x00], 1, 1, id="no block size and no STmin -> one block"),
+        pytest.param([0x30, 0x02, 0x00], 2, 1, id="block size of 2 frames -> two blocks"),
+        pytest.param([0x30, 0x00, 0xF1], 0, 5, id="STmin requested -> frame by frame"),
+    ]
+)
+def test_encode_isotp_transmit_many(can_tp_inst: CanTp, mocker: MockerFixture, flow_control, expected_transmit_many_calls, expected_transmit_calls):
+    connector = mocker.MagicMock(spec=["transmit", "transmit_many"])
+    can_tp_inst.connection = connector
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", return_value=flow_control)
+
+    can_tp_inst.encode_isotp([0x12] * 34)
+
+    assert connector.transmit_many.call_count == expected_transmit_many_calls
+    assert connector.transmit.call_count == expected_transmit_calls
+    frames = [frame for call in connector.transmit_many.call_args_list for frame in call.args[0]]
+    frames += [call.args[0] for call in connector.transmit.call_args_list[1:]]
+    assert [frame[0] for frame in frames] == [0x21, 0x22, 0x23, 0x24]
+    assert all(call.args[1] == 0x12 for call in connector.transmit_many.call_args_list)
+
+
+def test_supports_block_transmission(can_tp_inst: CanTp, mocker: MockerFixture):
+    can_tp_inst.connection = mocker.MagicMock(spec=["transmit"])
+    assert can_tp_inst.supports_block_transmission is False
+
+    can_tp_inst.connection = mocker.MagicMock(spec=["transmit", "transmit_many"])
+    assert can_tp_inst.supports_block_transmission is True
+
+
+@pytest.mark.parametrize(
+    "accepts_bytes, expected_lists",
+    [
+        pytest.param(True, False, id="bytes-like frames"),
+        pytest.param(None, True, id="undeclared -> list frames"),
+    ]
+)
+def test_connector_frame_type(can_tp_inst: CanTp, mocker: MockerFixture, accepts_bytes, expected_lists):
+    connector = mocker.MagicMock(spec=["transmit", "transmit_many", "accepts_bytes"])
+    connector.accepts_bytes = accepts_bytes
+    can_tp_inst.connection = connector
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", return_value=[0x30, 0x00, 0x00])
+
+    can_tp_inst.encode_isotp([0x12] * 10)
+
+    frames = [connector.transmit.call_args.args[0], *connector.transmit_many.call_args.args[0]]
+    assert [isinstance(frame, list) for frame in frames] == [expected_lists] * 2
+    assert list(frames[0]) == [0x10, 0x0A] + [0x12] * 6
+
+
+@pytest.fixture
+def functional_tp():
+    Config.isotp = IsoTpConfig(
+        req_id=0x7E0,
+        res_id=0x7E8,
+        addressing_type="NORMAL",
+        n_ae=0,
+        n_sa=0,
+        n_ta=0,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        func_req_id=0x7DF,
+        func_responders={0x7E8: 0x7E0, 0x7E9: 0x7E1},
+    )
+    CanTp.PADDING_PATTERN = 0xCC
+    return CanTp(is_fd=False)
+
+
+def test_functional_request(functional_tp: CanTp, mocker: MockerFixture):
+    functional_tp.connection = mocker.Mock()
+
+    functional_tp.send([0x3E, 0x00], functionalReq=True)
+
+    assert functional_tp.connection.transmit.call_args.args[1] == 0x7DF
+    with pytest.raises(ValueError):
+        functional_tp.send([0x22] * 10, functionalReq=True)
+
+
+def test_recv_functional(functional_tp: CanTp, mocker: MockerFixture):
+    def on_transmit(data, arbitration_id):
+        if arbitration_id == 0x7DF:
+            # one ECU answers with a single frame, the other one with a segmented message
+            functional_tp.callback_onReceive(can.Message(arbitration_id=0x7E8, data=[0x02, 0x50, 0x03, 0, 0, 0, 0, 0]))
+            functional_tp.callback_onReceive(
+                can.Message(arbitration_id=0x7E9, data=[0x10, 0x08, 0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43])
+            )
+            # frames from other IDs are not part of the responses
+            functional_tp.callback_onReceive(can.Message(arbitration_id=0x7EA, data=[0x02, 0x50, 0x03]))
+        elif arbitration_id == 0x7E1 and data[0] == 0x30:
+            functional_tp.callback_onReceive(can.Message(arbitration_id=0x7E9, data=[0x21, 0x44, 0x45, 0, 0, 0, 0, 0]))
+
+    functional_tp.connection = mocker.Mock()
+    functional_tp.connection.transmit.side_effect = on_transmit
+
+    functional_tp.send([0x10, 0x03], functionalReq=True)
+    responses = functional_tp.recv_functional(0.5)
+
+    assert responses == {
+        0x7E8: [[0x50, 0x03]],
+        0x7E9: [[0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43, 0x44, 0x45]],
+    }
+    flow_controls = [call.args for call in functional_tp.connection.transmit.call_args_list if call.args[0][0] == 0x30]
+    assert [arbitration_id for _, arbitration_id in flow_controls] == [0x7E1]
+
+
+def test_recv_functional_fixed_flow_control(functional_tp: CanTp, mocker: MockerFixture):
+    functional_tp.rx_flow_control = ReceiveFlowControl(block_size=1, st_min=0.020, adaptive=True)
+    consecutive_frames = {
+        0x7E8: [[0x21, 0x41, 0x42, 0x43, 0x44, 0x45, 0x46, 0x47], [0x22, 0x48, 0x49, 0, 0, 0, 0, 0]],
+        0x7E9: [[0x21, 0x51, 0x52, 0x53, 0x54, 0x55, 0x56, 0x57], [0x22, 0x58, 0x59, 0, 0, 0, 0, 0]],
+    }
+    physical_ids = {0x7E0: 0x7E8, 0x7E1: 0x7E9}
+
+    def on_transmit(data, arbitration_id):
+        if arbitration_id == 0x7DF:
+            for resId in consecutive_frames:
+                functional_tp.callback_onReceive(
+                    can.Message(arbitration_id=resId, data=[0x10, 0x0F, 0x62, 0x01, 0x02, 0x03, 0x04, 0x05])
+                )
+        elif data[0] == 0x30:
+            resId = physical_ids[arbitration_id]
+            functional_tp.callback_onReceive(can.Message(arbitration_id=resId, data=consecutive_frames[resId].pop(0)))
+
+    functional_tp.connection = mocker.Mock()
+    functional_tp.connection.transmit.side_effect = on_transmit
+
+    functional_tp.send([0x22, 0x01, 0x02], functionalReq=True)
+    responses = functional_tp.recv_functional(0.5)
+
+    assert sorted(responses) == [0x7E8, 0x7E9]
+    flow_controls = [call.args[0] for call in functional_tp.connection.transmit.call_args_list if call.args[0][0] == 0x30]
+    # the blocks received cleanly by a responder do not speed up the others, nor the physical requests
+    assert len(flow_controls) == 4
+    assert all(list(frame[:3]) == [0x30, 0x01, 0x14] for frame in flow_controls)
+    assert functional_tp.rx_flow_control.current_block_size == 1
+    assert functional_tp.rx_flow_control.current_st_min == 0.020
+
+
+def test_recv_functional_timeout(functional_tp: CanTp, mocker: MockerFixture):
+    functional_tp.connection = mocker.Mock()
+
+    functional_tp.send([0x3E, 0x00], functionalReq=True)
+    start = time.perf_counter()
+    responses = functional_tp.recv_functional(0.05)
+
+    assert responses == {}
+    assert time.perf_counter() - start >= 0.05
+
+
+@pytest.mark.parametrize(
+    "addressing_type, tx_id, tx_prefix, rx_id, rx_prefix",
+    [
+        pytest.param("NORMAL", 0x7E0, b"", 0x7E8, b"", id="normal"),
+        pytest.param("NORMAL_FIXED", 0x18DA10F1, b"", 0x18DAF110, b"", id="normal fixed"),
+        pytest.param("EXTENDED", 0x7E0, b"\x10", 0x7E8, b"\xF1", id="extended"),
+        pytest.param("MIXED", 0x7E0, b"\x55", 0x7E8, b"\x55", id="mixed"),
+    ],
+)
+def test_addressing_types(mocker: MockerFixture, addressing_type, tx_id, tx_prefix, rx_id, rx_prefix):
+    Config.isotp = IsoTpConfig(
+        req_id=0x7E0,
+        res_id=0x7E8,
+        addressing_type=addressing_type,
+        n_ae=0x55,
+        n_sa=0xF1,
+        n_ta=0x10,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+    )
+    CanTp.PADDING_PATTERN = 0xCC
+    tp = CanTp(connector=mocker.Mock(), is_fd=False)
+
+    tp.send([0x22, 0xF1, 0x8C])
+
+    frame, arbitration_id = tp.connection.transmit.call_args.args
+    assert arbitration_id == tx_id
+    assert bytes(frame) == tx_prefix + bytes([0x03, 0x22, 0xF1, 0x8C]) + b"\xCC" * (4 - len(tx_prefix))
+
+    response = rx_prefix + bytes([0x03, 0x62, 0xF1, 0x8C, 0xCC, 0xCC, 0xCC, 0xCC])[: 8 - len(rx_prefix)]
+    # other IDs and other address extensions are ignored
+    tp.callback_onReceive(can.Message(arbitration_id=rx_id + 1, data=response))
+    if rx_prefix:
+        tp.callback_onReceive(can.Message(arbitration_id=rx_id, data=b"\x00" + response[1:]))
+        tp.callback_onReceive(can.Message(arbitration_id=rx_id, data=b""))
+    tp.callback_onReceive(can.Message(arbitration_id=rx_id, data=response))
+
+    assert tp.recv(0) == [0x62, 0xF1, 0x8C]
+    assert tp.getNextBufferedMessage() is None
+
+
+@pytest.mark.parametrize(
+    "addressing_type, func_req_id, tx_id, functional_tx_id, functional_prefix",
+    [
+        pytest.param("NORMAL_FIXED", None, 0x18DA10F1, 0x18DB33F1, b"", id="normal fixed"),
+        pytest.param("NORMAL_FIXED", 0x18DB77F1, 0x18DA10F1, 0x18DB77F1, b"", id="normal fixed, func_req_id"),
+        pytest.param("EXTENDED", 0x7DF, 0x7E0, 0x7DF, b"\x33", id="extended"),
+        pytest.param("MIXED", 0x7DF, 0x7E0, 0x7DF, b"\x55", id="mixed"),
+    ],
+)
+def test_functional_request_addressing_types(
+    mocker: MockerFixture, addressing_type, func_req_id, tx_id, functional_tx_id, functional_prefix
+):
+    Config.isotp = IsoTpConfig(
+        req_id=0x7E0,
+        res_id=0x7E8,
+        addressing_type=addressing_type,
+        n_ae=0x55,
+        n_sa=0xF1,
+        n_ta=0x10,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        func_req_id=func_req_id,
+    )
+    tp = CanTp(connector=mocker.Mock(), is_fd=False)
+
+    tp.send([0x3E, 0x00], functionalReq=True)
+    frame, arbitration_id = tp.connection.transmit.call_args.args
+    assert arbitration_id == functional_tx_id
+    assert bytes(frame).startswith(functional_prefix + b"\x02\x3E\x00")
+
+    # the physical requests still go to the ECU
+    tp.send([0x3E, 0x00])
+    assert tp.connection.transmit.call_args.args[1] == tx_id
+
+
+def test_mixed_addressing_segmented_frames_length(mocker: MockerFixture):
+    Config.isotp = IsoTpConfig(
+        req_id=0x7E0,
+        res_id=0x7E8,
+        addressing_type="MIXED",
+        n_ae=0x55,
+        n_sa=0xF1,
+        n_ta=0x10,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+    )
+    tp = CanTp(connector=mocker.Mock(spec=["transmit"]), is_fd=False)
+    mocker.patch.object(tp, "getNextBufferedMessage", return_value=[0x30, 0x00, 0x00])
+
+    tp.send(bytes(20))
+
+    frames = [bytes(call.args[0]) for call in tp.connection.transmit.call_args_list]
+    # address extension included, the frames stay within the 8 bytes of classic CAN
+    assert [len(frame) for frame in frames] == [8, 8, 8, 8]
+    assert all(frame[0] == 0x55 for frame in frames)
+    assert [frame[1] >> 4 for frame in frames] == [1, 2, 2, 2]
+
+
+@pytest.mark.parametrize(
+    "padding, is_fd, payload_length, expected_frame_length",
+    [
+        pytest.param("MANDATORY", False, 2, 8, id="mandatory, CAN"),
+        pytest.param("MANDATORY", True, 2, 8, id="mandatory, CAN FD"),
+        pytest.param("MANDATORY", True, 9, 12, id="mandatory, CAN FD above 8 bytes"),
+        pytest.param("OPTIMIZED_FD", False, 2, 8, id="optimized, CAN"),
+        pytest.param("OPTIMIZED_FD", True, 2, 3, id="optimized, CAN FD"),
+        pytest.param("OPTIMIZED_FD", True, 9, 12, id="optimized, CAN FD above 8 bytes"),
+        pytest.param("NONE", False, 2, 3, id="none, CAN"),
+        pytest.param("NONE", True, 21, 24, id="none, CAN FD above 8 bytes"),
+        pytest.param("MANDATORY", True, 62, 64, id="longest CAN FD single frame"),
+    ],
+)
+def test_padding_types(mocker: MockerFixture, padding, is_fd, payload_length, expected_frame_length):
+    Config.isotp = IsoTpConfig(
+        req_id=0x12,
+        res_id=0x21,
+        addressing_type="NORMAL",
+        n_ae=0,
+        n_sa=0,
+        n_ta=0,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        padding=padding,
+        padding_pattern=0xAA,
+    )
+    tp = CanTp(connector=mocker.Mock(spec=["transmit"]), is_fd=is_fd)
+
+    tp.send(bytes(range(1, payload_length + 1)))
+
+    frame = bytes(tp.connection.transmit.call_args.args[0])
+    assert len(frame) == expected_frame_length
+    assert frame[0] >> 4 == CanTpMessageType.SINGLE_FRAME
+    assert set(frame[payload_length + (1 if frame[0] else 2) :]) <= {0xAA}
+
+
+def test_padding_types_segmented_message(mocker: MockerFixture):
+    Config.isotp = IsoTpConfig(
+        req_id=0x12,
+        res_id=0x21,
+        addressing_type="NORMAL",
+        n_ae=0,
+        n_sa=0,
+        n_ta=0,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        padding="OPTIMIZED_FD",
+    )
+    tp = CanTp(connector=mocker.Mock(spec=["transmit"]), is_fd=True)
+    mocker.patch.object(tp, "getNextBufferedMessage", return_value=[0x30, 0x00, 0x00])
+    payload = bytes(index % 256 for index in range(63 + 62 + 4))
+
+    tp.send(payload)
+
+    frames = [bytes(call.args[0]) for call in tp.connection.transmit.call_args_list]
+    assert [len(frame) for frame in frames] == [64, 64, 5]
+    # flow control frames are not padded either
+    assert len(tp.make_flow_control_frame()) == 3
+
+    mocker.patch.object(tp, "getNextBufferedMessage", side_effect=frames)
+    assert tp.decode_isotp_bytes() == payload
+
+
+def test_unknown_padding_type():
+    Config.isotp = IsoTpConfig(
+        req_id=0x12,
+        res_id=0x21,
+        addressing_type="NORMAL",
+        n_ae=0,
+        n_sa=0,
+        n_ta=0,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        padding="SOMETIMES",
+    )
+    with pytest.raises(Exception):
+        CanTp()
+
+
+def test_decode_isotp_into_buffer(can_tp_inst: CanTp, mocker: MockerFixture):
+    frames = [
+        bytearray([0x10, 0x0A, 0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43]),
+        bytearray([0x21, 0x44, 0x45, 0x46, 0x47, 0xCC, 0xCC, 0xCC]),
+        bytearray([0x03, 0x62, 0xF1, 0x8C, 0xCC, 0xCC, 0xCC, 0xCC]),
+    ]
+    mocker.patch.object(can_tp_inst, "getNextBufferedMessage", side_effect=frames)
+    mocker.patch.object(can_tp_inst, "transmit")
+    buffer = bytearray(16)
+
+    response = can_tp_inst.decode_isotp_bytes(buffer=buffer)
+
+    assert response == b"\x62\xF1\x8C\x41\x42\x43\x44\x45\x46\x47"
+    assert response.obj is buffer
+    # the same memory is reused for the next message
+    assert can_tp_inst.decode_isotp_bytes(buffer=buffer) == b"\x62\xF1\x8C"
+    assert buffer[:4] == b"\x62\xF1\x8C\x41"
+
+
+def test_decode_isotp_buffer_overflow(can_tp_inst: CanTp, mocker: MockerFixture):
+    mocker.patch.object(
+        can_tp_inst, "getNextBufferedMessage", return_value=bytearray([0x10, 0x0A, 0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43])
+    )
+    mock_send = mocker.patch.object(can_tp_inst, "transmit")
+
+    with pytest.raises(ValueError):
+        can_tp_inst.decode_isotp_bytes(buffer=bytearray(8))
+
+    # flow control with the overflow status
+    assert mock_send.call_args.args[0][0] == 0x32
+
+
+def test_decode_isotp_frames_shorter_than_expected(can_fd_tp_inst: CanTp, mocker: MockerFixture):
+    # classic CAN frames received by a CAN FD instance
+    frames = [
+        bytearray([0x10, 0x0A, 0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43]),
+        bytearray([0x21, 0x44, 0x45, 0x46, 0x47, 0xCC, 0xCC, 0xCC]),
+    ]
+    mocker.patch.object(can_fd_tp_inst, "getNextBufferedMessage", side_effect=frames)
+    mocker.patch.object(can_fd_tp_inst, "transmit")
+
+    response = can_fd_tp_inst.decode_isotp_bytes()
+
+    assert response == bytearray([0x62, 0xF1, 0x8C, 0x41, 0x42, 0x43, 0x44, 0x45, 0x46, 0x47])
+    # no view is left on the returned message
+    response += b"\x00"
+
+
+def test_frame_capture(can_tp_inst: CanTp, mocker: MockerFixture):
+    connector = mocker.Mock(spec=["transmit"])
+    can_tp_inst.connection = connector
+    # the flow control is received once the first frame is sent
+    connector.transmit.side_effect = lambda data, req_id: data[0] == 0x10 and can_tp_inst.callback_onReceive(
+        can.Message(arbitration_id=0x21, data=[0x30, 0x00, 0x00], timestamp=time.time())
+    )
+
+    can_tp_inst.encode_isotp([0x12] * 10)
+
+    frames = can_tp_inst.capture.frames()
+    assert [(frame.arbitration_id, frame.is_tx, frame.data[0]) for frame in frames] == [
+        (0x12, True, 0x10),
+        (0x21, False, 0x30),
+        (0x12, True, 0x21),
+    ]
+    assert frames[0].data == bytes([0x10, 0x0A] + [0x12] * 6)
+    assert frames[1].dlc == 3
+    assert not frames[0].is_fd
+
+
+@pytest.mark.parametrize("suffix", [".asc", ".blf", ".bin"])
+def test_frame_capture_save(can_tp_inst: CanTp, mocker: MockerFixture, tmp_path, suffix):
+    can_tp_inst.connection = mocker.Mock(spec=["transmit"])
+    can_tp_inst.transmit([0x02, 0x10, 0x03])
+    can_tp_inst.callback_onReceive(
+        can.Message(arbitration_id=0x21, data=[0x02, 0x50, 0x03], timestamp=time.time() + 0.001)
+    )
+    path = tmp_path / f"trace{suffix}"
+
+    can_tp_inst.capture.save(path)
+
+    if suffix == ".bin":
+        frames = load_trace(path)
+        assert frames == can_tp_inst.capture.frames()
+    else:
+        with can.LogReader(path) as reader:
+            frames = list(reader)
+        assert [(frame.arbitration_id, frame.is_rx) for frame in frames] == [(0x12, False), (0x21, True)]
+    assert bytes(frames[1].data) == bytes([0x02, 0x50, 0x03])
+
+
+def test_frame_capture_ring_overwrites_oldest_frames():
+    capture = FrameCapture(capacity=4)
+
+    for index in range(6):
+        capture.rx.record(float(index), 0x21, bytes([index]))
+
+    assert [frame.data[0] for frame in capture.frames()] == [2, 3, 4, 5]
+    assert capture.overwritten == 2
+
+
+def test_frame_capture_disabled():
+    Config.isotp = IsoTpConfig(
+        req_id=0x12,
+        res_id=0x21,
+        addressing_type="NORMAL",
+        n_ae=0,
+        n_sa=0,
+        n_ta=0,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        capture_size=0,
+    )
+
+    tp = CanTp(is_fd=False)
+    tp.callback_onReceive(can.Message(arbitration_id=0x21, data=[0x02, 0x50, 0x03]))
+
+    assert tp.capture is None
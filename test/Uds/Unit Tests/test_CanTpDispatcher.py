@@ -0,0 +1,110 @@
+import threading
+
+import can
+import pytest
+
+from uds.config import Config, IsoTpConfig
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.TransportProtocols.Can.CanTpDispatcher import CanTpDispatcher
+
+
+def make_tp(res_id):
+    Config.isotp = IsoTpConfig(
+        req_id=res_id - 8,
+        res_id=res_id,
+        addressing_type="NORMAL",
+        n_ae=0,
+        n_sa=0,
+        n_ta=0,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+    )
+    return CanTp(is_fd=False)
+
+
+class MixedTp:
+    """Stands for a mixed addressing transport."""
+
+    def __init__(self, res_id, n_ae):
+        self.resIdAddress = res_id
+        self.rx_address_extension = n_ae
+        self.received = []
+
+    def callback_onReceive(self, msg):
+        self.received.append(msg)
+
+
+def test_dispatch_by_arbitration_id():
+    dispatcher = CanTpDispatcher()
+    transports = [make_tp(0x7E8 + index) for index in range(4)]
+    for tp in transports:
+        dispatcher.register(tp)
+
+    dispatcher(can.Message(arbitration_id=0x7EA, data=[0x01, 0x50], is_extended_id=False))
+    dispatcher(can.Message(arbitration_id=0x123, data=[0x01, 0x50], is_extended_id=False))
+
+    assert transports[2].getNextBufferedMessage() == bytearray([0x01, 0x50])
+    assert all(tp.getNextBufferedMessage() is None for tp in transports if tp is not transports[2])
+    assert dispatcher.counters() == {0x7E8: 0, 0x7E9: 0, 0x7EA: 1, 0x7EB: 0}
+    assert dispatcher.unrouted == 1
+
+    dispatcher.reset_counters()
+    assert dispatcher.counters()[0x7EA] == 0
+    assert dispatcher.unrouted == 0
+
+
+def test_dispatch_by_address_extension():
+    dispatcher = CanTpDispatcher()
+    first, second = MixedTp(0x700, 0x01), MixedTp(0x700, 0x02)
+    dispatcher.register(first)
+    dispatcher.register(second)
+
+    dispatcher(can.Message(arbitration_id=0x700, data=[0x02, 0x01, 0x50]))
+
+    assert first.received == []
+    assert len(second.received) == 1
+    assert dispatcher.counters() == {(0x700, 0x01): 0, (0x700, 0x02): 1}
+
+    dispatcher.unregister(second)
+    dispatcher(can.Message(arbitration_id=0x700, data=[0x02, 0x01, 0x50]))
+    assert dispatcher.unrouted == 1
+    assert list(dispatcher.counters()) == [(0x700, 0x01)]
+
+
+def test_register_twice():
+    dispatcher = CanTpDispatcher()
+    dispatcher.register(make_tp(0x7E8))
+
+    with pytest.raises(ValueError):
+        dispatcher.register(make_tp(0x7E8))
+
+
+def test_unregister_unknown():
+    dispatcher = CanTpDispatcher()
+
+    with pytest.raises(ValueError):
+        dispatcher.unregister(make_tp(0x7E8))
+
+
+def test_register_while_dispatching():
+    dispatcher = CanTpDispatcher()
+    receiver = MixedTp(0x100, None)
+    dispatcher.register(receiver)
+    message = can.Message(arbitration_id=0x100, data=[0x01, 0x50])
+    running = True
+
+    def notifier():
+        while running:
+            dispatcher(message)
+
+    thread = threading.Thread(target=notifier)
+    thread.start()
+    try:
+        for res_id in range(0x200, 0x400):
+            dispatcher.register(MixedTp(res_id, None))
+    finally:
+        running = False
+        thread.join()
+
+    assert len(dispatcher.counters()) == 0x201
+    assert dispatcher.counters()[0x100] == len(receiver.received)
@@ -0,0 +1,61 @@
+import pytest
+
+from uds.uds_communications.TransportProtocols.Can.CanTpFlowControl import (
+    BACK_OFF_BLOCK_SIZE,
+    ReceiveFlowControl,
+    quantize_st_min,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(0.0, 0.0), (0.00005, 0.0), (0.0003, 0.0003), (0.00095, 0.0009), (0.0075, 0.007), (0.03, 0.03), (0.2, 0.127)],
+)
+def test_quantize_st_min(value, expected):
+    assert quantize_st_min(value) == expected
+
+
+def test_static_flow_control():
+    flow_control = ReceiveFlowControl(block_size=4, st_min=0.010)
+
+    flow_control.update(clean=True)
+    flow_control.update(clean=False)
+
+    assert flow_control.current_block_size == 4
+    assert flow_control.current_st_min == 0.010
+
+
+def test_adaptive_flow_control_speeds_up():
+    flow_control = ReceiveFlowControl(block_size=64, st_min=0.010, adaptive=True)
+
+    flow_control.update(clean=True)
+    assert (flow_control.current_block_size, flow_control.current_st_min) == (128, 0.005)
+
+    flow_control.update(clean=True)
+    assert (flow_control.current_block_size, flow_control.current_st_min) == (0, 0.002)
+
+    for _ in range(5):
+        flow_control.update(clean=True)
+    assert (flow_control.current_block_size, flow_control.current_st_min) == (0, 0.0)
+
+
+def test_adaptive_flow_control_backs_off():
+    flow_control = ReceiveFlowControl(block_size=0, st_min=0.0, adaptive=True)
+
+    flow_control.update(clean=False)
+    assert (flow_control.current_block_size, flow_control.current_st_min) == (BACK_OFF_BLOCK_SIZE, 0.001)
+
+    flow_control.update(clean=False)
+    assert (flow_control.current_block_size, flow_control.current_st_min) == (BACK_OFF_BLOCK_SIZE // 2, 0.002)
+
+    flow_control.reset()
+    assert (flow_control.current_block_size, flow_control.current_st_min) == (0, 0.0)
+
+
+@pytest.mark.parametrize(
+    "parameters",
+    [{"block_size": 256}, {"st_min": 0.128}, {"st_min": -1}, {"wait_frames": 2, "wft_max": 1}],
+)
+def test_invalid_parameters(parameters):
+    with pytest.raises(ValueError):
+        ReceiveFlowControl(**parameters)
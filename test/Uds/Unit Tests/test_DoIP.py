@@ -0,0 +1,159 @@
+import time
+
+import pytest
+
+from uds.config import Config, DoIPConfig
+from uds.factories import TpFactory
+from uds.uds_communications.TransportProtocols.DoIP.DoIPConnection import DoIPConnection
+from uds.uds_communications.TransportProtocols.DoIP.DoIPServer import DoIPServer
+from uds.uds_communications.TransportProtocols.DoIP.DoIPTypes import DoIPPayloadType, DoIPRoutingActivationCode
+
+ECU_ADDRESS = 0x1010
+OTHER_ECU_ADDRESS = 0x1011
+FUNCTIONAL_ADDRESS = 0xE400
+
+
+def positive_response(target_address, request):
+    return [bytes([request[0] + 0x40]) + request[1:]]
+
+
+def make_config(server, **kwargs):
+    host, port = server.address
+    Config.doip = DoIPConfig(
+        host=host, port=port, target_address=ECU_ADDRESS, functional_address=FUNCTIONAL_ADDRESS, **kwargs
+    )
+
+
+@pytest.fixture
+def server():
+    with DoIPServer(positive_response, nodes=(ECU_ADDRESS, OTHER_ECU_ADDRESS)) as server:
+        make_config(server)
+        yield server
+        DoIPConnection.close_all()
+
+
+def wait_for(condition, timeout=1.0):
+    end = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < end:
+        time.sleep(0.001)
+    return condition()
+
+
+def test_diagnostic_message(server):
+    tp = TpFactory.select_transport_protocol("doip")
+
+    tp.send([0x22, 0xF1, 0x90])
+
+    assert tp.recv(1) == [0x62, 0xF1, 0x90]
+    assert server.received == [(ECU_ADDRESS, bytes([0x22, 0xF1, 0x90]))]
+    assert tp.connection.entity_address == server.logical_address
+    tp.close()
+
+
+def test_large_diagnostic_message(server):
+    tp = TpFactory.select_transport_protocol("doip")
+    payload = bytes([0x36, 0x01]) + bytes(range(256)) * 256
+
+    tp.send(payload)
+
+    assert bytes(tp.decode_isotp_bytes(1)) == bytes([0x76]) + payload[1:]
+    tp.close()
+
+
+def test_routing_activation_refused():
+    with DoIPServer(positive_response, activation_code=DoIPRoutingActivationCode.UNKNOWN_SOURCE_ADDRESS) as server:
+        make_config(server)
+        with pytest.raises(ConnectionError, match="UNKNOWN_SOURCE_ADDRESS"):
+            TpFactory.select_transport_protocol("doip")
+
+
+def test_unknown_target_address(server):
+    tp = TpFactory.select_transport_protocol("doip", target_address=0x2000)
+
+    with pytest.raises(Exception, match="UNKNOWN_TARGET_ADDRESS"):
+        tp.send([0x3E, 0x00])
+    tp.close()
+
+
+def test_recv_timeout(server):
+    tp = TpFactory.select_transport_protocol("doip")
+
+    with pytest.raises(TimeoutError):
+        tp.recv(0.01)
+    tp.close()
+
+
+def test_functional_request(server):
+    tp = TpFactory.select_transport_protocol("doip")
+
+    tp.send([0x3E, 0x00], functionalReq=True)
+
+    assert tp.recv(1) == [0x7E, 0x00]
+    assert server.received == [(FUNCTIONAL_ADDRESS, bytes([0x3E, 0x00]))]
+    tp.close()
+
+
+def test_alive_check(server):
+    tp = TpFactory.select_transport_protocol("doip")
+
+    server.send_alive_check()
+
+    assert wait_for(lambda: server.alive_check_responses == [Config.doip.source_address])
+    tp.close()
+
+
+def test_connection_shared_between_targets(server):
+    tp = TpFactory.select_transport_protocol("doip")
+    other_tp = TpFactory.select_transport_protocol("doip", target_address=OTHER_ECU_ADDRESS)
+
+    tp.send([0x10, 0x01])
+    other_tp.send([0x10, 0x03])
+
+    assert other_tp.recv(1) == [0x50, 0x03]
+    assert tp.recv(1) == [0x50, 0x01]
+    assert tp.connection is other_tp.connection
+    assert server.connection_count == 1
+    with pytest.raises(ValueError):
+        TpFactory.select_transport_protocol("doip")
+    tp.close()
+    other_tp.close()
+
+
+@pytest.mark.parametrize("keep_alive, connection_count", [(True, 1), (False, 2)])
+def test_connection_keep_alive(server, keep_alive, connection_count):
+    make_config(server, keep_alive=keep_alive)
+
+    for _ in range(2):
+        tp = TpFactory.select_transport_protocol("doip")
+        tp.send([0x3E, 0x00])
+        assert tp.recv(1) == [0x7E, 0x00]
+        tp.close()
+
+    assert server.connection_count == connection_count
+    assert tp.connection.closed is not keep_alive
+
+
+def test_malformed_messages_dropped(server):
+    tp = TpFactory.select_transport_protocol("doip")
+    entity_connection = server._connections[0]
+
+    entity_connection.send(DoIPPayloadType.GENERIC_NACK, b"")
+    entity_connection.send(DoIPPayloadType.DIAGNOSTIC_MESSAGE, b"\x10")
+    # acknowledgement without its code
+    addresses = ECU_ADDRESS.to_bytes(2, "big") + Config.doip.source_address.to_bytes(2, "big")
+    entity_connection.send(DoIPPayloadType.DIAGNOSTIC_MESSAGE_ACK, addresses)
+    tp.send([0x3E, 0x00])
+
+    assert tp.recv(1) == [0x7E, 0x00]
+    assert not tp.connection.closed
+    tp.close()
+
+
+def test_connection_lost(server):
+    tp = TpFactory.select_transport_protocol("doip")
+
+    server.stop()
+
+    with pytest.raises(ConnectionError):
+        tp.recv(1)
+    tp.close()
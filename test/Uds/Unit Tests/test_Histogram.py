@@ -0,0 +1,64 @@
+import pytest
+
+from uds.uds_communications.Utilities.Histogram import LatencyHistogram
+
+
+def test_empty():
+    histogram = LatencyHistogram()
+
+    assert histogram.count == 0
+    assert histogram.mean == 0
+    assert histogram.percentile(99) == 0
+    assert list(histogram.buckets()) == []
+
+
+def test_exact_below_128_us():
+    histogram = LatencyHistogram()
+    for microseconds in (5, 17, 17, 100):
+        histogram.record(microseconds * 1e-6 + 1e-9)
+
+    assert histogram.percentile(50) == pytest.approx(17e-6)
+    assert histogram.percentile(100) == pytest.approx(100e-6)
+    assert [count for _, count in histogram.buckets()] == [1, 2, 1]
+
+
+def test_relative_precision():
+    histogram = LatencyHistogram()
+    # 1 ms to 10 s
+    for milliseconds in range(1, 10001):
+        histogram.record(milliseconds * 1e-3)
+
+    assert histogram.count == 10000
+    assert histogram.mean == pytest.approx(5.0005)
+    assert histogram.min == pytest.approx(1e-3)
+    assert histogram.max == pytest.approx(10.0)
+    for percent in (1, 50, 90, 99, 99.9):
+        assert histogram.percentile(percent) == pytest.approx(percent / 10, rel=1 / 64)
+    assert histogram.percentile(100) == pytest.approx(10.0)
+
+
+def test_longer_than_max_value():
+    histogram = LatencyHistogram(max_value=1.0)
+    histogram.record(0.5)
+    histogram.record(30.0)
+
+    assert histogram.percentile(100) == pytest.approx(1.0, rel=1 / 64)
+    assert histogram.max == 30.0
+
+
+def test_merge_and_reset():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    first.record(0.010)
+    second.record(0.020)
+    second.record(0.030)
+
+    first.merge(second)
+
+    assert first.count == 3
+    assert first.total == pytest.approx(0.060)
+    assert first.percentile(50) == pytest.approx(0.020, rel=1 / 64)
+    assert (first.min, first.max) == (0.010, 0.030)
+
+    first.reset()
+    assert first.count == 0
+    assert list(first.buckets()) == []
@@ -0,0 +1,185 @@
+import socket
+import struct
+
+import pytest
+from pytest_mock import MockerFixture
+
+from uds.config import Config, IsoTpConfig
+from uds.factories import TpFactory
+from uds.uds_communications.TransportProtocols.Can.KernelCanTp import (
+    CAN_ISOTP_EXTEND_ADDR,
+    CAN_ISOTP_LL_OPTS,
+    CAN_ISOTP_OPTS,
+    CAN_ISOTP_RECV_FC,
+    CAN_ISOTP_RX_EXT_ADDR,
+    CAN_ISOTP_SF_BROADCAST,
+    CAN_ISOTP_TX_PADDING,
+    KernelCanTp,
+)
+
+VCAN_CHANNEL = "vcan0"
+
+
+def make_config(**kwargs):
+    config = dict(
+        req_id=0x7E0,
+        res_id=0x7E8,
+        addressing_type="NORMAL",
+        n_ae=0x55,
+        n_sa=0xF1,
+        n_ta=0x10,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+    )
+    config.update(kwargs)
+    Config.isotp = IsoTpConfig(**config)
+
+
+@pytest.fixture
+def mock_socket(mocker: MockerFixture):
+    mocker.patch.object(socket, "CAN_ISOTP", 6, create=True)
+    return mocker.patch("uds.uds_communications.TransportProtocols.Can.KernelCanTp.socket.socket")
+
+
+def socket_options(sock):
+    return {call.args[1]: call.args[2] for call in sock.setsockopt.call_args_list}
+
+
+def test_socket_options(mock_socket):
+    make_config(rx_block_size=8, rx_st_min=0.005, rx_wft_max=2, padding_pattern=0xAA)
+
+    tp = TpFactory.select_transport_protocol("can_isotp_kernel", channel="can0", is_fd=False)
+
+    sock = tp.isotp_socket
+    options = socket_options(sock)
+    flags, _, tx_extension, tx_padding, _, rx_extension = struct.unpack("=IIBBBB", options[CAN_ISOTP_OPTS])
+    assert flags & CAN_ISOTP_TX_PADDING
+    assert not flags & CAN_ISOTP_EXTEND_ADDR
+    assert tx_padding == 0xAA
+    assert options[CAN_ISOTP_RECV_FC] == bytes([8, 5, 2])
+    assert CAN_ISOTP_LL_OPTS not in options
+    sock.bind.assert_called_once_with(("can0", 0x7E8, 0x7E0))
+
+
+@pytest.mark.parametrize(
+    "addressing_type, flags, tx_extension, rx_extension, rx_id, tx_id",
+    [
+        pytest.param("NORMAL_FIXED", 0, 0, 0, 0x98DAF110, 0x98DA10F1, id="normal fixed, 29 bits IDs"),
+        pytest.param("EXTENDED", CAN_ISOTP_EXTEND_ADDR | CAN_ISOTP_RX_EXT_ADDR, 0x10, 0xF1, 0x7E8, 0x7E0, id="extended"),
+        pytest.param("MIXED", CAN_ISOTP_EXTEND_ADDR, 0x55, 0x55, 0x7E8, 0x7E0, id="mixed"),
+    ],
+)
+def test_addressing_types(mock_socket, addressing_type, flags, tx_extension, rx_extension, rx_id, tx_id):
+    make_config(addressing_type=addressing_type, padding="NONE")
+
+    tp = KernelCanTp(channel="can0")
+
+    sock = tp.isotp_socket
+    options = socket_options(sock)
+    actual_flags, _, actual_tx_extension, _, _, actual_rx_extension = struct.unpack(
+        "=IIBBBB", options[CAN_ISOTP_OPTS]
+    )
+    assert actual_flags & (CAN_ISOTP_EXTEND_ADDR | CAN_ISOTP_RX_EXT_ADDR | CAN_ISOTP_TX_PADDING) == flags
+    assert (actual_tx_extension, actual_rx_extension) == (tx_extension, rx_extension)
+    assert options[CAN_ISOTP_LL_OPTS] == bytes([72, 64, 0])
+    sock.bind.assert_called_once_with(("can0", rx_id, tx_id))
+
+
+def test_send_recv(mock_socket):
+    make_config()
+    tp = KernelCanTp(channel="can0")
+    sock = tp.isotp_socket
+
+    def recv_into(buffer, nbytes, flags):
+        assert flags == socket.MSG_TRUNC
+        buffer[:3] = b"\x62\xF1\x8C"
+        return 3
+
+    sock.recv_into.side_effect = recv_into
+
+    tp.send([0x22, 0xF1, 0x8C])
+
+    sock.send.assert_called_once_with(b"\x22\xF1\x8C")
+    assert tp.recv(2) == [0x62, 0xF1, 0x8C]
+    sock.settimeout.assert_called_with(2)
+
+    sock.recv_into.side_effect = socket.timeout
+    with pytest.raises(TimeoutError):
+        tp.recv(0.1)
+
+
+def test_recv_truncated(mock_socket):
+    make_config(rx_max_message_length=16)
+    tp = KernelCanTp(channel="can0")
+    # length of the whole message, of which only the first 16 bytes were copied
+    tp.isotp_socket.recv_into.return_value = 17
+
+    with pytest.raises(ValueError):
+        tp.recv()
+
+
+def test_functional_request(mock_socket):
+    make_config(func_req_id=0x7DF)
+    tp = KernelCanTp(channel="can0", is_fd=False)
+
+    tp.send([0x3E, 0x80], functionalReq=True)
+
+    functional_socket = mock_socket.return_value
+    flags = struct.unpack("=IIBBBB", socket_options(functional_socket)[CAN_ISOTP_OPTS])[0]
+    assert flags & CAN_ISOTP_SF_BROADCAST
+    functional_socket.bind.assert_called_with(("can0", 0x7DF, 0x7DF))
+    with pytest.raises(ValueError):
+        tp.send([0x22] * 8, functionalReq=True)
+
+
+def test_functional_request_normal_fixed(mock_socket):
+    make_config(addressing_type="NORMAL_FIXED")
+    tp = KernelCanTp(channel="can0", is_fd=False)
+
+    tp.send([0x3E, 0x80], functionalReq=True)
+
+    mock_socket.return_value.bind.assert_called_with(("can0", 0x98DB33F1, 0x98DB33F1))
+
+
+def test_functional_request_extended(mock_socket):
+    make_config(addressing_type="EXTENDED", func_req_id=0x7DF)
+    tp = KernelCanTp(channel="can0", is_fd=False)
+
+    tp.send([0x3E, 0x80], functionalReq=True)
+
+    tx_extension = struct.unpack("=IIBBBB", socket_options(mock_socket.return_value)[CAN_ISOTP_OPTS])[2]
+    assert tx_extension == 0x33
+
+
+def test_channel_required(mock_socket):
+    make_config()
+    with pytest.raises(ValueError):
+        KernelCanTp()
+
+
+def vcan_available():
+    try:
+        with socket.socket(socket.AF_CAN, socket.SOCK_DGRAM, socket.CAN_ISOTP) as sock:
+            sock.bind((VCAN_CHANNEL, 0x7E8, 0x7E0))
+    except (AttributeError, OSError):
+        return False
+    return True
+
+
+@pytest.mark.skipif(not vcan_available(), reason=f"needs CAN_ISOTP sockets and a {VCAN_CHANNEL} interface")
+def test_vcan_round_trip():
+    make_config(padding="NONE")
+    tester = KernelCanTp(channel=VCAN_CHANNEL, is_fd=False)
+    make_config(req_id=0x7E8, res_id=0x7E0, padding="NONE")
+    ecu = KernelCanTp(channel=VCAN_CHANNEL, is_fd=False)
+    request = bytes(range(256)) * 16
+
+    try:
+        # the kernel answers the flow control on its own, the request is sent before being read
+        tester.send(request[:4095])
+        assert ecu.decode_isotp_bytes(1) == request[:4095]
+        ecu.send([0x62, 0xF1, 0x8C])
+        assert tester.recv(1) == [0x62, 0xF1, 0x8C]
+    finally:
+        tester.close()
+        ecu.close()
@@ -0,0 +1,46 @@
+from time import perf_counter
+
+import pytest
+from pytest_mock import MockerFixture
+
+from uds.uds_communications.Utilities.PacingScheduler import PacingScheduler
+
+
+@pytest.mark.parametrize("interval", [0, 100e-6, 900e-6, 5e-3])
+def test_wait_respects_interval(interval):
+    pacer = PacingScheduler(interval)
+
+    pacer.start()
+    start = perf_counter()
+    for _ in range(5):
+        pacer.wait()
+    elapsed = perf_counter() - start
+
+    assert elapsed >= 5 * interval
+    stats = pacer.statistics()
+    assert stats.samples == 5
+    assert stats.minimum >= 0
+    assert stats.minimum <= stats.mean <= stats.maximum
+
+
+def test_wait_sleeps_until_spin_threshold(mocker: MockerFixture):
+    mock_sleep = mocker.patch("time.sleep")
+    pacer = PacingScheduler(interval=0.010, spin_threshold=0.002)
+
+    pacer.start()
+    pacer.wait()
+
+    sleep_time = mock_sleep.call_args_list[0].args[0]
+    assert 0.007 < sleep_time <= 0.008
+    # the remaining time is spent spinning
+    assert all(call.args[0] == 0 for call in mock_sleep.call_args_list[1:])
+
+
+def test_statistics_reset():
+    pacer = PacingScheduler()
+    pacer.start()
+    pacer.wait()
+
+    pacer.reset_statistics()
+
+    assert pacer.statistics().samples == 0
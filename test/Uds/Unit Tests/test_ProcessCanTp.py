@@ -0,0 +1,143 @@
+import threading
+
+import can
+import pytest
+
+from uds.config import Config, IsoTpConfig
+from uds.factories import TpFactory
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.Utilities.SharedMessageRing import SharedMessageRing
+
+REQ_ID = 0x7E0
+RES_ID = 0x7E8
+
+
+class _Link:
+    """Connector handing the sent frames over to the other side."""
+
+    accepts_bytes = True
+
+    def __init__(self):
+        self.peer = None
+
+    def transmit(self, data, req_id):
+        self.peer(can.Message(arbitration_id=req_id, data=bytes(data), is_extended_id=False))
+
+
+class EchoEcu:
+    """Connector factory of the worker: an ECU in the worker process
+    answering every request with its positive response, followed by a
+    copy of the request padded to response_length bytes.
+    """
+
+    def __init__(self, response_length=0, fail_connector=False):
+        self.response_length = response_length
+        self.fail_connector = fail_connector
+
+    def __call__(self, callback):
+        if self.fail_connector:
+            raise OSError("bus not available")
+        ecu = CanTp(is_fd=False)
+        ecu.reqIdAddress = RES_ID
+        ecu.resIdAddress = REQ_ID
+        tester_link, ecu_link = _Link(), _Link()
+        tester_link.peer = ecu.callback_onReceive
+        ecu_link.peer = callback
+        ecu.connection = ecu_link
+        threading.Thread(target=self.serve, args=(ecu,), daemon=True).start()
+        return tester_link
+
+    def serve(self, ecu):
+        while True:
+            try:
+                request = ecu.decode_isotp_bytes(1)
+            except TimeoutError:
+                continue
+            if request[0] == 0x31:
+                # no answer
+                continue
+            response = bytes([request[0] + 0x40]) + request[1:]
+            ecu.send(response.ljust(self.response_length, b"\xAA"))
+
+
+def make_config():
+    Config.isotp = IsoTpConfig(
+        req_id=REQ_ID,
+        res_id=RES_ID,
+        addressing_type="NORMAL",
+        n_sa=0xFF,
+        n_ta=0xFF,
+        n_ae=0xFF,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        rx_st_min=0,
+    )
+
+
+@pytest.fixture(scope="module")
+def process_tp():
+    make_config()
+    tp = TpFactory.select_transport_protocol("can_process", connector_factory=EchoEcu(), is_fd=False)
+    yield tp
+    tp.close()
+
+
+def test_shared_message_ring_wraps():
+    ring = SharedMessageRing(64)
+    try:
+        for index in range(20):
+            message = bytes(range(index, index + 3 + index % 7))
+            ring.put(message, kind=index % 3)
+            assert ring.get(0) == (index % 3, bytearray(message))
+        assert ring.get(0) is None
+        with pytest.raises(ValueError):
+            ring.put(bytes(64))
+        ring.put(bytes(40))
+        with pytest.raises(TimeoutError):
+            ring.put(bytes(40), timeout=0.01)
+    finally:
+        ring.close()
+
+
+def test_single_frame_exchange(process_tp):
+    process_tp.send([0x22, 0xF1, 0x90])
+
+    assert process_tp.recv(1) == [0x62, 0xF1, 0x90]
+
+
+def test_segmented_exchange(process_tp):
+    request = [0x2E, 0xF1, 0x90] + list(range(100))
+
+    process_tp.send(request)
+
+    assert process_tp.recv(1) == [0x6E] + request[1:]
+
+
+def test_recv_timeout(process_tp):
+    process_tp.send([0x31, 0x01])
+
+    with pytest.raises(TimeoutError):
+        process_tp.recv(0.05)
+
+
+def test_long_response():
+    make_config()
+    tp = TpFactory.select_transport_protocol(
+        "can_process", connector_factory=EchoEcu(response_length=4095), is_fd=False
+    )
+    try:
+        tp.send([0x22, 0xF1, 0x90])
+        response = tp.decode_isotp_bytes(1)
+    finally:
+        tp.close()
+
+    assert len(response) == 4095
+    assert response[:3] == bytes([0x62, 0xF1, 0x90])
+    assert not tp.process.is_alive()
+
+
+def test_connector_failure():
+    make_config()
+
+    with pytest.raises(Exception, match="bus not available"):
+        TpFactory.select_transport_protocol("can_process", connector_factory=EchoEcu(fail_connector=True))
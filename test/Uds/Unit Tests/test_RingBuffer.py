@@ -0,0 +1,86 @@
+import threading
+import time
+
+from uds.uds_communications.Utilities.RingBuffer import FrameRingBuffer
+
+
+def test_capacity_rounded_to_power_of_two():
+    assert FrameRingBuffer(100).capacity == 128
+    assert FrameRingBuffer(128).capacity == 128
+
+
+def test_put_get_fifo_with_timestamps():
+    buffer = FrameRingBuffer(4)
+
+    for i in range(3):
+        assert buffer.put(bytes([i]), timestamp=10.0 + i)
+
+    assert len(buffer) == 3
+    assert buffer.get_with_timestamp(0) == (b"\x00", 10.0)
+    assert buffer.get(0) == b"\x01"
+    assert buffer.get_with_timestamp(0) == (b"\x02", 12.0)
+    assert buffer.get(0) is None
+    assert buffer.high_watermark == 3
+
+
+def test_wrap_around():
+    buffer = FrameRingBuffer(2)
+
+    for i in range(10):
+        buffer.put(i)
+        assert buffer.get(0) == i
+
+
+def test_full_buffer_drops_frames():
+    buffer = FrameRingBuffer(2)
+
+    assert buffer.put(1) and buffer.put(2)
+    assert not buffer.put(3)
+    assert not buffer.put(4)
+    buffer.get(0)
+    assert buffer.put(5)
+    assert not buffer.put(6)
+
+    assert buffer.dropped == 3
+    assert buffer.overruns == 2
+    assert [buffer.get(0), buffer.get(0)] == [2, 5]
+
+    buffer.reset_statistics()
+    assert (buffer.dropped, buffer.overruns, buffer.high_watermark) == (0, 0, 0)
+
+
+def test_get_times_out():
+    buffer = FrameRingBuffer()
+
+    start = time.perf_counter()
+    assert buffer.get(0.05) is None
+    assert time.perf_counter() - start >= 0.05
+    assert buffer.get(-1) is None
+
+
+def test_get_wakes_up_on_put():
+    buffer = FrameRingBuffer()
+    producer = threading.Timer(0.05, buffer.put, args=(b"frame",))
+    producer.start()
+
+    start = time.perf_counter()
+    assert buffer.get(5) == b"frame"
+    assert time.perf_counter() - start < 1
+    producer.join()
+
+
+def test_get_until_deadline():
+    buffer = FrameRingBuffer()
+
+    assert buffer.get_until(time.perf_counter() + 0.01) == (None, None)
+
+
+def test_clear():
+    buffer = FrameRingBuffer()
+    buffer.put(1)
+    buffer.put(2)
+
+    buffer.clear()
+
+    assert len(buffer) == 0
+    assert buffer.get(0) is None
@@ -0,0 +1,146 @@
+import threading
+from time import perf_counter
+
+import pytest
+
+from uds.config import Config, IsoTpConfig
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.TransportProtocols.Can.VirtualCanBus import VirtualCanBus, frame_bits
+
+REQ_ID = 0x7E0
+RES_ID = 0x7E8
+
+
+def make_config(**kwargs):
+    Config.isotp = IsoTpConfig(
+        req_id=REQ_ID,
+        res_id=RES_ID,
+        addressing_type="NORMAL",
+        n_sa=0xFF,
+        n_ta=0xFF,
+        n_ae=0xFF,
+        m_type="DIAGNOSTICS",
+        discard_neg_resp=False,
+        rx_st_min=0,
+        **kwargs,
+    )
+
+
+def make_pair(bus, is_fd=False):
+    """Tester and ECU CanTp connected through the bus."""
+    tester = CanTp(is_fd=is_fd)
+    ecu = CanTp(is_fd=is_fd)
+    ecu.reqIdAddress = RES_ID
+    ecu.resIdAddress = REQ_ID
+    tester.connection = bus.connector(tester.callback_onReceive)
+    ecu.connection = bus.connector(ecu.callback_onReceive)
+    return tester, ecu
+
+
+def exchange(bus, payload, is_fd=False, timeout=1):
+    tester, ecu = make_pair(bus, is_fd)
+    received = []
+    ecu_thread = threading.Thread(target=lambda: received.append(bytes(ecu.decode_isotp_bytes(timeout))))
+    ecu_thread.start()
+    try:
+        tester.send(payload)
+    finally:
+        ecu_thread.join()
+    return received
+
+
+@pytest.mark.parametrize(
+    "length, is_extended_id, is_fd, expected_bits",
+    [
+        (0, False, False, (55, 0)),
+        (8, False, False, (135, 0)),
+        (8, True, False, (160, 0)),
+        (8, False, True, (34, 113)),
+        (64, False, True, (34, 678)),
+        # padded to 12 bytes
+        (9, False, True, (34, 153)),
+    ],
+)
+def test_frame_bits(length, is_extended_id, is_fd, expected_bits):
+    assert frame_bits(length, is_extended_id, is_fd) == expected_bits
+
+
+def test_frame_duration():
+    assert VirtualCanBus().frame_duration(8) == 0
+    with VirtualCanBus(bitrate=500000) as bus:
+        assert bus.frame_duration(8) == pytest.approx(270e-6)
+    with VirtualCanBus(bitrate=500000, data_bitrate=2000000, is_fd=True) as bus:
+        assert bus.frame_duration(64) == pytest.approx(34 / 500000 + 678 / 2000000)
+
+
+def test_instant_delivery():
+    make_config()
+    bus = VirtualCanBus()
+    payload = bytes(range(256)) * 4
+
+    assert exchange(bus, payload) == [payload]
+    assert bus.sent == 1 + 1 + 146
+    assert bus.dropped == 0
+
+
+def test_own_messages():
+    bus = VirtualCanBus()
+    received = []
+    sender = bus.connector(received.append, receive_own_messages=True)
+    bus.connector(received.append)
+
+    sender.transmit(b"\x01\x02", 0x123)
+
+    assert [bytes(message.data) for message in received] == [b"\x01\x02"] * 2
+    assert received[0].arbitration_id == 0x123
+    assert not received[0].is_extended_id
+
+
+@pytest.mark.parametrize("is_fd", [False, True])
+def test_timed_delivery(is_fd):
+    make_config()
+    payload = bytes(1000)
+    with VirtualCanBus(bitrate=1000000, data_bitrate=2000000, is_fd=is_fd, latency=1e-4, jitter=1e-4) as bus:
+        start = perf_counter()
+        received = exchange(bus, payload, is_fd)
+        elapsed = perf_counter() - start
+
+    assert received == [payload]
+    consecutive_frames = -(-(1000 - (62 if is_fd else 6)) // (63 if is_fd else 7))
+    # the consecutive frames at least take their time on the bus
+    assert elapsed >= (consecutive_frames - 1) * bus.frame_duration(64 if is_fd else 8)
+
+
+def test_dropped_frames():
+    make_config()
+    bus = VirtualCanBus(drop_rate=0.05, seed=6)
+    tester, ecu = make_pair(bus)
+    threading.Thread(target=tester.send, args=(bytes(500),), daemon=True).start()
+
+    with pytest.raises(ValueError, match="expected 3 got 4"):
+        ecu.decode_isotp_bytes(1)
+    assert bus.dropped > 0
+
+
+def test_reordered_frames():
+    make_config()
+    with VirtualCanBus(bitrate=500000, reorder_rate=0.3, seed=3) as bus:
+        tester, ecu = make_pair(bus)
+        threading.Thread(target=tester.send, args=(bytes(500),), daemon=True).start()
+
+        with pytest.raises(ValueError, match="out of order"):
+            ecu.decode_isotp_bytes(1)
+    assert bus.reordered > 0
+
+
+def test_seeded_faults_are_reproducible():
+    def run():
+        bus = VirtualCanBus(drop_rate=0.5, seed=42)
+        received = []
+        sender = bus.connector()
+        bus.connector(lambda message: received.append(message.data[0]))
+        for index in range(100):
+            sender.transmit([index], 0x100)
+        return received
+
+    assert run() == run()
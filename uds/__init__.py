@@ -10,6 +10,13 @@ from uds.uds_communications.Utilities.UtilityFunctions import fillArray
 # CAN Imports
 from uds.uds_communications.TransportProtocols.Can import CanTpTypes
 from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.TransportProtocols.Can.AsyncCanTp import AsyncCanTp
+from uds.uds_communications.TransportProtocols.Can.CanTpDispatcher import CanTpDispatcher
+from uds.uds_communications.TransportProtocols.Can.KernelCanTp import KernelCanTp
+from uds.uds_communications.TransportProtocols.Can.ProcessCanTp import ProcessCanTp
+
+# DoIP Imports
+from uds.uds_communications.TransportProtocols.DoIP.DoIP import DoIP
 
 # Uds-Config tool imports
 from uds.uds_config_tool.UdsConfigTool import UdsTool
@@ -29,7 +36,10 @@ from uds.uds_config_tool.ISOStandard.ISOStandard import (
 
 # main uds import
 from uds.uds_communications.Uds.Uds import Uds
+from uds.uds_communications.Uds.AsyncUds import AsyncUds
+from uds.uds_communications.Uds.UdsMetrics import UdsMetrics
+from uds.uds_communications.Uds.UdsExecutor import EcuJob, UdsExecutor
 
 from uds.config import Config
-from uds.interfaces import TpInterface
+from uds.interfaces import AsyncTpInterface, TpInterface
 from uds.factories import TpFactory
@@ -1,5 +1,6 @@
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
 
 log = logging.getLogger(__name__)
 
@@ -11,6 +12,28 @@ class UdsConfig:
     transport_protocol: str
     p2_can_client: int
     p2_can_server: int
+    #: maximum time to wait for the next response after a response pending (NRC 0x78), in seconds
+    p2_star_can_client: float = 5.0
+    #: use the P2 and P2* announced by the ECU in the DiagnosticSessionControl positive responses
+    session_timing: bool = True
+    #: added to the P2 and P2* announced by the ECU for the network delays, in seconds
+    p2_margin: float = 0.1
+    #: service ID -> (P2, P2*) in seconds, taking precedence over the session timing
+    service_timing: Dict[int, Tuple[float, float]] = field(default_factory=dict)
+    #: record the time from each response pending to the next response in Uds.timing.pending_durations
+    measure_pending: bool = False
+    #: maximum number of DIDs whose ReadDataByIdentifier response is cached, 0 to disable the cache
+    did_cache_size: int = 0
+    #: TTL of the cached DIDs without policy in seconds, None until invalidated, 0 not cached
+    did_cache_ttl: Optional[float] = 0.0
+    #: DID -> TTL, taking precedence over the static ISO 14229-1 identification DIDs
+    did_cache_policies: Dict[int, Optional[float]] = field(default_factory=dict)
+    #: ODX DIAG-SERVICE semantic -> TTL of the DIDs without policy, e.g. {"IDENTIFICATION": None}
+    did_cache_semantic_policies: Dict[str, Optional[float]] = field(default_factory=dict)
+    #: maximum number of DIDs per request sent by readDataByIdentifierBatch, 0 for no limit
+    rdbi_max_dids: int = 0
+    #: maximum length of the responses to the requests sent by readDataByIdentifierBatch, 0 for no limit
+    rdbi_max_response_length: int = 4095
 
 
 @dataclass
@@ -25,6 +48,67 @@ class IsoTpConfig:
     n_ae: int
     m_type: str
     discard_neg_resp: bool
+    #: maximum number of received frames waiting to be processed
+    rx_buffer_size: int = 4096
+    #: block size announced when receiving segmented messages, 0 for no limit
+    rx_block_size: int = 0
+    #: STmin announced when receiving segmented messages, in seconds
+    rx_st_min: float = 0.030
+    #: number of flow control WAIT frames sent before each continue to send
+    rx_wait_frames: int = 0
+    #: maximum number of flow control WAIT frames in a row
+    rx_wft_max: int = 0
+    #: adapt the announced block size and STmin to the reception quality
+    rx_adaptive: bool = False
+    #: longest message accepted when receiving, the first frames announcing more are answered with an overflow
+    rx_max_message_length: int = 0x100000
+    #: maximum time for the transmission of a frame, in seconds
+    n_as: float = 1.0
+    #: maximum time to wait for a flow control frame when sending, in seconds
+    n_bs: float = 1.0
+    #: maximum time to wait for the next consecutive frame when receiving, in seconds
+    n_cr: float = 1.0
+    #: maximum number of flow control WAIT frames accepted in a row when sending
+    tx_wft_max: int = 10
+    #: ID of the functional requests, None if not used, derived from func_n_ta with NORMAL_FIXED addressing
+    func_req_id: Optional[int] = None
+    #: functional target address, in the ID of the functional requests with NORMAL_FIXED addressing
+    #: and first data byte of the functional requests with EXTENDED addressing, 0x33 for OBD
+    func_n_ta: int = 0x33
+    #: response ID -> physical request ID of the ECUs answering the functional requests
+    func_responders: Dict[int, int] = field(default_factory=dict)
+    #: padding of the sent frames: MANDATORY, OPTIMIZED_FD (no padding of the CAN FD frames up to 8 bytes)
+    #: or NONE (no padding but the one imposed by the CAN FD data lengths)
+    padding: str = "MANDATORY"
+    #: value of the padding bytes, None to keep CanTp.PADDING_PATTERN
+    padding_pattern: Optional[int] = None
+    #: number of sent and of received frames kept by the frame capture, 0 to disable it
+    capture_size: int = 4096
+
+
+@dataclass
+class DoIPConfig:
+    """Encapsulate all doip communication layer parameters."""
+
+    #: address of the DoIP entity, e.g. the vehicle gateway
+    host: str
+    #: logical address of the ECU to diagnose
+    target_address: int
+    #: logical address of the tester
+    source_address: int = 0x0E00
+    port: int = 13400
+    #: routing activation type, 0x00 default, 0x01 WWH-OBD
+    activation_type: int = 0x00
+    #: DoIP protocol version, 0x02 for ISO 13400-2:2012, 0x03 for ISO 13400-2:2019
+    protocol_version: int = 0x02
+    #: logical address of the functional requests, None if not used
+    functional_address: Optional[int] = None
+    #: maximum time to connect and activate the routing, in seconds
+    connect_timeout: float = 2.0
+    #: maximum time to wait for the acknowledgement of a diagnostic message, in seconds
+    ack_timeout: float = 2.0
+    #: keep the connection open once no transport uses it, to be reused by the next one
+    keep_alive: bool = True
 
 
 class Config:
@@ -36,6 +120,8 @@ class Config:
     uds: UdsConfig
     #: store isotp configuration class container instance
     isotp: IsoTpConfig
+    #: store doip configuration class container instance
+    doip: DoIPConfig
 
     @classmethod
     def load_isotp_config(cls, config: dict) -> None:
@@ -46,6 +132,15 @@ class Config:
         cls.isotp = IsoTpConfig(**config)
         log.info(f"Loaded isotp configuration parameters : {cls.isotp}")
 
+    @classmethod
+    def load_doip_config(cls, config: dict) -> None:
+        """Load and store doip layer configuration parameters.
+
+        :param config: doip configuration parameters
+        """
+        cls.doip = DoIPConfig(**config)
+        log.info(f"Loaded doip configuration parameters : {cls.doip}")
+
     @classmethod
     def load_uds_config(cls, config: dict) -> None:
         """Load and store uds layer configuration parameters.
@@ -53,7 +148,7 @@ class Config:
         :param config: uds configuration parameters
         """
         cls.uds = UdsConfig(**config)
-        log.info(f"Loaded uds configuration parameters : {cls.isotp}")
+        log.info(f"Loaded uds configuration parameters : {cls.uds}")
 
     @classmethod
     def load_com_layer_config(cls, tp_config: dict, uds_config: dict) -> None:
@@ -1,13 +1,19 @@
 
+from uds.uds_communications.TransportProtocols.Can.AsyncCanTp import AsyncCanTp
 from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
-from uds.interfaces import TpInterface
+from uds.uds_communications.TransportProtocols.Can.KernelCanTp import KernelCanTp
+from uds.uds_communications.TransportProtocols.Can.ProcessCanTp import ProcessCanTp
+from uds.uds_communications.TransportProtocols.DoIP.DoIP import DoIP
+from uds.interfaces import AsyncTpInterface, TpInterface
 
 
 class TpFactory:
     """Transport protocol factory class."""
 
     #: store all available protocols
-    protocols: dict = {"can": CanTp}
+    protocols: dict = {"can": CanTp, "can_isotp_kernel": KernelCanTp, "can_process": ProcessCanTp, "doip": DoIP}
+    #: store all available asyncio protocols, used by AsyncUds
+    async_protocols: dict = {"can": AsyncCanTp}
 
     @classmethod
     def select_transport_protocol(cls, protocol: str, **kwargs) -> TpInterface:
@@ -27,6 +33,24 @@ class TpFactory:
 
         return protocol_instance(**kwargs)
 
+    @classmethod
+    def select_async_transport_protocol(cls, protocol: str, **kwargs) -> AsyncTpInterface:
+        """Select an asyncio protocol and instaciate it.
+
+        :param protocol: protocol's name
+        :param kwargs: named arguments
+
+        :return: the selected protocol instance
+
+        :raises ValueError: if the given protocol doesn't exist
+        """
+        protocol_instance = cls.async_protocols.get(protocol.lower())
+
+        if protocol_instance is None:
+            raise ValueError(f"protocol {protocol} is not supported with asyncio!")
+
+        return protocol_instance(**kwargs)
+
     @classmethod
     def add_protocol(cls, name: str, obj: TpInterface) -> None:
         """Add a protocol to the available protocols dictionary.
@@ -9,3 +9,13 @@ class TpInterface(abc.ABC):
     @abc.abstractmethod
     def recv(self, timeout_ms):
         """ """
+
+
+class AsyncTpInterface(abc.ABC):
+    @abc.abstractmethod
+    async def send(self, payload):
+        """ """
+
+    @abc.abstractmethod
+    async def recv(self, timeout_s):
+        """ """
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from uds.config import Config
+from uds.interfaces import AsyncTpInterface
+from uds.uds_communications.TransportProtocols.Can.CanTp import (
+    PACED_TRANSMIT,
+    RECEIVE,
+    RECEIVE_FUNCTIONAL,
+    TRANSMIT,
+    TRANSMIT_BLOCK,
+    TRANSMIT_TO,
+    CanTp,
+    Steps,
+    WritableBuffer,
+    as_memoryview,
+)
+from uds.uds_communications.Utilities.RingBuffer import AsyncFrameBuffer
+
+
+class AsyncCanTp(CanTp, AsyncTpInterface):
+    """CAN transport protocol for asyncio applications.
+
+    Frames building, segmentation, flow control and addressing are the
+    ones of :class:`CanTp`, only the waiting is done by awaiting instead
+    of blocking the thread, so that a single event loop can hold many
+    concurrent conversations.
+
+    :meth:`callback_onReceive` has to be registered as a listener of a
+    python-can notifier, ideally created with ``loop=`` so that the
+    frames of buses with a file descriptor are handled by the event loop
+    itself. It may nevertheless be called from any thread.
+    """
+
+    def _new_buffer(self) -> AsyncFrameBuffer:
+        """Create a buffer for received frames."""
+        return AsyncFrameBuffer(Config.isotp.rx_buffer_size)
+
+    @property
+    def rx_buffer(self) -> AsyncFrameBuffer:
+        """Buffer of the received frames, gives access to the dropped
+        frames and overruns counters.
+        """
+        return self._recv_buffer
+
+    async def send(self, payload, functionalReq: bool = False, tpWaitTime: float = 0.01) -> None:
+        """Send a message.
+
+        :param payload: the message to send
+        :param functionalReq: True for a functional request
+        :param tpWaitTime: unused, kept for compatibility with CanTp.send
+        """
+        await self.encode_isotp(payload, functionalReq)
+
+    async def encode_isotp(self, payload, functionalReq: bool = False) -> None:
+        """Segment and send a message, awaiting the flow control frames
+        and the STmin between the consecutive frames.
+
+        :param payload: the message to send
+        :param functionalReq: True for a functional request
+        """
+        steps = self._encode_isotp_steps(as_memoryview(payload), self.supports_block_transmission, functionalReq)
+        await self._run_steps_async(steps, functionalReq)
+
+    async def recv(self, timeout_s: float = 1) -> List[int]:
+        """Receive a message.
+
+        :param timeout_s: time to wait for each expected frame
+        :return: the reassembled message
+        """
+        return list(await self.decode_isotp_bytes(timeout_s))
+
+    async def decode_isotp(self, timeout_s: float = 1) -> List[int]:
+        """Receive and reassemble a message.
+
+        :param timeout_s: time to wait for each expected frame
+        :return: the reassembled message
+        """
+        return list(await self.decode_isotp_bytes(timeout_s))
+
+    async def decode_isotp_bytes(
+        self, timeout_s: float = 1, buffer: Optional[WritableBuffer] = None
+    ) -> Union[bytearray, memoryview]:
+        """Receive and reassemble a message without converting it to a list.
+
+        :param timeout_s: time to wait for each expected frame
+        :param buffer: writable buffer to reassemble the message into
+        :return: the reassembled message, a view on the beginning of the
+            buffer if one is given
+        """
+        return await self._run_steps_async(self._decode_isotp_steps(timeout_s, buffer=buffer))
+
+    async def recv_functional(
+        self, timeout_s: float = 1, responders: Optional[Sequence[int]] = None
+    ) -> Dict[int, List[List[int]]]:
+        """Collect the responses to the last functional request.
+
+        :param timeout_s: time during which new responses are accepted
+        :param responders: response IDs after whose messages to stop
+            early, all the configured functional responders if None
+        :return: the messages received, per response ID
+        """
+        responses = await self._run_steps_async(self._collect_functional_steps(timeout_s, responders))
+        return {resId: [list(message) for message in messages] for resId, messages in responses.items()}
+
+    async def getNextBufferedMessage(self, timeout: float = 0):
+        """Wait for the next received frame.
+
+        :param timeout: time to wait in seconds
+        :return: the frame data, or None if nothing is received before the timeout
+        """
+        return await self._recv_buffer.get(timeout=timeout)
+
+    async def _run_steps_async(self, steps: Steps, functionalReq: bool = False) -> Any:
+        """Perform the I/O steps of an encoding or decoding generator
+        without blocking the event loop.
+
+        :param steps: generator from _encode_isotp_steps or _decode_isotp_steps
+        :param functionalReq: True if the frames are part of a functional request
+        :return: the value returned by the generator
+        """
+        result = None
+        try:
+            while True:
+                step, argument = steps.send(result)
+                if step is RECEIVE:
+                    result = await self.getNextBufferedMessage(argument)
+                elif step is PACED_TRANSMIT:
+                    await self.pacer.wait_async()
+                    result = self.transmit(argument, functionalReq)
+                elif step is TRANSMIT:
+                    result = self.transmit(argument, functionalReq)
+                elif step is TRANSMIT_BLOCK:
+                    result = self.transmit_block(argument, functionalReq)
+                elif step is RECEIVE_FUNCTIONAL:
+                    result = await self._functional_buffer.get(argument)
+                elif step is TRANSMIT_TO:
+                    result = self.transmit_to(*argument)
+                else:
+                    result = await asyncio.sleep(argument)
+        except StopIteration as stop:
+            return stop.value
@@ -12,13 +12,18 @@ __email__ = "richard.clubb@embeduk.com"
 __status__ = "Development"
 
 import logging
-import queue
-from typing import List
+from time import perf_counter, sleep, time
+from typing import Any, Dict, Generator, List, Sequence, Tuple, Union
 
 from uds.config import Config
 from uds.interfaces import TpInterface
-from uds import ResettableTimer, fillArray
+from uds import fillArray
+from uds.uds_communications.Utilities.PacingScheduler import PacingScheduler
+from uds.uds_communications.Utilities.RingBuffer import FrameRingBuffer
 from uds.uds_communications.TransportProtocols.Can.CanTpTypes import (
+    CAN_FD_DLC,
+    CAN_FD_DLC_LENGTHS,
+    CANTP_MAX_ESCAPE_PAYLOAD_LENGTH,
     CANTP_MAX_PAYLOAD_LENGTH,
     CONSECUTIVE_FRAME_SEQUENCE_DATA_START_INDEX,
     CONSECUTIVE_FRAME_SEQUENCE_NUMBER_INDEX,
@@ -27,18 +32,69 @@ from uds.uds_communications.TransportProtocols.Can.CanTpTypes import (
     FIRST_FRAME_DATA_START_INDEX,
     FIRST_FRAME_DL_INDEX_HIGH,
     FIRST_FRAME_DL_INDEX_LOW,
+    FIRST_FRAME_ESCAPE_DATA_START_INDEX,
+    FIRST_FRAME_ESCAPE_DL_INDEX,
     MINIMUM_HEADER_SIZE,
     N_PCI_INDEX,
+    NORMAL_FIXED_FUNCTIONAL_BASE_ID,
+    NORMAL_FIXED_PHYSICAL_BASE_ID,
     SINGLE_FRAME_DATA_START_INDEX,
     CanTpAddressingTypes,
     CanTpFsTypes,
     CanTpMessageType,
     CanTpMTypes,
+    CanTpPaddingTypes,
     CanTpState,
 )
+from uds.uds_communications.TransportProtocols.Can.CanTpFlowControl import ReceiveFlowControl
+from uds.uds_communications.TransportProtocols.Can.CanTpSegmentation import SegmentationPlan
+from uds.uds_communications.TransportProtocols.Can.FrameCapture import FrameCapture
 
 logger = logging.getLogger(__name__)
 
+#: any contiguous buffer of bytes, used for frames and payloads
+BytesLike = Union[bytes, bytearray, memoryview]
+#: buffer messages can be reassembled into
+WritableBuffer = Union[bytearray, memoryview]
+
+# plain int as the enum arithmetic is noticeably slower in the per frame path
+CONSECUTIVE_FRAME_PCI = int(CanTpMessageType.CONSECUTIVE_FRAME) << 4
+
+# I/O steps yielded by the encoding and decoding generators, along with their argument:
+#: wait for the next frame, the argument is the timeout, the frame or None is sent back
+RECEIVE = "receive"
+#: send a frame right away, the argument is the frame
+TRANSMIT = "transmit"
+#: send a frame once the pacer allows it, the argument is the frame
+PACED_TRANSMIT = "paced_transmit"
+#: send a list of frames at once through the connector's transmit_many
+TRANSMIT_BLOCK = "transmit_block"
+#: let the given number of seconds elapse
+DELAY = "delay"
+#: wait for the next frame from any functional responder, the argument is the timeout,
+#: a (response ID, frame) tuple or None is sent back
+RECEIVE_FUNCTIONAL = "receive_functional"
+#: send a frame to another ID than the request ID, the argument is a (frame, arbitration ID) tuple
+TRANSMIT_TO = "transmit_to"
+
+#: generator of (step, argument) tuples, see CanTp._run_steps
+Steps = Generator[Tuple[str, Any], Any, Any]
+
+
+def as_memoryview(data: Union[BytesLike, Sequence[int]]) -> memoryview:
+    """Return a byte-oriented memoryview on the given data without copying
+    it whenever possible.
+
+    :param data: bytes-like object or sequence of integers
+    :return: memoryview of format 'B' on the data
+    """
+    if isinstance(data, memoryview):
+        return data if data.format == "B" else data.cast("B")
+    if isinstance(data, (bytes, bytearray)):
+        return memoryview(data)
+    # legacy list API, a single copy is unavoidable
+    return memoryview(bytes(data))
+
 
 ##
 # @class CanTp
@@ -46,6 +102,10 @@ logger = logging.getLogger(__name__)
 #
 # Will spawn a CanTpListener class for incoming messages
 # depends on a bus object for communication on CAN
+#
+# The connector has to provide a transmit(data, req_id) method. Connectors able to send
+# several frames at once can also provide transmit_many(frames, req_id), it is then used
+# to send whole blocks of consecutive frames when the receiver requests no STmin.
 class CanTp(TpInterface):
 
     configParams = ["reqId", "resId", "addressingType"]
@@ -73,35 +133,111 @@ class CanTp(TpInterface):
             self._addressing_type = CanTpAddressingTypes.NORMAL
         elif addressingType == "NORMAL_FIXED":
             self._addressing_type = CanTpAddressingTypes.NORMAL_FIXED
-        elif self._addressing_type == "EXTENDED":
+        elif addressingType == "EXTENDED":
             self._addressing_type = CanTpAddressingTypes.EXTENDED
         elif addressingType == "MIXED":
             self._addressing_type = CanTpAddressingTypes.MIXED
         else:
             raise Exception("Do not understand the addressing config")
 
-        self.__reqId = Config.isotp.req_id
-        self.__resId = Config.isotp.res_id
+        if self._addressing_type == CanTpAddressingTypes.NORMAL_FIXED:
+            # the IDs are made of the addresses, the responses are sent by the target to the source
+            self.__reqId = NORMAL_FIXED_PHYSICAL_BASE_ID | (self.__N_TA << 8) | self.__N_SA
+            self.__resId = NORMAL_FIXED_PHYSICAL_BASE_ID | (self.__N_SA << 8) | self.__N_TA
+        else:
+            self.__reqId = Config.isotp.req_id
+            self.__resId = Config.isotp.res_id
+        self.__funcReqId = Config.isotp.func_req_id
+        if self.__funcReqId is None and self._addressing_type == CanTpAddressingTypes.NORMAL_FIXED:
+            # the functional requests go to a functional address, e.g. 0x33 for OBD, not to the ECU's one
+            self.__funcReqId = NORMAL_FIXED_FUNCTIONAL_BASE_ID | (Config.isotp.func_n_ta << 8) | self.__N_SA
+        # response ID -> physical request ID of the ECUs answering the functional requests
+        self._functional_responders = dict(Config.isotp.func_responders)
+        # the frames of the responders are only collected after a functional request
+        self._functional_active = False
 
-        self._connection = connector
-        self._recv_buffer = queue.Queue()
+        try:
+            self._padding = CanTpPaddingTypes[Config.isotp.padding]
+        except KeyError:
+            raise Exception("Do not understand the padding config") from None
+        if Config.isotp.padding_pattern is not None:
+            self.PADDING_PATTERN = Config.isotp.padding_pattern
+
+        self.connection = connector
+        self._recv_buffer = self._new_buffer()
+        self._functional_buffer = self._new_buffer()
         self._discard_negative_responses = Config.isotp.discard_neg_resp
 
-        # default STmin for flow control when receiving consecutive frames 
-        self.st_min = 0.030
-
-        # sets up the relevant parameters in the instance
-        if self._addressing_type in (CanTpAddressingTypes.NORMAL, CanTpAddressingTypes.NORMAL_FIXED):
-            self._pdu_start_index = 0
-        elif self._addressing_type in (CanTpAddressingTypes.EXTENDED, CanTpAddressingTypes.MIXED):
-            self._pdu_start_index = 1
+        # block size, STmin and WAIT frames announced when receiving consecutive frames
+        self.rx_flow_control = ReceiveFlowControl(
+            block_size=Config.isotp.rx_block_size,
+            st_min=Config.isotp.rx_st_min,
+            wait_frames=Config.isotp.rx_wait_frames,
+            wft_max=Config.isotp.rx_wft_max,
+            adaptive=Config.isotp.rx_adaptive,
+        )
+        # longest message accepted from the bus, longer first frames are answered with an overflow flow control
+        self.rx_max_message_length = Config.isotp.rx_max_message_length
+        # ISO 15765-2 timing parameters, in seconds
+        self.n_as = Config.isotp.n_as
+        self.n_bs = Config.isotp.n_bs
+        self.n_cr = Config.isotp.n_cr
+        # maximum number of flow control WAIT frames accepted in a row when sending
+        self.tx_wft_max = Config.isotp.tx_wft_max
+        # paces the consecutive frames with the STmin requested by the receiver
+        self.pacer = PacingScheduler()
+
+        # address extension first data byte of the sent and received frames, None if not used:
+        # N_AE both ways for mixed addressing, N_TA when sending and N_SA when receiving for extended addressing
+        if self._addressing_type == CanTpAddressingTypes.MIXED:
+            self._tx_address_extension = self._rx_address_extension = self.__N_AE
+            self._functional_tx_address_extension = self.__N_AE
+        elif self._addressing_type == CanTpAddressingTypes.EXTENDED:
+            self._tx_address_extension = self.__N_TA
+            self._rx_address_extension = self.__N_SA
+            self._functional_tx_address_extension = Config.isotp.func_n_ta
+        else:
+            self._tx_address_extension = self._rx_address_extension = None
+            self._functional_tx_address_extension = None
+        self._pdu_start_index = 0 if self._tx_address_extension is None else 1
+        self._compile_rx_filter()
 
         self._max_frame_length = 64 if is_fd else 8
-        # 7 bytes PDU for normal addressing, 6 for extended and mixed
-        self._max_pdu_length = (self._max_frame_length - self._pdu_start_index - MINIMUM_HEADER_SIZE)
+        self._compute_frame_lengths()
+        # last frames sent and received, None if the capture is disabled
+        self.capture = FrameCapture(Config.isotp.capture_size, is_fd) if Config.isotp.capture_size else None
+        # frames sent, and received for this instance, since its creation
+        self.frames_sent = 0
+        self.frames_received = 0
         # maximum payload length of a 'classic' single frame with a message data length of 7 bytes at most (defined by ISO)
         self._single_frame_max_length_for_short_header = 0b111 - self._pdu_start_index
 
+    def _compute_frame_lengths(self) -> None:
+        """Compute the payload capacity of the frames and the padded
+        length of every frame length for the current frame size.
+        """
+        # 7 bytes PDU for normal addressing, 6 for extended and mixed
+        self._max_pdu_length = self._max_frame_length - self._pdu_start_index - MINIMUM_HEADER_SIZE
+        # CAN FD single frames longer than 8 bytes carry the length in a second byte
+        self._single_frame_max_length = self._max_pdu_length - (self._max_frame_length > 8)
+
+        start = self._pdu_start_index
+        lengths = []
+        for length in range(start, self._max_frame_length + 1):
+            if self._max_frame_length == 8:
+                padded = length if self._padding == CanTpPaddingTypes.NONE else 8
+            else:
+                padded = CAN_FD_DLC_LENGTHS[CAN_FD_DLC[length]]
+                if self._padding == CanTpPaddingTypes.MANDATORY:
+                    padded = max(padded, 8)
+            # the address extension is added when the frame is sent
+            lengths.append(padded - start)
+        self._padded_lengths = tuple(lengths)
+
+    def _new_buffer(self) -> FrameRingBuffer:
+        """Create a buffer for received frames."""
+        return FrameRingBuffer(Config.isotp.rx_buffer_size)
+
     @property
     def is_fd(self) -> bool:
         return self._max_frame_length == 64
@@ -109,7 +245,9 @@ class CanTp(TpInterface):
     @is_fd.setter
     def is_fd(self, value: bool):
         self._max_frame_length = 64 if value is True else 8
-        self._max_pdu_length = (self._max_frame_length - self._pdu_start_index - MINIMUM_HEADER_SIZE)
+        self._compute_frame_lengths()
+        if self.capture is not None:
+            self.capture.is_fd = self.is_fd
 
     @property
     def reqIdAddress(self):
@@ -126,6 +264,54 @@ class CanTp(TpInterface):
     @resIdAddress.setter
     def resIdAddress(self, value):
         self.__resId = value
+        self._compile_rx_filter()
+
+    def _compile_rx_filter(self) -> None:
+        """Compute the keys identifying the received frames meant for
+        this instance, so that filtering a frame is a single lookup.
+
+        The key of a frame is its arbitration ID, shifted left by 8 bits
+        and combined with the first data byte for the addressing types
+        using an address extension.
+        """
+        if self._rx_address_extension is None:
+            self._rx_match = self.__resId
+            self._functional_match = {resId: resId for resId in self._functional_responders}
+        else:
+            self._rx_match = (self.__resId << 8) | self._rx_address_extension
+            self._functional_match = {
+                (resId << 8) | self._rx_address_extension: resId for resId in self._functional_responders
+            }
+
+    @property
+    def functional_responders(self) -> Dict[int, int]:
+        """Response ID to physical request ID of the ECUs answering the
+        functional requests.
+        """
+        return self._functional_responders
+
+    @property
+    def st_min(self) -> float:
+        """STmin announced when receiving consecutive frames, in seconds."""
+        return self.rx_flow_control.st_min
+
+    @st_min.setter
+    def st_min(self, value: float):
+        self.rx_flow_control.st_min = value
+
+    @property
+    def rx_address_extension(self) -> int | None:
+        """First data byte identifying the frames for this instance, None
+        if the addressing type only relies on the arbitration ID.
+        """
+        return self._rx_address_extension
+
+    @property
+    def rx_buffer(self) -> FrameRingBuffer:
+        """Buffer of the received frames, gives access to the dropped
+        frames and overruns counters.
+        """
+        return self._recv_buffer
 
     @property
     def connection(self):
@@ -134,6 +320,20 @@ class CanTp(TpInterface):
     @connection.setter
     def connection(self, value):
         self._connection = value
+        # connectors written for the former list based frames get lists, see connector_accepts_bytes
+        self._frame_type = None if self.connector_accepts_bytes(value) else list
+
+    @staticmethod
+    def connector_accepts_bytes(connector) -> bool:
+        """True if the connector declares, with an ``accepts_bytes = True``
+        attribute, that its ``transmit`` and ``transmit_many`` methods
+        take the frames as any bytes-like object (``bytes``,
+        ``bytearray`` or ``memoryview``). The other connectors are given
+        the frames as lists of integers.
+
+        :param connector: connector given to CanTp
+        """
+        return getattr(connector, "accepts_bytes", False) is True
 
     ##
     # @brief send method
@@ -144,53 +344,88 @@ class CanTp(TpInterface):
         return result
     
     def make_single_frame(self, payload: List[int]) -> List[int]:
-        single_frame = [self.PADDING_PATTERN] * 8 
-        if not self.is_fd or len(payload) <= self._single_frame_max_length_for_short_header:
+        return list(self._build_single_frame(as_memoryview(payload)))
+
+    def make_first_frame(self, payload: List[int]) -> List[int]:
+        return list(self._build_first_frame(as_memoryview(payload)))
+
+    def make_consecutive_frame(self, payload: List[int], sequence_number: int = 1) -> List[int]:
+        return list(self._build_consecutive_frame(as_memoryview(payload), sequence_number))
+
+    def make_flow_control_frame(
+        self, blocksize: int = 0, st_min: float = 0, flow_status: int = CanTpFsTypes.CONTINUE_TO_SEND
+    ) -> List[int]:
+        return list(self._build_flow_control_frame(blocksize, st_min, flow_status))
+
+    def _new_frame(self, frame_length: int, data_length: int) -> bytearray:
+        """Allocate a frame and fill its unused tail with the padding pattern.
+
+        :param frame_length: total length of the frame
+        :param data_length: number of bytes that will be written by the caller
+        :return: the frame, ready to be filled with data
+        """
+        frame = bytearray(frame_length)
+        if frame_length > data_length and self.PADDING_PATTERN:
+            frame[data_length:] = bytes((self.PADDING_PATTERN,)) * (frame_length - data_length)
+        return frame
+
+    def _build_single_frame(self, payload: memoryview) -> bytearray:
+        length = len(payload)
+        if not self.is_fd or length <= self._single_frame_max_length_for_short_header:
             # if we are not using CAN FD or the payload can be packed within 8 bytes, create a short frame
             # the MDL is then indicated on the low nibble of the 1st byte
-            single_frame = [
-                (CanTpMessageType.SINGLE_FRAME << 4) + len(payload),
-                # pad the frame to send to have a total length of 8 bytes
-                *fillArray(
-                    payload, 
-                    length=self._single_frame_max_length_for_short_header, 
-                    fillValue=self.PADDING_PATTERN
-                )
-            ]
+            frame = self._new_frame(self._padded_length(length + 1), length + 1)
+            frame[0] = (CanTpMessageType.SINGLE_FRAME << 4) + length
+            frame[1 : 1 + length] = payload
         else:
             # otherwise the MDL is indicated in the entire 2nd byte
-            single_frame = [CanTpMessageType.SINGLE_FRAME, len(payload), *payload]
-            single_frame = self.add_padding(single_frame)
-        return single_frame
-    
-    def make_first_frame(self, payload: List[int]) -> List[int]:
+            frame = self._new_frame(self._padded_length(length + 2), length + 2)
+            frame[0] = CanTpMessageType.SINGLE_FRAME
+            frame[1] = length
+            frame[2 : 2 + length] = payload
+        return frame
+
+    def _build_first_frame(self, payload: memoryview) -> bytearray:
         mdl = len(payload)
-        mdl_high_nibble = (mdl & 0xF00) >> 8
-        mdl_low_nibble = mdl & 0x0FF
-        first_frame = [
-            (CanTpMessageType.FIRST_FRAME << 4) + mdl_high_nibble,
-            mdl_low_nibble,
-            *payload[: self._max_pdu_length - 1]
-        ]
-        first_frame = self.add_padding(first_frame)
-        return first_frame
-    
-    def make_consecutive_frame(self, payload: List[int], sequence_number: int = 1) -> List[int]:
-        consecutive_frame = [
-            (CanTpMessageType.CONSECUTIVE_FRAME << 4) + sequence_number,
-            *payload
-        ]
-        consecutive_frame = self.add_padding(consecutive_frame)
-        return consecutive_frame
-    
-    def make_flow_control_frame(self, blocksize: int = 0, st_min: float = 0) -> List[int]:
-        flow_control_frame = [
-            (CanTpMessageType.FLOW_CONTROL << 4), 
-            blocksize, 
-            self.encode_stMin(st_min)
-        ]
-        flow_control_frame = self.add_padding(flow_control_frame)
-        return flow_control_frame
+        # escape sequence, FF_DL of 0 followed by the length on 32 bits
+        escape = mdl > CANTP_MAX_PAYLOAD_LENGTH
+        header_length = FIRST_FRAME_ESCAPE_DATA_START_INDEX if escape else FIRST_FRAME_DATA_START_INDEX
+        data_length = self._first_frame_data_length(escape)
+        frame = self._new_frame(self._padded_length(data_length + header_length), data_length + header_length)
+        if not escape:
+            frame[0] = (CanTpMessageType.FIRST_FRAME << 4) + ((mdl & 0xF00) >> 8)
+            frame[1] = mdl & 0x0FF
+        else:
+            frame[0] = CanTpMessageType.FIRST_FRAME << 4
+            frame[FIRST_FRAME_ESCAPE_DL_INDEX:header_length] = mdl.to_bytes(4, "big")
+        frame[header_length : header_length + data_length] = payload[:data_length]
+        return frame
+
+    def _first_frame_data_length(self, escape: bool = False) -> int:
+        """Return the number of payload bytes carried by a first frame.
+
+        :param escape: True if the message length is sent with the escape
+            sequence, taking 4 more bytes
+        :return: the first frame's data length
+        """
+        header_length = FIRST_FRAME_ESCAPE_DATA_START_INDEX if escape else FIRST_FRAME_DATA_START_INDEX
+        return self._max_pdu_length + MINIMUM_HEADER_SIZE - header_length
+
+    def _build_consecutive_frame(self, payload: memoryview, sequence_number: int = 1) -> bytearray:
+        length = len(payload)
+        frame = self._new_frame(self._padded_length(length + 1), length + 1)
+        frame[0] = CONSECUTIVE_FRAME_PCI + sequence_number
+        frame[1 : 1 + length] = payload
+        return frame
+
+    def _build_flow_control_frame(
+        self, blocksize: int = 0, st_min: float = 0, flow_status: int = CanTpFsTypes.CONTINUE_TO_SEND
+    ) -> bytearray:
+        frame = self._new_frame(self._padded_length(3), 3)
+        frame[0] = (CanTpMessageType.FLOW_CONTROL << 4) + flow_status
+        frame[1] = blocksize
+        frame[2] = self.encode_stMin(st_min)
+        return frame
 
     ##
     # @brief encoding method
@@ -203,95 +438,141 @@ class CanTp(TpInterface):
         functionalReq: bool = False,
         use_external_snd_rcv_functions: bool = False,
     ) -> List[int] | None:
+        use_block_transmission = not use_external_snd_rcv_functions and self.supports_block_transmission
+        steps = self._encode_isotp_steps(as_memoryview(payload), use_block_transmission, functionalReq)
+        _, data = self._run_steps(steps, functionalReq, use_external_snd_rcv_functions)
 
-        payloadLength = len(payload)
-        payloadPtr = 0
+        if use_external_snd_rcv_functions:
+            return data
 
-        state = CanTpState.IDLE
+    def _encode_isotp_steps(
+        self, payload: memoryview, use_block_transmission: bool = False, functionalReq: bool = False
+    ) -> Steps:
+        """Segment and send a message, as a sequence of I/O steps.
+
+        The protocol logic is kept free of any actual I/O so that it is
+        shared by the blocking and the asyncio transports, see
+        :meth:`_run_steps`.
+
+        :param payload: the message to send
+        :param use_block_transmission: True if the consecutive frames may
+            be handed over to the connector a block at a time
+        :param functionalReq: True to send the message on the functional
+            request ID and collect the responses of all the responders
+        :return: a generator of the steps to perform
+        """
+        payloadLength = len(payload)
 
-        if payloadLength > CANTP_MAX_PAYLOAD_LENGTH:
+        if payloadLength > CANTP_MAX_ESCAPE_PAYLOAD_LENGTH:
             raise ValueError("Payload too large for CAN Transport Protocol")
 
-        if payloadLength <= self._max_pdu_length:
-            state = CanTpState.SEND_SINGLE_FRAME
-        else:
-            # we might need a check for functional request as we may not be able to service functional requests for
-            # multi frame requests
-            state = CanTpState.SEND_FIRST_FRAME
-
-        sequenceNumber = 1
-        endOfMessage_flag = False
+        # responses to a previous functional request are not collected any longer
+        self._functional_active = functionalReq
+        if functionalReq:
+            if payloadLength > self._single_frame_max_length:
+                raise ValueError("Functional requests have to fit in a single frame")
+            self._functional_buffer.clear()
+
+        if payloadLength <= self._single_frame_max_length:
+            yield TRANSMIT, self._build_single_frame(payload)
+            return
+
+        yield TRANSMIT, self._build_first_frame(payload)
+        # consecutive frames are all prepared when the first frame is sent
+        plan = self.plan_consecutive_frames(
+            payload[self._first_frame_data_length(payloadLength > CANTP_MAX_PAYLOAD_LENGTH) :]
+        )
+        frameIndex = 0
+
+        while frameIndex < len(plan):
+            blockEnd = yield from self._wait_flow_control_steps(frameIndex, len(plan))
+            if self.pacer.interval == 0 and use_block_transmission:
+                # nothing to wait between the frames, let the connector send the whole block at once
+                yield TRANSMIT_BLOCK, plan.block(frameIndex, blockEnd)
+                frameIndex = blockEnd
+            else:
+                while frameIndex < blockEnd:
+                    yield PACED_TRANSMIT, plan[frameIndex]
+                    frameIndex += 1
 
-        blockList = []
-        current_block = []
+    def _wait_flow_control_steps(self, frameIndex: int, frameCount: int) -> Steps:
+        """Wait for the receiver to allow the next block of consecutive frames.
 
-        # TODO this needs fixing to get the timing from the config
-        # general timeout when waiting for a flow control frame from the ECU
-        timeoutTimer = ResettableTimer(1)
-        stMinTimer = ResettableTimer()
+        :param frameIndex: index of the next consecutive frame to send
+        :param frameCount: total number of consecutive frames
+        :return: a generator of the steps to perform, returning the index
+            following the last frame of the allowed block
+        """
+        deadline = perf_counter() + self.n_bs
+        waitFrames = 0
+
+        while True:
+            rxPdu = yield RECEIVE, deadline - perf_counter()
+            if rxPdu is None:
+                raise TimeoutError("Timed out while waiting for flow control message")
+
+            N_PCI = (rxPdu[0] & 0xF0) >> 4
+            if N_PCI != CanTpMessageType.FLOW_CONTROL:
+                logger.warning(f"Unexpected response from ECU while waiting for flow control: 0x{bytes(rxPdu).hex()}")
+                continue
+
+            fs = rxPdu[0] & 0x0F
+            if fs == CanTpFsTypes.CONTINUE_TO_SEND:
+                block_size = rxPdu[FC_BS_INDEX]
+                self.pacer.interval = self.decode_stMin(rxPdu[FC_STMIN_INDEX])
+                self.pacer.start()
+                if block_size == 0:
+                    return frameCount
+                return min(frameIndex + block_size, frameCount)
+            elif fs == CanTpFsTypes.WAIT:
+                waitFrames += 1
+                if waitFrames > self.tx_wft_max:
+                    raise Exception(f"Received more than {self.tx_wft_max} flow control WAIT frames in a row")
+                # the receiver is busy, wait again for as long as for the first flow control
+                deadline = perf_counter() + self.n_bs
+            elif fs == CanTpFsTypes.OVERFLOW:
+                raise Exception("Overflow received from ECU")
+            else:
+                raise ValueError(f"Unexpected fs response from ECU. {rxPdu}")
 
+    def _run_steps(
+        self,
+        steps: Steps,
+        functionalReq: bool = False,
+        use_external_snd_rcv_functions: bool = False,
+    ) -> Tuple[Any, Any]:
+        """Perform the I/O steps of an encoding or decoding generator,
+        blocking the calling thread.
+
+        :param steps: generator from _encode_isotp_steps or _decode_isotp_steps
+        :param functionalReq: True if the frames are part of a functional request
+        :param use_external_snd_rcv_functions: boolean to state if external
+            sending and receiving functions shall be used
+        :return: the value returned by the generator and the value returned
+            by the last call to transmit
+        """
+        result = None
         data = None
-
-        while endOfMessage_flag is False:
-
-            if state == CanTpState.WAIT_FLOW_CONTROL:
-                rxPdu = self.getNextBufferedMessage(timeoutTimer.remainingTime)
-                if rxPdu is None:
-                    raise TimeoutError("Timed out while waiting for flow control message")
-
-                N_PCI = (rxPdu[0] & 0xF0) >> 4
-                if N_PCI == CanTpMessageType.FLOW_CONTROL:
-                    fs = rxPdu[0] & 0x0F
-                    if fs == CanTpFsTypes.CONTINUE_TO_SEND:
-                        if state != CanTpState.WAIT_FLOW_CONTROL:
-                            raise ValueError(
-                                "Received unexpected Flow Control Continue to Send request"
-                            )
-
-                        block_size = rxPdu[FC_BS_INDEX]
-                        if block_size == 0:
-                            block_size = 585
-                        blockList = self.create_blockList(payload[payloadPtr:], block_size)
-                        current_block = blockList.pop(0)
-                        stMin = self.decode_stMin(rxPdu[FC_STMIN_INDEX])
-                        stMinTimer.timeoutTime = stMin
-                        stMinTimer.start()
-                        timeoutTimer.stop()
-                        state = CanTpState.SEND_CONSECUTIVE_FRAME
-                    elif fs == CanTpFsTypes.WAIT:
-                        raise NotImplementedError("Wait not currently supported")
-                    elif fs == CanTpFsTypes.OVERFLOW:
-                        raise Exception("Overflow received from ECU")
-                    else:
-                        raise ValueError(f"Unexpected fs response from ECU. {rxPdu}")
+        try:
+            while True:
+                step, argument = steps.send(result)
+                if step is RECEIVE:
+                    result = self.getNextBufferedMessage(argument)
+                elif step is PACED_TRANSMIT:
+                    self.pacer.wait()
+                    result = data = self.transmit(argument, functionalReq, use_external_snd_rcv_functions)
+                elif step is TRANSMIT:
+                    result = data = self.transmit(argument, functionalReq, use_external_snd_rcv_functions)
+                elif step is TRANSMIT_BLOCK:
+                    result = self.transmit_block(argument, functionalReq)
+                elif step is RECEIVE_FUNCTIONAL:
+                    result = self._functional_buffer.get(argument)
+                elif step is TRANSMIT_TO:
+                    result = self.transmit_to(*argument)
                 else:
-                    logger.warning(f"Unexpected response from ECU while waiting for flow control: 0x{bytes(rxPdu).hex()}")
-
-            if state == CanTpState.SEND_SINGLE_FRAME:
-                txPdu = self.make_single_frame(payload)
-                data = self.transmit(txPdu, functionalReq, use_external_snd_rcv_functions)
-                endOfMessage_flag = True
-            elif state == CanTpState.SEND_FIRST_FRAME:
-                txPdu = self.make_first_frame(payload)
-                payloadPtr += self._max_pdu_length - 1
-                data = self.transmit(txPdu, functionalReq, use_external_snd_rcv_functions)
-                timeoutTimer.start()
-                state = CanTpState.WAIT_FLOW_CONTROL
-            elif state == CanTpState.SEND_CONSECUTIVE_FRAME and stMinTimer.isExpired():
-                txPdu = self.make_consecutive_frame(current_block.pop(0), sequenceNumber)
-                payloadPtr += self._max_pdu_length
-                data = self.transmit(txPdu, functionalReq, use_external_snd_rcv_functions)
-                sequenceNumber = (sequenceNumber + 1) % 16
-                stMinTimer.restart()
-                if len(current_block) == 0:
-                    if len(blockList) == 0:
-                        endOfMessage_flag = True
-                    else:
-                        timeoutTimer.start()
-                        state = CanTpState.WAIT_FLOW_CONTROL
-
-        if use_external_snd_rcv_functions:
-            return data
+                    result = sleep(argument)
+        except StopIteration as stop:
+            return stop.value, data
 
     ##
     # @brief recv method
@@ -312,106 +593,382 @@ class CanTp(TpInterface):
         received_data=None,
         use_external_snd_rcv_functions: bool = False,
     ) -> list:
+        return list(self.decode_isotp_bytes(timeout_s, received_data, use_external_snd_rcv_functions))
+
+    def decode_isotp_bytes(
+        self,
+        timeout_s=1,
+        received_data=None,
+        use_external_snd_rcv_functions: bool = False,
+        buffer: WritableBuffer | None = None,
+    ) -> bytearray | memoryview:
+        """Receive and reassemble an ISO-TP message.
+
+        The message is written in place into a ``bytearray`` allocated
+        from the length announced by the first frame, or into the given
+        buffer, and returned without any further copy.
+
+        :param timeout_s: time to wait for the first frame of the message,
+            the consecutive frames are awaited for N_Cr
+        :param received_data: frame to decode in case of external reception
+        :param use_external_snd_rcv_functions: True if the first frame
+            is given through received_data
+        :param buffer: writable buffer to reassemble the message into,
+            e.g. to reuse the same memory for successive messages
+        :return: the reassembled message, a view on the beginning of the
+            buffer if one is given
+        :raises ValueError: if the message does not fit in the given buffer
+        """
+        if not use_external_snd_rcv_functions:
+            received_data = None
+        payload, _ = self._run_steps(self._decode_isotp_steps(timeout_s, received_data, buffer))
+        return payload
+
+    def recv_functional(
+        self, timeout_s: float = 1, responders: Sequence[int] | None = None
+    ) -> Dict[int, List[List[int]]]:
+        """Collect the responses to the last functional request.
+
+        The messages of all the responders are reassembled concurrently,
+        each multi-frame response getting its own flow control sent to
+        the physical request ID of its responder.
+
+        :param timeout_s: time during which new responses are accepted,
+            the reassembly of the messages started within this time may
+            last longer
+        :param responders: response IDs after whose messages to stop
+            early, all the configured functional responders if None
+        :return: the messages received, per response ID
+        """
+        responses, _ = self._run_steps(self._collect_functional_steps(timeout_s, responders))
+        return {resId: [list(message) for message in messages] for resId, messages in responses.items()}
+
+    def _collect_functional_steps(self, timeout_s: float, responders: Sequence[int] | None = None) -> Steps:
+        """Reassemble the responses of the functional responders, as a
+        sequence of I/O steps.
+
+        :param timeout_s: time during which new responses are accepted
+        :param responders: response IDs after whose messages to stop
+            early, all the configured functional responders if None
+        :return: a generator of the steps to perform, returning the
+            messages per response ID
+        """
+        expected = set(self._functional_responders if responders is None else responders)
+        deadline = perf_counter() + timeout_s
+        # the responders share the functional buffer, whose lost frames cannot be told apart:
+        # their flow control is the configured one, not adapted like the physical one
+        flowControl = ReceiveFlowControl(
+            block_size=self.rx_flow_control.block_size,
+            st_min=self.rx_flow_control.st_min,
+            wait_frames=self.rx_flow_control.wait_frames,
+            wft_max=self.rx_flow_control.wft_max,
+        )
+        responses: Dict[int, List[bytearray]] = {}
+        # response ID -> (decoding generator waiting for a frame, deadline for that frame)
+        reassemblies: Dict[int, Tuple[Steps, float]] = {}
+
+        while True:
+            now = perf_counter()
+            for resId, (steps, frameDeadline) in list(reassemblies.items()):
+                if frameDeadline <= now:
+                    del reassemblies[resId]
+                    yield from self._feed_functional_steps(resId, steps, None, responses, reassemblies)
+            # a reassembly in progress may go on after the end of the collection time
+            deadlines = [frameDeadline for _, frameDeadline in reassemblies.values()]
+            if now < deadline:
+                deadlines.append(deadline)
+            if not deadlines or (not reassemblies and expected and expected.issubset(responses)):
+                break
+
+            received = yield RECEIVE_FUNCTIONAL, min(deadlines) - now
+            if received is None:
+                continue
+            resId, rxPdu = received
+            if resId in reassemblies:
+                steps = reassemblies.pop(resId)[0]
+            elif perf_counter() < deadline:
+                steps = self._decode_isotp_steps(
+                    timeout_s, flow_control=flowControl, frame_buffer=self._functional_buffer
+                )
+                # run up to the reception of the first frame
+                next(steps)
+            else:
+                continue
+            yield from self._feed_functional_steps(resId, steps, rxPdu, responses, reassemblies)
+
+        return responses
+
+    def _feed_functional_steps(
+        self,
+        resId: int,
+        steps: Steps,
+        rxPdu: BytesLike | None,
+        responses: Dict[int, List[bytearray]],
+        reassemblies: Dict[int, Tuple[Steps, float]],
+    ) -> Steps:
+        """Hand a received frame over to the decoding generator of its
+        responder and perform its steps until it needs the next frame.
+
+        :param resId: response ID of the responder
+        :param steps: decoding generator of the responder
+        :param rxPdu: the received frame, None if it timed out
+        :param responses: complete messages per response ID
+        :param reassemblies: decoding generators waiting for a frame
+        :return: a generator of the steps to perform
+        """
+        value = rxPdu
+        try:
+            while True:
+                step, argument = steps.send(value)
+                if step is RECEIVE:
+                    reassemblies[resId] = (steps, perf_counter() + argument)
+                    return
+                if step is TRANSMIT:
+                    # flow control for this responder only
+                    value = yield TRANSMIT_TO, (argument, self._functional_responders[resId])
+                else:
+                    value = yield step, argument
+        except StopIteration as stop:
+            responses.setdefault(resId, []).append(stop.value)
+        except (TimeoutError, ValueError) as error:
+            logger.warning(f"Dropped the response from 0x{resId:X}: {error}")
 
-        payload = []
+    def _decode_isotp_steps(
+        self,
+        timeout_s: float = 1,
+        received_data: BytesLike | None = None,
+        buffer: WritableBuffer | None = None,
+        flow_control: ReceiveFlowControl | None = None,
+        frame_buffer: FrameRingBuffer | None = None,
+    ) -> Steps:
+        """Receive and reassemble a message, as a sequence of I/O steps.
+
+        The message is written in place as the frames arrive, into a
+        buffer allocated once its length is known or into the given one.
+
+        :param timeout_s: time to wait for the first frame of the message
+        :param received_data: first frame of the message if it was
+            received externally
+        :param buffer: writable buffer to reassemble the message into
+        :param flow_control: flow control announced to the sender,
+            rx_flow_control if None
+        :param frame_buffer: buffer the frames are received from, whose
+            dropped frames tell whether a block was received cleanly,
+            the physical receive buffer if None
+        :return: a generator of the steps to perform, returning the
+            reassembled message
+        """
+        payload = None
         payloadPtr = 0
         payloadLength = None
 
         sequenceNumberExpected = 1
+        # consecutive frames left before the end of the block, 0 if blocks are unlimited
+        blockFramesLeft = 0
+        flowControl = self.rx_flow_control if flow_control is None else flow_control
+        frameBuffer = self._recv_buffer if frame_buffer is None else frame_buffer
+        droppedFrames = frameBuffer.dropped
 
         endOfMessage_flag = False
 
         state = CanTpState.IDLE
 
-        timeoutTimer = ResettableTimer(timeout_s)
-        timeoutTimer.start()
+        deadline = perf_counter() + timeout_s
 
-        while endOfMessage_flag is False:
+        try:
+            while endOfMessage_flag is False:
 
-            if use_external_snd_rcv_functions and state != CanTpState.RECEIVING_CONSECUTIVE_FRAME:
-                rxPdu = received_data
-            else:
-                rxPdu = self.getNextBufferedMessage(timeout=timeoutTimer.remainingTime)
-                if rxPdu is None:
-                    raise TimeoutError(f"Timed out while waiting for message in state {state.name}")
+                if received_data is not None and state != CanTpState.RECEIVING_CONSECUTIVE_FRAME:
+                    rxPdu = received_data
+                else:
+                    rxPdu = yield RECEIVE, deadline - perf_counter()
+                    if rxPdu is None:
+                        raise TimeoutError(f"Timed out while waiting for message in state {state.name}")
+                if not isinstance(rxPdu, (bytes, bytearray, memoryview)):
+                    rxPdu = bytes(rxPdu)
+
+                # CAN FD single frames longer than 8 bytes carry SF_DL in a second byte
+                escapeSequence = rxPdu[N_PCI_INDEX] == 0x00
+                if escapeSequence:
+                    rxPdu = rxPdu[1:]
+                    N_PCI = CanTpMessageType.SINGLE_FRAME
+                else:
+                    N_PCI = (rxPdu[N_PCI_INDEX] & 0xF0) >> 4
+
+                if state == CanTpState.IDLE:
+                    if N_PCI == CanTpMessageType.SINGLE_FRAME:
+                        payloadLength = rxPdu[N_PCI_INDEX & 0x0F]
+                        maxLength = len(rxPdu) - SINGLE_FRAME_DATA_START_INDEX
+                        if not escapeSequence:
+                            maxLength = min(maxLength, self._single_frame_max_length_for_short_header)
+                        if not 0 < payloadLength <= maxLength:
+                            raise ValueError(
+                                f"Single frame of {payloadLength} bytes invalid, at most {maxLength} bytes fit in this frame"
+                            )
+                        if buffer is not None and len(buffer) < payloadLength:
+                            raise ValueError(f"Message of {payloadLength} bytes too large for the buffer")
+                        payload = self._new_reassembly_buffer(payloadLength, buffer)
+                        payload[:] = rxPdu[SINGLE_FRAME_DATA_START_INDEX : SINGLE_FRAME_DATA_START_INDEX + payloadLength]
+                        payloadPtr = payloadLength
+                        endOfMessage_flag = True
+                    elif N_PCI == CanTpMessageType.FIRST_FRAME:
+                        payloadLength = (
+                            (rxPdu[FIRST_FRAME_DL_INDEX_HIGH] & 0x0F) << 8
+                        ) + rxPdu[FIRST_FRAME_DL_INDEX_LOW]
+                        dataStart = FIRST_FRAME_DATA_START_INDEX
+                        if payloadLength == 0:
+                            # escape sequence, the length follows on 32 bits
+                            payloadLength = int.from_bytes(
+                                rxPdu[FIRST_FRAME_ESCAPE_DL_INDEX:FIRST_FRAME_ESCAPE_DATA_START_INDEX], "big"
+                            )
+                            dataStart = FIRST_FRAME_ESCAPE_DATA_START_INDEX
+                            if payloadLength <= CANTP_MAX_PAYLOAD_LENGTH:
+                                raise ValueError(
+                                    f"Escape sequence first frame of {payloadLength} bytes, short enough for a 12 bits FF_DL"
+                                )
+                        elif payloadLength <= self._received_single_frame_max_length(len(rxPdu)):
+                            raise ValueError(f"First frame of {payloadLength} bytes, short enough for a single frame")
+                        if payloadLength > self.rx_max_message_length:
+                            # FF_DL comes from the bus, do not allocate whatever it announces
+                            yield TRANSMIT, self._build_flow_control_frame(flow_status=CanTpFsTypes.OVERFLOW)
+                            raise ValueError(
+                                f"Message of {payloadLength} bytes longer than the maximum of {self.rx_max_message_length}"
+                            )
+                        if buffer is not None and len(buffer) < payloadLength:
+                            # let the sender know that the message will not be received
+                            yield TRANSMIT, self._build_flow_control_frame(flow_status=CanTpFsTypes.OVERFLOW)
+                            raise ValueError(f"Message of {payloadLength} bytes too large for the buffer")
+                        payload = self._new_reassembly_buffer(payloadLength, buffer)
+                        data = rxPdu[dataStart : dataStart + payloadLength]
+                        payload[: len(data)] = data
+                        payloadPtr = len(data)
+                        state = CanTpState.SEND_FLOW_CONTROL
+                elif state == CanTpState.RECEIVING_CONSECUTIVE_FRAME:
+                    if N_PCI == CanTpMessageType.CONSECUTIVE_FRAME:
+                        sequenceNumber = (
+                            rxPdu[CONSECUTIVE_FRAME_SEQUENCE_NUMBER_INDEX] & 0x0F
+                        )
+                        if sequenceNumber != sequenceNumberExpected:
+                            raise ValueError(
+                                f"Consecutive frame sequence out of order, expected {sequenceNumberExpected} got {sequenceNumber}"
+                            )
 
-            if rxPdu[N_PCI_INDEX] == 0x00:
-                rxPdu = rxPdu[1:]
-                N_PCI = CanTpMessageType.SINGLE_FRAME
-            else:
-                N_PCI = (rxPdu[N_PCI_INDEX] & 0xF0) >> 4
-
-            if state == CanTpState.IDLE:
-                if N_PCI == CanTpMessageType.SINGLE_FRAME:
-                    payloadLength = rxPdu[N_PCI_INDEX & 0x0F]
-                    payload = rxPdu[
-                        SINGLE_FRAME_DATA_START_INDEX : SINGLE_FRAME_DATA_START_INDEX
-                        + payloadLength
-                    ]
-                    endOfMessage_flag = True
-                elif N_PCI == CanTpMessageType.FIRST_FRAME:
-                    payload = rxPdu[FIRST_FRAME_DATA_START_INDEX:]
-                    payloadLength = (
-                        (rxPdu[FIRST_FRAME_DL_INDEX_HIGH] & 0x0F) << 8
-                    ) + rxPdu[FIRST_FRAME_DL_INDEX_LOW]
-                    payloadPtr = self._max_pdu_length - 1
-                    state = CanTpState.SEND_FLOW_CONTROL
-            elif state == CanTpState.RECEIVING_CONSECUTIVE_FRAME:
-                if N_PCI == CanTpMessageType.CONSECUTIVE_FRAME:
-                    sequenceNumber = (
-                        rxPdu[CONSECUTIVE_FRAME_SEQUENCE_NUMBER_INDEX] & 0x0F
-                    )
-                    if sequenceNumber != sequenceNumberExpected:
-                        raise ValueError(
-                            f"Consecutive frame sequence out of order, expected {sequenceNumberExpected} got {sequenceNumber}"
+                        sequenceNumberExpected = (sequenceNumberExpected + 1) % 16
+                        # the padding of the last consecutive frame is left out
+                        data = rxPdu[
+                            CONSECUTIVE_FRAME_SEQUENCE_DATA_START_INDEX : CONSECUTIVE_FRAME_SEQUENCE_DATA_START_INDEX
+                            + payloadLength
+                            - payloadPtr
+                        ]
+                        payload[payloadPtr : payloadPtr + len(data)] = data
+                        payloadPtr += len(data)
+                        deadline = perf_counter() + self.n_cr
+
+                        if blockFramesLeft:
+                            blockFramesLeft -= 1
+                            if blockFramesLeft == 0 and payloadPtr < payloadLength:
+                                # end of the block, the sender waits for the next flow control
+                                flowControl.update(clean=frameBuffer.dropped == droppedFrames)
+                                droppedFrames = frameBuffer.dropped
+                                state = CanTpState.SEND_FLOW_CONTROL
+                    else:
+                        logger.warning(
+                            f"Unexpected PDU received while waiting for consecutive frame: 0x{bytes(rxPdu).hex()}"
                         )
-                    
-                    sequenceNumberExpected = (sequenceNumberExpected + 1) % 16
-                    payload += rxPdu[CONSECUTIVE_FRAME_SEQUENCE_DATA_START_INDEX:]
-                    payloadPtr += self._max_pdu_length
-                    timeoutTimer.restart()
-                else:
-                    logger.warning(
-                        f"Unexpected PDU received while waiting for consecutive frame: 0x{bytes(rxPdu).hex()}"
-                    )
 
-            if state == CanTpState.SEND_FLOW_CONTROL:
-                txPdu = self.make_flow_control_frame(blocksize=0, st_min=self.st_min)
-                self.transmit(txPdu)
-                state = CanTpState.RECEIVING_CONSECUTIVE_FRAME
+                if state == CanTpState.SEND_FLOW_CONTROL:
+                    yield from self._send_flow_control_steps(flowControl)
+                    blockFramesLeft = flowControl.current_block_size
+                    deadline = perf_counter() + self.n_cr
+                    state = CanTpState.RECEIVING_CONSECUTIVE_FRAME
+
+                if payloadLength is not None and payloadPtr >= payloadLength:
+                    endOfMessage_flag = True
+        except (TimeoutError, ValueError):
+            if state == CanTpState.RECEIVING_CONSECUTIVE_FRAME:
+                flowControl.update(clean=False)
+            raise
+
+        if state == CanTpState.RECEIVING_CONSECUTIVE_FRAME:
+            flowControl.update(clean=frameBuffer.dropped == droppedFrames)
 
-            if payloadLength is not None and payloadPtr >= payloadLength:
-                endOfMessage_flag = True
+        return payload
 
-        return list(payload[:payloadLength])
+    def _received_single_frame_max_length(self, pdu_length: int) -> int:
+        """Maximum payload length of a single frame as long as a received
+        frame, the first frames announcing no more than this being invalid.
+
+        :param pdu_length: length of the received frame, without address
+            extension
+        :return: the length in bytes
+        """
+        frame_length = pdu_length + self._pdu_start_index
+        # CAN FD single frames longer than 8 bytes carry the length in a second byte
+        return pdu_length - MINIMUM_HEADER_SIZE - (frame_length > 8)
+
+    @staticmethod
+    def _new_reassembly_buffer(length: int, buffer: WritableBuffer | None = None) -> WritableBuffer:
+        """Provide the memory a message is reassembled into.
+
+        :param length: length of the message
+        :param buffer: writable buffer given by the caller, None to
+            allocate one
+        :return: a buffer of the message's length, written in place
+            through slice assignments which never resize it
+        """
+        if buffer is None:
+            return bytearray(length)
+        return memoryview(buffer).cast("B")[:length]
+
+    def _send_flow_control_steps(self, flowControl: ReceiveFlowControl) -> Steps:
+        """Send the flow control frames allowing the sender to go on with
+        the next block, preceded by the configured WAIT frames.
+
+        :param flowControl: flow control announced to the sender
+        :return: a generator of the steps to perform
+        """
+        for _ in range(flowControl.wait_frames):
+            yield TRANSMIT, self._build_flow_control_frame(flow_status=CanTpFsTypes.WAIT)
+            yield DELAY, flowControl.wait_interval
+        yield TRANSMIT, self._build_flow_control_frame(
+            blocksize=flowControl.current_block_size, st_min=flowControl.current_st_min
+        )
 
     ##
     # @brief clear out the receive list
     def clearBufferedMessages(self):
-        with self._recv_buffer.mutex:
-            self._recv_buffer.queue.clear()
+        self._recv_buffer.clear()
 
     ##
     # @brief retrieves the next message from the received message buffers
-    # @return list, or None if nothing is on the receive list
-    def getNextBufferedMessage(self, timeout: float = 0) -> List[int] | None:
-        try:
-            return self._recv_buffer.get(timeout=timeout)
-        except queue.Empty:
-            return None
+    # @return the frame data, or None if nothing is received before the timeout
+    def getNextBufferedMessage(self, timeout: float = 0) -> BytesLike | None:
+        return self._recv_buffer.get(timeout=timeout)
 
     ##
     # @brief the listener callback used when a message is received
     def callback_onReceive(self, msg):
-        if self._addressing_type == CanTpAddressingTypes.NORMAL:
-            if msg.arbitration_id == self.__resId:
-                self._recv_buffer.put(list(msg.data[self._pdu_start_index :]))
-        elif self._addressing_type == CanTpAddressingTypes.NORMAL_FIXED:
-            raise NotImplementedError("I do not know how to receive this addressing type yet")
-        elif self._addressing_type == CanTpAddressingTypes.MIXED:
-            raise NotImplementedError("I do not know how to receive this addressing type yet")
+        # python-can hands over a new bytearray for every message, keep a view on it instead of copying
+        data = msg.data
+        if self.capture is not None:
+            self.capture.rx.record(msg.timestamp, msg.arbitration_id, data)
+        if self._rx_address_extension is None:
+            key = msg.arbitration_id
+        elif data:
+            key = (msg.arbitration_id << 8) | data[0]
+            data = memoryview(data)[1:]
         else:
-            raise NotImplementedError("I do not know how to receive this addressing type")
+            return
+
+        if self._functional_active:
+            resId = self._functional_match.get(key)
+            if resId is not None:
+                self.frames_received += 1
+                self._functional_buffer.put((resId, data), msg.timestamp)
+                return
+        if key == self._rx_match:
+            self.frames_received += 1
+            self._recv_buffer.put(data, msg.timestamp)
 
     ##
     # @brief function to decode the StMin parameter
@@ -428,19 +985,38 @@ class CanTp(TpInterface):
         
     @staticmethod
     def encode_stMin(val: float) -> int:
-        if (0x01 * 1e-3) <= val <= (0x7F * 1e-3):
+        # rounding, as e.g. 0.029 * 1000 gives 28.999999999999996
+        if val == 0:
+            return 0x00
+        elif (0x01 * 1e-3) <= val <= (0x7F * 1e-3):
             # 1ms - 127ms -> 0x01 - 0x7F
-            return int(val * 1000)
+            return round(val * 1000)
         elif 1e-4 <= val <= 9e-4:
             # 100us - 900us -> 0xF1 - 0xF9
-            return 0xF0 + int(val * 1e4)
+            return 0xF0 + round(val * 1e4)
         else:
             raise ValueError(
                 f"Invalid STMin time {val}, should be between 0.1 and 0.9 ms or between 1 and 127 ms"
             )
 
+    def plan_consecutive_frames(self, payload: memoryview) -> SegmentationPlan:
+        """Prepare all the consecutive frames needed to send the payload.
+
+        :param payload: remaining payload after the first frame
+        :return: the consecutive frames, in sending order
+        """
+        remaining = len(payload) % self._max_pdu_length or self._max_pdu_length
+        return SegmentationPlan(
+            payload,
+            pdu_length=self._max_pdu_length,
+            frame_length=self._padded_length(self._max_pdu_length + 1),
+            last_frame_length=self._padded_length(remaining + 1),
+            padding_pattern=self.PADDING_PATTERN,
+        )
+
     ##
     # @brief creates the blocklist from the blocksize and payload
+    # @note kept for compatibility, encode_isotp relies on plan_consecutive_frames
     def create_blockList(self, payload: List[int], blockSize: int) -> List[List[int]]:
 
         blockList = []
@@ -475,43 +1051,103 @@ class CanTp(TpInterface):
 
         return blockList
     
+    def _padded_length(self, length: int) -> int:
+        """Return the length of a frame carrying length bytes once padded.
+
+        :param length: number of meaningful bytes in the frame
+        :return: the padded frame length, without the address extension
+            which is added when the frame is sent
+        """
+        return self._padded_lengths[length]
+
     def add_padding(self, payload: List[int]) -> List[int]:
         """Add padding to the payload to be sent over CAN. 
 
         :param payload: payload to be sent.
-        :param header_size: size of the ISO TP header of the CAN frame's payload.
         :return: the padded payload.
         """
-        if not self.is_fd:
-            return fillArray(
-                payload,
-                length=self._max_frame_length,
-                fillValue=self.PADDING_PATTERN,
-            )
-        else:
-            padded_length = next(size for size in self.CAN_FD_DATA_LENGTHS if size >= len(payload))
-            return fillArray(
-                payload,
-                length=padded_length,
-                fillValue=self.PADDING_PATTERN,
-            )
+        return fillArray(
+            payload,
+            length=self._padded_length(len(payload)),
+            fillValue=self.PADDING_PATTERN,
+        )
+
+    @property
+    def supports_block_transmission(self) -> bool:
+        """True if the connector is able to send several frames in a
+        single call through a ``transmit_many(frames, req_id)`` method.
+        """
+        return callable(getattr(self._connection, "transmit_many", None))
+
+    def _add_address(self, data: BytesLike, functionalReq: bool = False) -> BytesLike:
+        """Prepend the address extension to the frame if the addressing
+        type requires it.
+
+        :param data: frame to send, without address extension
+        :param functionalReq: True if the frame is a functional request
+        :return: the frame to hand over to the connector
+        """
+        addressExtension = self._functional_tx_address_extension if functionalReq else self._tx_address_extension
+        if addressExtension is None:
+            return data
+        transmitData = bytearray((addressExtension,))
+        transmitData.extend(data)
+        return transmitData
 
     ##
     # @brief transmits the data over can using can connection
     def transmit(
         self, data, functionalReq=False, use_external_snd_rcv_functions: bool = False
     ):
-        # check functional request
         if functionalReq:
-            raise Exception("Functional requests are currently not supported")
+            if self.__funcReqId is None:
+                raise ValueError("No functional request ID configured")
+            return self.transmit_to(data, self.__funcReqId, functionalReq=True)
+        return self.transmit_to(data, self.__reqId)
+
+    def transmit_to(self, data: BytesLike, arbitration_id: int, functionalReq: bool = False) -> None:
+        """Transmit a frame with the given arbitration ID.
 
-        transmitData = [0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
+        :param data: frame to send, without address extension
+        :param arbitration_id: ID to send the frame with
+        :param functionalReq: True to prepend the address extension of
+            the functional requests
+
+        :raises TimeoutError: if sending took longer than N_As
+        """
+        frame = self._add_address(data, functionalReq)
+        timestamp = time()
+        start = perf_counter()
+        self._connection.transmit(frame if self._frame_type is None else self._frame_type(frame), arbitration_id)
+        self.frames_sent += 1
+        if self.capture is not None:
+            self.capture.tx.record(timestamp, arbitration_id, frame)
+        if perf_counter() - start > self.n_as:
+            raise TimeoutError(f"Transmission of a frame took more than N_As ({self.n_as} s)")
+
+    def transmit_block(self, frames: List[BytesLike], functionalReq: bool = False) -> None:
+        """Transmit several frames with a single call to the connector's
+        ``transmit_many`` method.
+
+        :param frames: frames to send, in order
+        :param functionalReq: True if the frames are part of a functional request
+
+        :raises Exception: if a functional request is given
+        :raises TimeoutError: if sending took longer than N_As per frame
+        """
+        if functionalReq:
+            raise Exception("Functional requests are limited to single frames")
 
-        if self._addressing_type in (CanTpAddressingTypes.NORMAL, CanTpAddressingTypes.NORMAL_FIXED):
-            transmitData = data
-        elif self._addressing_type == CanTpAddressingTypes.MIXED:
-            transmitData[0] = self.__N_AE
-            transmitData[1:] = data
+        frames = [self._add_address(frame) for frame in frames]
+        timestamp = time()
+        start = perf_counter()
+        if self._frame_type is None:
+            self._connection.transmit_many(frames, self.__reqId)
         else:
-            raise Exception(f"Addressing type {self._addressing_type} is not supported yet")
-        self._connection.transmit(transmitData, self.__reqId)
+            self._connection.transmit_many([self._frame_type(frame) for frame in frames], self.__reqId)
+        self.frames_sent += len(frames)
+        if self.capture is not None:
+            for frame in frames:
+                self.capture.tx.record(timestamp, self.__reqId, frame)
+        if perf_counter() - start > self.n_as * len(frames):
+            raise TimeoutError(f"Transmission of a block of frames took more than N_As ({self.n_as} s) per frame")
@@ -0,0 +1,156 @@
+import threading
+from typing import Dict, Optional, Tuple, Union
+
+import can
+
+#: routing key, the arbitration ID alone or along with the address extension byte
+RouteKey = Union[int, Tuple[int, int]]
+
+
+class _Route:
+    """Receiver of the frames of one routing key, and how many it got."""
+
+    __slots__ = ("tp", "frames")
+
+    def __init__(self, tp) -> None:
+        self.tp = tp
+        self.frames = 0
+
+
+class CanTpDispatcher(can.Listener):
+    """Single bus listener routing the received frames to the CanTp
+    instances they are meant for.
+
+    Instead of offering every frame to the ``callback_onReceive`` of
+    every CanTp sharing the bus, the dispatcher looks the receiver up by
+    arbitration ID, and by address extension (first data byte) for the
+    mixed and extended addressing types::
+
+        dispatcher = CanTpDispatcher()
+        notifier = can.Notifier(bus, [dispatcher])
+        for tp in transports:
+            dispatcher.register(tp)
+
+    Registration may happen from any thread while frames are dispatched:
+    the routing tables are replaced rather than modified, so that the
+    notifier thread never takes a lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # arbitration ID -> route, for the addressing types without address extension
+        self._routes: Dict[int, _Route] = {}
+        # arbitration ID -> address extension -> route
+        self._extended_routes: Dict[int, Dict[int, _Route]] = {}
+        #: number of received frames no transport was registered for
+        self.unrouted = 0
+
+    @staticmethod
+    def route_key(tp) -> RouteKey:
+        """Return the key the frames for the given transport are routed with.
+
+        :param tp: CanTp instance
+        :return: the response ID, along with the address extension if the
+            addressing type uses one
+        """
+        address_extension = tp.rx_address_extension
+        if address_extension is None:
+            return tp.resIdAddress
+        return tp.resIdAddress, address_extension
+
+    def register(self, tp) -> None:
+        """Route the frames matching the transport's response ID and
+        address extension to its ``callback_onReceive``.
+
+        :param tp: CanTp instance
+        :raises ValueError: if another transport is already registered
+            for the same key
+        """
+        key = self.route_key(tp)
+        with self._lock:
+            if self._lookup(key) is not None:
+                raise ValueError(f"a transport is already registered for {self._format_key(key)}")
+            if isinstance(key, tuple):
+                arbitration_id, address_extension = key
+                extended_routes = dict(self._extended_routes)
+                by_extension = dict(extended_routes.get(arbitration_id, {}))
+                by_extension[address_extension] = _Route(tp)
+                extended_routes[arbitration_id] = by_extension
+                self._extended_routes = extended_routes
+            else:
+                routes = dict(self._routes)
+                routes[key] = _Route(tp)
+                self._routes = routes
+
+    def unregister(self, tp) -> None:
+        """Stop routing frames to the given transport.
+
+        :param tp: CanTp instance
+        :raises ValueError: if the transport is not registered
+        """
+        key = self.route_key(tp)
+        with self._lock:
+            route = self._lookup(key)
+            if route is None or route.tp is not tp:
+                raise ValueError(f"no such transport registered for {self._format_key(key)}")
+            if isinstance(key, tuple):
+                arbitration_id, address_extension = key
+                extended_routes = dict(self._extended_routes)
+                by_extension = dict(extended_routes[arbitration_id])
+                del by_extension[address_extension]
+                if by_extension:
+                    extended_routes[arbitration_id] = by_extension
+                else:
+                    del extended_routes[arbitration_id]
+                self._extended_routes = extended_routes
+            else:
+                routes = dict(self._routes)
+                del routes[key]
+                self._routes = routes
+
+    def _lookup(self, key: RouteKey) -> Optional[_Route]:
+        if isinstance(key, tuple):
+            return self._extended_routes.get(key[0], {}).get(key[1])
+        return self._routes.get(key)
+
+    @staticmethod
+    def _format_key(key: RouteKey) -> str:
+        if isinstance(key, tuple):
+            return f"ID 0x{key[0]:X} with address extension 0x{key[1]:02X}"
+        return f"ID 0x{key:X}"
+
+    def on_message_received(self, msg: can.Message) -> None:
+        """Hand the frame over to the transport registered for it.
+
+        :param msg: the received frame
+        """
+        route = self._routes.get(msg.arbitration_id)
+        if route is None:
+            by_extension = self._extended_routes.get(msg.arbitration_id)
+            if by_extension is not None and msg.data:
+                route = by_extension.get(msg.data[0])
+            if route is None:
+                self.unrouted += 1
+                return
+        route.frames += 1
+        route.tp.callback_onReceive(msg)
+
+    def counters(self) -> Dict[RouteKey, int]:
+        """Return the number of frames routed so far, per routing key.
+
+        :return: the frame count of every registered key
+        """
+        counters = {key: route.frames for key, route in self._routes.items()}
+        for arbitration_id, by_extension in self._extended_routes.items():
+            for address_extension, route in by_extension.items():
+                counters[arbitration_id, address_extension] = route.frames
+        return counters
+
+    def reset_counters(self) -> None:
+        """Reset the routed and unrouted frames counters."""
+        self.unrouted = 0
+        for route in self._routes.values():
+            route.frames = 0
+        for by_extension in self._extended_routes.values():
+            for route in by_extension.values():
+                route.frames = 0
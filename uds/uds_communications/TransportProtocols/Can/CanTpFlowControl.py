@@ -0,0 +1,130 @@
+import math
+
+#: largest block size that can be announced, 0 meaning no limit
+MAX_BLOCK_SIZE = 0xFF
+#: largest STmin that can be announced, 127 ms
+MAX_ST_MIN = 0.127
+#: STmin the adaptive mode falls back to when no STmin was requested
+BACK_OFF_ST_MIN = 0.001
+#: block size the adaptive mode falls back to when blocks were unlimited
+BACK_OFF_BLOCK_SIZE = 16
+
+
+def quantize_st_min(value: float) -> float:
+    """Return the largest STmin that can be encoded in a flow control
+    frame and is not greater than the given value.
+
+    :param value: STmin in seconds
+    :return: the encodable STmin in seconds
+    """
+    if value >= MAX_ST_MIN:
+        return MAX_ST_MIN
+    # rounding first so that e.g. 0.0003 * 1e4 is not floored to 2
+    if value >= 0.001:
+        return math.floor(round(value * 1e3, 6)) / 1e3
+    if value >= 0.0001:
+        return math.floor(round(value * 1e4, 6)) / 1e4
+    return 0.0
+
+
+class ReceiveFlowControl:
+    """Flow control announced by CanTp when receiving segmented messages.
+
+    The configured block size and STmin are sent in the flow control
+    frames, optionally preceded by WAIT frames. In adaptive mode, the
+    announced values start from the configured ones, then STmin is halved
+    and the block size doubled after every block received cleanly, while
+    both are backed off as soon as frames get lost or a transfer fails.
+    """
+
+    #: time between two WAIT frames, in seconds
+    wait_interval = 0.1
+
+    def __init__(
+        self,
+        block_size: int = 0,
+        st_min: float = 0.030,
+        wait_frames: int = 0,
+        wft_max: int = 0,
+        adaptive: bool = False,
+    ) -> None:
+        """Create the flow control policy.
+
+        :param block_size: number of consecutive frames between two flow
+            control frames, 0 for no limit
+        :param st_min: minimum time between two consecutive frames in
+            seconds
+        :param wait_frames: number of WAIT frames sent before allowing the
+            sender to go on
+        :param wft_max: maximum number of WAIT frames in a row
+        :param adaptive: True to adapt block size and STmin to the
+            reception quality
+
+        :raises ValueError: if a parameter cannot be encoded or more WAIT
+            frames than allowed by wft_max are requested
+        """
+        if wait_frames > wft_max:
+            raise ValueError(f"{wait_frames} WAIT frames requested but at most {wft_max} allowed by WFTmax")
+        self._block_size = 0
+        self._st_min = 0.0
+        self.block_size = block_size
+        self.st_min = st_min
+        self.wait_frames = wait_frames
+        self.wft_max = wft_max
+        self.adaptive = adaptive
+
+    @property
+    def block_size(self) -> int:
+        return self._block_size
+
+    @block_size.setter
+    def block_size(self, value: int) -> None:
+        if not 0 <= value <= MAX_BLOCK_SIZE:
+            raise ValueError(f"Invalid block size {value}, should be between 0 and {MAX_BLOCK_SIZE}")
+        self._block_size = value
+        self.reset()
+
+    @property
+    def st_min(self) -> float:
+        return self._st_min
+
+    @st_min.setter
+    def st_min(self, value: float) -> None:
+        if not 0 <= value <= MAX_ST_MIN:
+            raise ValueError(f"Invalid STmin {value}, should be between 0 and {MAX_ST_MIN} s")
+        self._st_min = value
+        self.reset()
+
+    @property
+    def current_block_size(self) -> int:
+        """Block size announced in the next flow control frame."""
+        return self._current_block_size
+
+    @property
+    def current_st_min(self) -> float:
+        """STmin announced in the next flow control frame."""
+        return self._current_st_min
+
+    def reset(self) -> None:
+        """Go back to the configured block size and STmin."""
+        self._current_block_size = self._block_size
+        self._current_st_min = self._st_min
+
+    def update(self, clean: bool) -> None:
+        """Adapt the announced values to how the last block or transfer went.
+
+        :param clean: False if frames were lost or the transfer failed
+        """
+        if not self.adaptive:
+            return
+        if clean:
+            self._current_st_min = quantize_st_min(self._current_st_min / 2)
+            if self._current_block_size:
+                block_size = self._current_block_size * 2
+                self._current_block_size = 0 if block_size > MAX_BLOCK_SIZE else block_size
+        else:
+            self._current_st_min = quantize_st_min(max(self._current_st_min * 2, BACK_OFF_ST_MIN))
+            if self._current_block_size:
+                self._current_block_size = max(self._current_block_size // 2, 1)
+            else:
+                self._current_block_size = BACK_OFF_BLOCK_SIZE
@@ -0,0 +1,82 @@
+from typing import List
+
+from uds.uds_communications.TransportProtocols.Can.CanTpTypes import CanTpMessageType
+
+#: protocol control information of the consecutive frames, indexed by sequence number
+SEQUENCE_HEADERS = bytes((CanTpMessageType.CONSECUTIVE_FRAME << 4) + number for number in range(16))
+
+
+class SegmentationPlan:
+    """Consecutive frames of a multi-frame message, laid out back to back
+    in a single preallocated buffer.
+
+    Headers, data and padding of all frames are written once when the
+    plan is created, sending a frame is then only a matter of slicing the
+    buffer at the right index.
+    """
+
+    __slots__ = ("_buffer", "_view", "_frame_length", "_last_frame_length", "frame_count")
+
+    def __init__(
+        self,
+        payload: memoryview,
+        pdu_length: int,
+        frame_length: int,
+        last_frame_length: int,
+        padding_pattern: int = 0x00,
+        first_sequence_number: int = 1,
+    ) -> None:
+        """Segment the payload into consecutive frames.
+
+        :param payload: data to be carried by the consecutive frames
+        :param pdu_length: number of payload bytes carried by a frame
+        :param frame_length: length of every frame but the last one
+        :param last_frame_length: length of the last frame
+        :param padding_pattern: value used to fill the unused bytes
+        :param first_sequence_number: sequence number of the first frame
+        """
+        payload_length = len(payload)
+        frame_count = -(-payload_length // pdu_length)
+        buffer = bytearray((padding_pattern,)) * (frame_length * (frame_count - 1) + last_frame_length)
+
+        # headers repeat every 16 frames, write them all at once with an extended slice
+        headers = SEQUENCE_HEADERS[first_sequence_number:] + SEQUENCE_HEADERS[:first_sequence_number]
+        headers = headers * (frame_count // 16 + 1)
+        buffer[::frame_length] = headers[:frame_count]
+
+        view = memoryview(buffer)
+        start = 1
+        for payload_start in range(0, payload_length, pdu_length):
+            chunk = payload[payload_start : payload_start + pdu_length]
+            view[start : start + len(chunk)] = chunk
+            start += frame_length
+
+        self._buffer = buffer
+        self._view = view
+        self._frame_length = frame_length
+        self._last_frame_length = last_frame_length
+        self.frame_count = frame_count
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def __getitem__(self, index: int) -> memoryview:
+        """Return the consecutive frame at the given index.
+
+        :param index: position of the frame in the message, starting at 0
+        :return: a view on the frame within the plan's buffer
+        :raises IndexError: if there is no frame at this index
+        """
+        if not 0 <= index < self.frame_count:
+            raise IndexError(f"consecutive frame index {index} out of range")
+        start = index * self._frame_length
+        return self._view[start : start + self._frame_length]
+
+    def block(self, start: int, stop: int) -> List[memoryview]:
+        """Return the consecutive frames between start and stop.
+
+        :param start: index of the first frame of the block
+        :param stop: index following the last frame of the block
+        :return: views on the frames within the plan's buffer
+        """
+        return [self[index] for index in range(start, min(stop, self.frame_count))]
@@ -32,6 +32,17 @@ class CanTpAddressingTypes(Enum):
     MIXED = 3
 
 
+##
+# defines how the unused bytes of the frames are filled
+class CanTpPaddingTypes(Enum):
+    # every frame padded to 8 bytes, or to the next CAN FD data length
+    MANDATORY = 0
+    # CAN FD frames of 8 bytes at most sent with their exact length, longer ones padded to the next data length
+    OPTIMIZED_FD = 1
+    # no padding but the one imposed by the CAN FD data lengths
+    NONE = 2
+
+
 ##
 # defines the state of the send or receive method.
 class CanTpState(Enum):
@@ -66,15 +77,29 @@ class CanTpMTypes(Enum):
 MINIMUM_HEADER_SIZE = 1
 
 CANTP_MAX_PAYLOAD_LENGTH = 4095  # hardcoded maximum based on the ISO 15765 standard
+CANTP_MAX_ESCAPE_PAYLOAD_LENGTH = 0xFFFFFFFF  # 32 bits FF_DL of the ISO 15765-2:2016 escape sequence
 N_PCI_INDEX = 0
 SINGLE_FRAME_DL_INDEX = 0
 SINGLE_FRAME_DATA_START_INDEX = 1
 FIRST_FRAME_DL_INDEX_HIGH = 0
 FIRST_FRAME_DL_INDEX_LOW = 1
 FIRST_FRAME_DATA_START_INDEX = 2
+FIRST_FRAME_ESCAPE_DL_INDEX = 2
+FIRST_FRAME_ESCAPE_DATA_START_INDEX = 6
 FC_BS_INDEX = 1
 FC_STMIN_INDEX = 2
 CONSECUTIVE_FRAME_SEQUENCE_NUMBER_INDEX = 0
 CONSECUTIVE_FRAME_SEQUENCE_DATA_START_INDEX = 1
 FLOW_CONTROL_BS_INDEX = 1
 FLOW_CONTROL_STMIN_INDEX = 2
+
+# frame length of each data length code
+CAN_FD_DLC_LENGTHS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 20, 24, 32, 48, 64)
+# data length code of each CAN FD frame length, the frames are padded up to the length of their DLC
+CAN_FD_DLC = tuple(
+    next(dlc for dlc, size in enumerate(CAN_FD_DLC_LENGTHS) if size >= length) for length in range(65)
+)
+
+# 29 bits IDs of the normal fixed addressing, priority 6, N_TA in bits 8 to 15 and N_SA in bits 0 to 7
+NORMAL_FIXED_PHYSICAL_BASE_ID = 0x18DA0000
+NORMAL_FIXED_FUNCTIONAL_BASE_ID = 0x18DB0000
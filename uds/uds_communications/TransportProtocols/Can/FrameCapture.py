@@ -0,0 +1,212 @@
+import heapq
+import struct
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Tuple, Union
+
+import can
+
+from uds.uds_communications.TransportProtocols.Can.CanTpTypes import CAN_FD_DLC
+
+_CAN_SFF_MAX_ID = 0x7FF
+
+# compact binary trace: magic, version and number of frames, then per frame its
+# timestamp, arbitration ID, length and flags followed by its data
+_TRACE_HEADER = struct.Struct("=4sHI")
+_TRACE_RECORD = struct.Struct("=dIBB")
+_TRACE_MAGIC = b"UDST"
+_TRACE_VERSION = 1
+_FLAG_TX = 0x01
+_FLAG_FD = 0x02
+
+
+class CapturedFrame(NamedTuple):
+    """A frame sent or received by CanTp."""
+
+    #: time the frame was sent or received, in seconds since the epoch
+    timestamp: float
+    arbitration_id: int
+    data: bytes
+    #: True for a sent frame, False for a received one
+    is_tx: bool
+    is_fd: bool
+
+    @property
+    def dlc(self) -> int:
+        """Data length code of the frame."""
+        return CAN_FD_DLC[len(self.data)]
+
+    @property
+    def is_extended_id(self) -> bool:
+        return self.arbitration_id > _CAN_SFF_MAX_ID
+
+    def to_message(self, channel: Union[int, str, None] = None) -> can.Message:
+        """Convert the frame to a python-can message.
+
+        :param channel: channel of the message
+        :return: the message
+        """
+        return can.Message(
+            timestamp=self.timestamp,
+            arbitration_id=self.arbitration_id,
+            is_extended_id=self.is_extended_id,
+            channel=channel,
+            data=self.data,
+            is_fd=self.is_fd,
+            is_rx=not self.is_tx,
+        )
+
+
+class CaptureRing:
+    """Fixed size ring of captured frames, filled by a single thread.
+
+    The slots are allocated once, the oldest frames being overwritten
+    once the ring is full. Recording a frame only stores its timestamp
+    and ID and a copy of its data, the conversion to log formats being
+    left to the reading.
+    """
+
+    __slots__ = ("_timestamps", "_ids", "_frames", "_mask", "_count")
+
+    def __init__(self, capacity: int = 4096) -> None:
+        """Create the ring.
+
+        :param capacity: minimum number of frames kept, rounded up to the
+            next power of two
+        """
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self._mask = size - 1
+        self._timestamps = [0.0] * size
+        self._ids = [0] * size
+        self._frames = [b""] * size
+        self._count = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._mask + 1
+
+    def __len__(self) -> int:
+        return min(self._count, self._mask + 1)
+
+    @property
+    def overwritten(self) -> int:
+        """Number of frames lost because the ring was full."""
+        return max(self._count - self._mask - 1, 0)
+
+    def record(self, timestamp: float, arbitration_id: int, data) -> None:
+        """Capture a frame.
+
+        :param timestamp: time the frame was sent or received
+        :param arbitration_id: ID of the frame
+        :param data: data of the frame, copied as the buffer may be reused
+        """
+        index = self._count & self._mask
+        self._timestamps[index] = timestamp
+        self._ids[index] = arbitration_id
+        self._frames[index] = bytes(data)
+        self._count += 1
+
+    def records(self) -> Iterator[Tuple[float, int, bytes]]:
+        """Iterate over the captured frames, oldest first.
+
+        :return: the timestamp, arbitration ID and data of each frame
+        """
+        count = self._count
+        for counter in range(max(count - self._mask - 1, 0), count):
+            index = counter & self._mask
+            yield self._timestamps[index], self._ids[index], self._frames[index]
+
+    def clear(self) -> None:
+        self._count = 0
+
+
+class FrameCapture:
+    """Capture of the last frames sent and received by a CanTp instance.
+
+    Sent and received frames are kept in two :class:`CaptureRing`, so
+    that the sending thread and the reception thread never write to the
+    same ring, and merged by timestamp when the capture is read. The
+    capture is meant to stay on and be saved when a test fails, as an
+    ASC or BLF log or a compact binary trace.
+
+    :param capacity: number of sent and of received frames kept
+    :param is_fd: True if the frames are CAN FD frames
+    """
+
+    def __init__(self, capacity: int = 4096, is_fd: bool = False) -> None:
+        #: ring of the sent frames
+        self.tx = CaptureRing(capacity)
+        #: ring of the received frames
+        self.rx = CaptureRing(capacity)
+        self.is_fd = is_fd
+
+    def __len__(self) -> int:
+        return len(self.tx) + len(self.rx)
+
+    @property
+    def overwritten(self) -> int:
+        """Number of frames lost because a ring was full."""
+        return self.tx.overwritten + self.rx.overwritten
+
+    def frames(self) -> List[CapturedFrame]:
+        """Return the captured frames in chronological order."""
+        tx = (CapturedFrame(*record, True, self.is_fd or len(record[2]) > 8) for record in self.tx.records())
+        rx = (CapturedFrame(*record, False, self.is_fd or len(record[2]) > 8) for record in self.rx.records())
+        return list(heapq.merge(tx, rx, key=lambda frame: frame.timestamp))
+
+    def clear(self) -> None:
+        """Discard the captured frames."""
+        self.tx.clear()
+        self.rx.clear()
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Save the captured frames, in ASC or BLF format for the
+        ``.asc`` and ``.blf`` extensions, as a binary trace otherwise.
+
+        :param path: file to write
+        """
+        suffix = Path(path).suffix.lower()
+        if suffix in (".asc", ".blf"):
+            writer_class = can.ASCWriter if suffix == ".asc" else can.BLFWriter
+            with writer_class(path) as writer:
+                for frame in self.frames():
+                    writer.on_message_received(frame.to_message(channel=1))
+        else:
+            save_trace(path, self.frames())
+
+
+def save_trace(path: Union[str, Path], frames: List[CapturedFrame]) -> None:
+    """Write frames to a compact binary trace.
+
+    :param path: file to write
+    :param frames: the frames, in chronological order
+    """
+    with open(path, "wb") as trace:
+        trace.write(_TRACE_HEADER.pack(_TRACE_MAGIC, _TRACE_VERSION, len(frames)))
+        for frame in frames:
+            flags = (_FLAG_TX if frame.is_tx else 0) | (_FLAG_FD if frame.is_fd else 0)
+            trace.write(_TRACE_RECORD.pack(frame.timestamp, frame.arbitration_id, len(frame.data), flags))
+            trace.write(frame.data)
+
+
+def load_trace(path: Union[str, Path]) -> List[CapturedFrame]:
+    """Read the frames of a binary trace written by :func:`save_trace`.
+
+    :param path: file to read
+    :return: the frames, in chronological order
+    :raises ValueError: if the file is not a binary trace
+    """
+    content = Path(path).read_bytes()
+    magic, version, count = _TRACE_HEADER.unpack_from(content)
+    if magic != _TRACE_MAGIC or version != _TRACE_VERSION:
+        raise ValueError(f"{path} is not a frame trace of version {_TRACE_VERSION}")
+    frames = []
+    offset = _TRACE_HEADER.size
+    for _ in range(count):
+        timestamp, arbitration_id, length, flags = _TRACE_RECORD.unpack_from(content, offset)
+        offset += _TRACE_RECORD.size
+        data = content[offset : offset + length]
+        offset += length
+        frames.append(CapturedFrame(timestamp, arbitration_id, data, bool(flags & _FLAG_TX), bool(flags & _FLAG_FD)))
+    return frames
@@ -0,0 +1,242 @@
+import socket
+import struct
+from typing import List, Optional
+
+from uds.config import Config
+from uds.interfaces import TpInterface
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp
+from uds.uds_communications.TransportProtocols.Can.CanTpTypes import (
+    NORMAL_FIXED_FUNCTIONAL_BASE_ID,
+    NORMAL_FIXED_PHYSICAL_BASE_ID,
+)
+
+# socket options of linux/can/isotp.h, not exposed by the socket module
+SOL_CAN_ISOTP = 100 + 6  # SOL_CAN_BASE + CAN_ISOTP
+CAN_ISOTP_OPTS = 1
+CAN_ISOTP_RECV_FC = 2
+CAN_ISOTP_LL_OPTS = 5
+
+# flags of the CAN_ISOTP_OPTS option
+CAN_ISOTP_EXTEND_ADDR = 0x002
+CAN_ISOTP_TX_PADDING = 0x004
+CAN_ISOTP_RX_EXT_ADDR = 0x200
+CAN_ISOTP_WAIT_TX_DONE = 0x400
+CAN_ISOTP_SF_BROADCAST = 0x800
+
+# struct can_isotp_options, can_isotp_fc_options and can_isotp_ll_options
+ISOTP_OPTIONS_FORMAT = "=IIBBBB"
+ISOTP_FC_OPTIONS_FORMAT = "=BBB"
+ISOTP_LL_OPTIONS_FORMAT = "=BBB"
+
+CANFD_MTU = 72
+CAN_FD_MAX_DATA_LENGTH = 64
+CAN_EFF_FLAG = 0x80000000
+CAN_SFF_MAX_ID = 0x7FF
+
+
+class KernelCanTp(TpInterface):
+    """CAN transport protocol delegated to the ISO-TP implementation of
+    the Linux kernel (``CAN_ISOTP`` sockets, mainline since Linux 5.10).
+
+    Whole messages are handed over to the socket, segmentation, flow
+    control and STmin pacing of the frames are done by the kernel, out
+    of reach of the GIL and of the Python scheduling. The IsoTpConfig
+    parameters are mapped to the socket options:
+
+    - the addressing type, IDs and addresses, the mixed and extended
+      addressing types relying on the kernel's address extension
+    - ``rx_block_size``, ``rx_st_min`` and ``rx_wft_max`` for the
+      announced flow control
+    - ``padding`` and ``padding_pattern``, the frames being padded with
+      the MANDATORY padding type only
+
+    The other parameters, N_As/N_Bs/N_Cr timers and adaptive flow
+    control among them, are left to the kernel's defaults.
+
+    :param channel: name of the CAN network interface, e.g. ``can0``
+    :param is_fd: True to send CAN FD frames of up to 64 bytes
+    """
+
+    def __init__(self, channel: Optional[str] = None, is_fd: bool = True, **kwargs):
+        if channel is None:
+            raise ValueError("A CAN network interface has to be given through channel")
+        if not hasattr(socket, "CAN_ISOTP"):
+            raise OSError("CAN_ISOTP sockets are only available on Linux")
+
+        self._channel = channel
+        self._is_fd = is_fd
+
+        addressingType = Config.isotp.addressing_type
+        self._flags = CAN_ISOTP_WAIT_TX_DONE
+        self._tx_address_extension = self._rx_address_extension = 0
+        if addressingType == "NORMAL":
+            self._req_id = Config.isotp.req_id
+            self._res_id = Config.isotp.res_id
+        elif addressingType == "NORMAL_FIXED":
+            self._req_id = NORMAL_FIXED_PHYSICAL_BASE_ID | (Config.isotp.n_ta << 8) | Config.isotp.n_sa
+            self._res_id = NORMAL_FIXED_PHYSICAL_BASE_ID | (Config.isotp.n_sa << 8) | Config.isotp.n_ta
+        elif addressingType == "EXTENDED":
+            self._req_id = Config.isotp.req_id
+            self._res_id = Config.isotp.res_id
+            self._flags |= CAN_ISOTP_EXTEND_ADDR | CAN_ISOTP_RX_EXT_ADDR
+            self._tx_address_extension = Config.isotp.n_ta
+            self._rx_address_extension = Config.isotp.n_sa
+        elif addressingType == "MIXED":
+            self._req_id = Config.isotp.req_id
+            self._res_id = Config.isotp.res_id
+            self._flags |= CAN_ISOTP_EXTEND_ADDR
+            self._tx_address_extension = self._rx_address_extension = Config.isotp.n_ae
+        else:
+            raise Exception("Do not understand the addressing config")
+        self._func_req_id = Config.isotp.func_req_id
+        if self._func_req_id is None and addressingType == "NORMAL_FIXED":
+            # the functional requests go to a functional address, e.g. 0x33 for OBD, not to the ECU's one
+            self._func_req_id = NORMAL_FIXED_FUNCTIONAL_BASE_ID | (Config.isotp.func_n_ta << 8) | Config.isotp.n_sa
+        self._functional_tx_address_extension = (
+            Config.isotp.func_n_ta if addressingType == "EXTENDED" else self._tx_address_extension
+        )
+
+        if Config.isotp.padding == "MANDATORY":
+            self._flags |= CAN_ISOTP_TX_PADDING
+        self._padding_pattern = (
+            CanTp.PADDING_PATTERN if Config.isotp.padding_pattern is None else Config.isotp.padding_pattern
+        )
+        self._flow_control = struct.pack(
+            ISOTP_FC_OPTIONS_FORMAT,
+            Config.isotp.rx_block_size,
+            CanTp.encode_stMin(Config.isotp.rx_st_min),
+            Config.isotp.rx_wft_max,
+        )
+
+        # longest message accepted, a longer one is truncated by the kernel and rejected
+        self._rx_buffer = bytearray(Config.isotp.rx_max_message_length)
+        self._socket = self._open_socket(self._req_id, self._res_id)
+        # opened on the first functional request
+        self._functional_socket = None
+
+    @property
+    def reqIdAddress(self) -> int:
+        return self._req_id
+
+    @property
+    def resIdAddress(self) -> int:
+        return self._res_id
+
+    @property
+    def isotp_socket(self) -> socket.socket:
+        """ISO-TP socket of the physical requests and responses."""
+        return self._socket
+
+    def _open_socket(
+        self, tx_id: int, rx_id: int, flags: int = 0, tx_address_extension: Optional[int] = None
+    ) -> socket.socket:
+        """Open and bind an ISO-TP socket configured for this instance.
+
+        :param tx_id: ID of the sent frames
+        :param rx_id: ID of the received frames
+        :param flags: CAN_ISOTP_OPTS flags to add to the instance's ones
+        :param tx_address_extension: address extension of the sent
+            frames, the instance's one if None
+        :return: the bound socket
+        """
+        if tx_address_extension is None:
+            tx_address_extension = self._tx_address_extension
+        sock = socket.socket(socket.AF_CAN, socket.SOCK_DGRAM, socket.CAN_ISOTP)
+        try:
+            sock.setsockopt(
+                SOL_CAN_ISOTP,
+                CAN_ISOTP_OPTS,
+                struct.pack(
+                    ISOTP_OPTIONS_FORMAT,
+                    self._flags | flags,
+                    0,
+                    tx_address_extension,
+                    self._padding_pattern,
+                    0,
+                    self._rx_address_extension,
+                ),
+            )
+            sock.setsockopt(SOL_CAN_ISOTP, CAN_ISOTP_RECV_FC, self._flow_control)
+            if self._is_fd:
+                sock.setsockopt(
+                    SOL_CAN_ISOTP,
+                    CAN_ISOTP_LL_OPTS,
+                    struct.pack(ISOTP_LL_OPTIONS_FORMAT, CANFD_MTU, CAN_FD_MAX_DATA_LENGTH, 0),
+                )
+            sock.bind((self._channel, self._can_id(rx_id), self._can_id(tx_id)))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    @staticmethod
+    def _can_id(arbitration_id: int) -> int:
+        """Flag the IDs which do not fit in 11 bits as extended ones."""
+        return arbitration_id | CAN_EFF_FLAG if arbitration_id > CAN_SFF_MAX_ID else arbitration_id
+
+    def send(self, payload, functionalReq: bool = False, tpWaitTime: float = 0.01) -> None:
+        """Send a message, the call returns once all its frames are sent.
+
+        :param payload: the message to send
+        :param functionalReq: True to send a single frame on the
+            functional request ID
+        :param tpWaitTime: unused, kept for compatibility with CanTp.send
+        :raises ValueError: if a functional request does not fit in a
+            single frame or no functional request ID is configured
+        :raises OSError: if the kernel could not send the message, e.g.
+            when no flow control frame was received
+        """
+        if not functionalReq:
+            self._socket.send(bytes(payload))
+            return
+
+        if self._func_req_id is None:
+            raise ValueError("No functional request ID configured")
+        if len(payload) > self._single_frame_max_length:
+            raise ValueError("Functional requests have to fit in a single frame")
+        if self._functional_socket is None:
+            # nothing is received on this socket, its reception ID is never used
+            self._functional_socket = self._open_socket(
+                self._func_req_id, self._func_req_id, CAN_ISOTP_SF_BROADCAST, self._functional_tx_address_extension
+            )
+        self._functional_socket.send(bytes(payload))
+
+    @property
+    def _single_frame_max_length(self) -> int:
+        address_length = 1 if self._flags & CAN_ISOTP_EXTEND_ADDR else 0
+        # CAN FD single frames longer than 8 bytes carry the length in a second byte
+        return (CAN_FD_MAX_DATA_LENGTH - 2 if self._is_fd else 7) - address_length
+
+    def recv(self, timeout_s: float = 1) -> List[int]:
+        """Receive a message.
+
+        :param timeout_s: time to wait for the message to be complete
+        :return: the received message
+        :raises TimeoutError: if no message is received in time
+        """
+        return list(self.decode_isotp_bytes(timeout_s))
+
+    def decode_isotp_bytes(self, timeout_s: float = 1) -> bytearray:
+        """Receive a message without converting it to a list.
+
+        :param timeout_s: time to wait for the message to be complete
+        :return: the received message
+        :raises TimeoutError: if no message is received in time
+        :raises ValueError: if the message is longer than
+            rx_max_message_length
+        """
+        self._socket.settimeout(timeout_s)
+        try:
+            # with MSG_TRUNC, the length of the whole message is returned even if it did not fit
+            length = self._socket.recv_into(self._rx_buffer, 0, socket.MSG_TRUNC)
+        except socket.timeout:
+            raise TimeoutError(f"No message received on 0x{self._res_id:X} within {timeout_s} s") from None
+        if length > len(self._rx_buffer):
+            raise ValueError(f"Message of {length} bytes longer than the maximum of {len(self._rx_buffer)}")
+        return self._rx_buffer[:length]
+
+    def close(self) -> None:
+        """Close the sockets."""
+        self._socket.close()
+        if self._functional_socket is not None:
+            self._functional_socket.close()
@@ -0,0 +1,337 @@
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from time import perf_counter
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+from uds.config import Config
+from uds.interfaces import TpInterface
+from uds.uds_communications.TransportProtocols.Can.CanTp import CanTp, as_memoryview
+from uds.uds_communications.TransportProtocols.Can.CanTpTypes import CanTpMessageType
+from uds.uds_communications.Utilities.RingBuffer import FrameRingBuffer
+from uds.uds_communications.Utilities.SharedMessageRing import SharedMessageRing
+
+logger = logging.getLogger(__name__)
+
+#: creates the connector of the worker process's CanTp, called there with the callback to hand the received frames to
+ConnectorFactory = Callable[[Callable[[Any], None]], Any]
+
+# kinds of the records sent to the worker
+_PHYSICAL_REQUEST = 0
+_FUNCTIONAL_REQUEST = 1
+_STOP = 2
+
+# kinds of the records sent by the worker
+_READY = 0
+_SENT = 1
+_RECEIVING = 2
+_MESSAGE = 3
+_ERROR = 4
+_SEND_ERROR = 5
+
+# exceptions raised by the worker's CanTp, re-raised in the Uds process
+_EXCEPTIONS = {"TimeoutError": TimeoutError, "ValueError": ValueError}
+
+
+class _InterruptibleFrameBuffer(FrameRingBuffer):
+    """Frame buffer whose consumer can be woken up without a frame, so
+    that the worker waits for frames and requests at the same time.
+    """
+
+    def __init__(self, capacity: int = 4096) -> None:
+        super().__init__(capacity)
+        self._interrupted = False
+
+    def interrupt(self) -> None:
+        """Make the pending or next wait return without a frame."""
+        self._interrupted = True
+        self._data_available.set()
+
+    def _wait_until(self, deadline: Optional[float]) -> bool:
+        self._consumer_waiting = True
+        try:
+            while self._head == self._tail:
+                if self._interrupted:
+                    self._interrupted = False
+                    return False
+                self._data_available.clear()
+                if self._head != self._tail or self._interrupted:
+                    continue
+                if deadline is None:
+                    self._data_available.wait()
+                    continue
+                remaining = deadline - perf_counter()
+                if remaining <= 0:
+                    return False
+                self._data_available.wait(remaining)
+        finally:
+            self._consumer_waiting = False
+        return True
+
+
+class _WorkerCanTp(CanTp):
+    """CanTp of the worker process."""
+
+    def _new_buffer(self) -> _InterruptibleFrameBuffer:
+        return _InterruptibleFrameBuffer(Config.isotp.rx_buffer_size)
+
+
+class _Worker:
+    """Bus I/O, segmentation and reassembly loop of the worker process.
+
+    A thread takes the requests out of the request ring, the main loop
+    sends them and reassembles the received messages into the response
+    ring. While no message is being received, the main loop waits for a
+    frame or a request, whichever comes first.
+    """
+
+    #: time between two checks that the Uds process is still alive, in seconds
+    parent_check_interval = 0.5
+
+    def __init__(self, tx_ring: SharedMessageRing, rx_ring: SharedMessageRing) -> None:
+        self.tx_ring = tx_ring
+        self.rx_ring = rx_ring
+        self.requests: Deque[Tuple[int, bytearray]] = deque()
+        self.lock = threading.Lock()
+        self.idle = False
+        self.tp = None
+
+    def run(self, connector_factory: ConnectorFactory, is_fd: bool) -> None:
+        try:
+            self.tp = _WorkerCanTp(is_fd=is_fd)
+            self.tp.connection = connector_factory(self.tp.callback_onReceive)
+        except Exception as error:
+            self.report(error)
+            return
+        self.rx_ring.put(b"", _READY)
+        threading.Thread(target=self.take_requests, args=(os.getppid(),), daemon=True).start()
+
+        frames = self.tp._recv_buffer
+        while True:
+            with self.lock:
+                requests = list(self.requests)
+                self.requests.clear()
+                self.idle = not requests
+            for kind, payload in requests:
+                if kind == _STOP:
+                    return
+                try:
+                    self.tp.send(payload, kind == _FUNCTIONAL_REQUEST)
+                except Exception as error:
+                    self.report(error, _SEND_ERROR)
+                else:
+                    self.rx_ring.put(b"", _SENT)
+            if requests:
+                continue
+
+            frame = frames.get(None)
+            with self.lock:
+                self.idle = False
+                # an interruption coming along with a frame is not needed any longer
+                frames._interrupted = False
+            if frame is None:
+                continue
+            pci = frame[0] >> 4 if frame else None
+            if pci == CanTpMessageType.FIRST_FRAME:
+                self.rx_ring.put(b"", _RECEIVING)
+            elif pci != CanTpMessageType.SINGLE_FRAME:
+                logger.debug(f"Ignored frame received outside of a message: 0x{bytes(frame).hex()}")
+                continue
+            try:
+                message = self.tp.decode_isotp_bytes(received_data=frame, use_external_snd_rcv_functions=True)
+            except Exception as error:
+                self.report(error)
+            else:
+                self.rx_ring.put(message, _MESSAGE)
+
+    def take_requests(self, parent_pid: int) -> None:
+        """Hand the requests over to the main loop, stop it when the Uds
+        process is gone.
+        """
+        while True:
+            record = self.tx_ring.get(self.parent_check_interval)
+            if record is None:
+                if os.getppid() == parent_pid:
+                    continue
+                record = (_STOP, bytearray())
+            with self.lock:
+                self.requests.append(record)
+                if self.idle:
+                    self.tp._recv_buffer.interrupt()
+            if record[0] == _STOP:
+                return
+
+    def report(self, error: Exception, kind: int = _ERROR) -> None:
+        self.rx_ring.put(f"{type(error).__name__}:{error}".encode(), kind)
+
+
+def _run_worker(
+    isotp_config,
+    connector_factory: ConnectorFactory,
+    is_fd: bool,
+    tx_ring: SharedMessageRing,
+    rx_ring: SharedMessageRing,
+) -> None:
+    """Entry point of the worker process."""
+    Config.isotp = isotp_config
+    try:
+        _Worker(tx_ring, rx_ring).run(connector_factory, is_fd)
+    finally:
+        tx_ring.close()
+        rx_ring.close()
+
+
+class ProcessCanTp(TpInterface):
+    """CAN transport protocol running in a dedicated worker process.
+
+    Bus I/O, segmentation, flow control, STmin pacing and reassembly are
+    done by a :class:`CanTp` in a process of its own, out of reach of the
+    GIL of the process running the tests. Whole messages are exchanged
+    with it through two :class:`SharedMessageRing`, the Uds process only
+    sees complete UDS messages.
+
+    The connector cannot be handed over to another process, the worker
+    creates it with ``connector_factory``, a picklable callable (e.g. a
+    module level class) called with the worker's
+    ``CanTp.callback_onReceive``. It returns the connector, whose
+    ``transmit(data, req_id)`` sends a frame, after registering the
+    callback for the received frames, e.g. as a python-can listener.
+
+    The worker is started with the ``spawn`` method, so that no thread
+    of the Uds process is inherited, and gets the current
+    ``Config.isotp``.
+
+    :param connector_factory: creates the connector in the worker
+    :param is_fd: True to send CAN FD frames
+    :param ring_size: size of each of the two rings in bytes, the
+        longest message has to fit in it
+    :param start_timeout: maximum time for the worker to start
+    """
+
+    def __init__(
+        self,
+        connector_factory: Optional[ConnectorFactory] = None,
+        is_fd: bool = True,
+        ring_size: int = 1 << 20,
+        start_timeout: float = 30.0,
+        **kwargs,
+    ):
+        if connector_factory is None:
+            raise ValueError("A connector factory has to be given through connector_factory")
+
+        context = multiprocessing.get_context("spawn")
+        self._tx_ring = SharedMessageRing(ring_size, context)
+        self._rx_ring = SharedMessageRing(ring_size, context)
+        # messages received while waiting for the end of a transmission
+        self._pending: Deque[Tuple[int, bytearray]] = deque()
+        self._closed = False
+        self._process = context.Process(
+            target=_run_worker,
+            args=(Config.isotp, connector_factory, is_fd, self._tx_ring, self._rx_ring),
+            name="CanTp worker",
+            daemon=True,
+        )
+        self._process.start()
+
+        record = self._get(start_timeout)
+        if record is None or record[0] != _READY:
+            self.close()
+            if record is None:
+                raise TimeoutError(f"CanTp worker not started within {start_timeout} s")
+            self._raise(record[1])
+
+    @property
+    def process(self) -> multiprocessing.Process:
+        """The worker process."""
+        return self._process
+
+    def _get(self, timeout: Optional[float]) -> Optional[Tuple[int, bytearray]]:
+        """Take the next record coming from the worker.
+
+        :raises ConnectionError: if the worker died
+        """
+        deadline = None if timeout is None else perf_counter() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - perf_counter(), 0)
+            record = self._rx_ring.get(0.5 if remaining is None else min(remaining, 0.5))
+            if record is not None:
+                return record
+            if not self._process.is_alive():
+                raise ConnectionError(f"CanTp worker died with exit code {self._process.exitcode}")
+            if remaining == 0:
+                return None
+
+    @staticmethod
+    def _raise(error: bytearray) -> None:
+        name, _, message = error.decode().partition(":")
+        raise _EXCEPTIONS.get(name, Exception)(message)
+
+    def send(self, payload, functionalReq: bool = False, tpWaitTime: float = 0.01) -> None:
+        """Send a message, the call returns once the worker sent all its
+        frames.
+
+        :param payload: the message to send
+        :param functionalReq: True for a functional request
+        :param tpWaitTime: unused, kept for compatibility with CanTp.send
+        :raises Exception: the error raised by the worker's CanTp
+        """
+        self._tx_ring.put(as_memoryview(payload), _FUNCTIONAL_REQUEST if functionalReq else _PHYSICAL_REQUEST)
+        while True:
+            kind, data = self._get(None)
+            if kind == _SENT:
+                return
+            if kind == _SEND_ERROR:
+                self._raise(data)
+            # messages received meanwhile are kept for recv
+            self._pending.append((kind, data))
+
+    def recv(self, timeout_s: float = 1) -> List[int]:
+        """Receive a message.
+
+        :param timeout_s: time to wait for the first frame of the
+            message, the consecutive frames are awaited by the worker
+        :return: the reassembled message
+        """
+        return list(self.decode_isotp_bytes(timeout_s))
+
+    def decode_isotp_bytes(self, timeout_s: float = 1) -> bytearray:
+        """Receive a message without converting it to a list.
+
+        :param timeout_s: time to wait for the first frame of the
+            message, the consecutive frames are awaited by the worker
+        :return: the reassembled message
+        :raises TimeoutError: if no message is received in time
+        :raises Exception: the error raised by the worker's CanTp
+        """
+        timeout = timeout_s
+        while True:
+            record = self._pending.popleft() if self._pending else self._get(timeout)
+            if record is None:
+                raise TimeoutError("Timed out while waiting for message in state IDLE")
+            kind, data = record
+            if kind == _MESSAGE:
+                return data
+            if kind == _ERROR:
+                self._raise(data)
+            if kind == _RECEIVING:
+                # the worker ends the reassembly with the message or an N_Cr timeout
+                timeout = None
+
+    def close(self) -> None:
+        """Stop the worker process and release the rings."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._process.is_alive():
+            try:
+                self._tx_ring.put(b"", _STOP, timeout=1)
+            except TimeoutError:
+                pass
+            self._process.join(2)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+        self._tx_ring.close()
+        self._rx_ring.close()
@@ -0,0 +1,235 @@
+import heapq
+import random
+import threading
+from time import perf_counter, time
+from typing import Callable, List, Optional, Tuple
+
+import can
+
+from uds.uds_communications.TransportProtocols.Can.CanTpTypes import CAN_FD_DLC, CAN_FD_DLC_LENGTHS
+
+#: called with every frame delivered to a node
+Listener = Callable[[can.Message], None]
+
+_CAN_SFF_MAX_ID = 0x7FF
+
+
+def frame_bits(length: int, is_extended_id: bool = False, is_fd: bool = False) -> Tuple[int, int]:
+    """Count the bits of a data frame, worst case bit stuffing included.
+
+    The bits sent at the nominal bit rate are the arbitration field and
+    the end of the frame, for CAN FD frames the bits from the ESI bit to
+    the CRC field are sent at the data bit rate.
+
+    :param length: number of data bytes, padded to the next CAN FD data
+        length for CAN FD frames
+    :param is_extended_id: True for a 29 bits ID
+    :param is_fd: True for a CAN FD frame
+    :return: the number of bits at the nominal and at the data bit rate
+    """
+    if not is_fd:
+        # SOF, ID, RTR, IDE, r0, DLC, data and CRC, then CRC delimiter, ACK, EOF and intermission
+        stuffed = (54 if is_extended_id else 34) + 8 * length
+        return stuffed + (stuffed - 1) // 4 + 13, 0
+
+    length = CAN_FD_DLC_LENGTHS[CAN_FD_DLC[length]]
+    # SOF, ID, RRS/SRR, IDE, FDF, res and BRS
+    arbitration = 36 if is_extended_id else 17
+    # ESI, DLC and data dynamically stuffed, then stuff count and CRC with their fixed stuff bits
+    crc_length = 17 if length <= 16 else 21
+    dynamic = 5 + 8 * length
+    data = dynamic + (dynamic - 1) // 4 + 4 + crc_length + (4 + crc_length + 3) // 4
+    # CRC delimiter, ACK, EOF and intermission
+    return arbitration + (arbitration - 1) // 4 + 13, data
+
+
+class VirtualCanConnector:
+    """Node of a :class:`VirtualCanBus`, to be given as connector to
+    :class:`CanTp`.
+
+    The frames sent by the other nodes are handed to the listeners, e.g.
+    ``CanTp.callback_onReceive``, as python-can messages.
+    """
+
+    #: frames are taken as bytes-like objects, see CanTp.connector_accepts_bytes
+    accepts_bytes = True
+
+    def __init__(self, bus: "VirtualCanBus", receive_own_messages: bool = False) -> None:
+        self._bus = bus
+        self.receive_own_messages = receive_own_messages
+        self.listeners: List[Listener] = []
+
+    def add_listener(self, listener: Listener) -> None:
+        self.listeners.append(listener)
+
+    def transmit(self, data, req_id: int) -> None:
+        """Send a frame on the bus.
+
+        :param data: data of the frame
+        :param req_id: ID of the frame
+        """
+        self._bus.send(self, req_id, bytes(data))
+
+    def transmit_many(self, frames, req_id: int) -> None:
+        """Send several frames back to back.
+
+        :param frames: data of the frames, in order
+        :param req_id: ID of the frames
+        """
+        for data in frames:
+            self._bus.send(self, req_id, bytes(data))
+
+    def deliver(self, message: can.Message) -> None:
+        for listener in self.listeners:
+            listener(message)
+
+
+class VirtualCanBus:
+    """In-process CAN bus connecting :class:`VirtualCanConnector` nodes,
+    with frame timing derived from the bit rates and fault injection.
+
+    Without bit rate the frames are delivered at once from the sending
+    thread. With a bit rate, the frames are serialized on the bus, each
+    one taking the time of its bits, and delivered by a thread of the bus
+    once transmitted, after the latency plus a random jitter. Frames are
+    dropped or delayed behind the next frame (reordered) with the given
+    probabilities. The random draws are seeded, so that a run can be
+    reproduced.
+
+    :param bitrate: nominal bit rate in bit/s, None for instant delivery
+    :param data_bitrate: data phase bit rate of the CAN FD frames in
+        bit/s, the nominal bit rate if None
+    :param is_fd: True to send CAN FD frames
+    :param latency: delay added to the delivery of every frame, in seconds
+    :param jitter: maximum random delay added to the latency, in seconds
+    :param drop_rate: probability of a frame being lost
+    :param reorder_rate: probability of a frame being delivered after
+        the next one
+    :param seed: seed of the random draws
+    """
+
+    def __init__(
+        self,
+        bitrate: Optional[int] = None,
+        data_bitrate: Optional[int] = None,
+        is_fd: bool = False,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        reorder_rate: float = 0.0,
+        seed: Optional[int] = 0,
+    ) -> None:
+        self.bitrate = bitrate
+        self.data_bitrate = data_bitrate or bitrate
+        self.is_fd = is_fd
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.reorder_rate = reorder_rate
+        self._random = random.Random(seed)
+        self._nodes: List[VirtualCanConnector] = []
+        #: number of frames sent on the bus
+        self.sent = 0
+        #: number of frames lost by fault injection
+        self.dropped = 0
+        #: number of frames delivered after the next one by fault injection
+        self.reordered = 0
+
+        # frames waiting for their delivery time: (time, sequence number, sender, message)
+        self._pending: List[Tuple[float, int, VirtualCanConnector, can.Message]] = []
+        self._condition = threading.Condition()
+        self._bus_free_at = 0.0
+        self._closed = False
+        self._thread = None
+        if bitrate is not None:
+            self._thread = threading.Thread(target=self._deliver_loop, name="VirtualCanBus", daemon=True)
+            self._thread.start()
+
+    def connector(self, listener: Optional[Listener] = None, receive_own_messages: bool = False) -> VirtualCanConnector:
+        """Add a node to the bus.
+
+        :param listener: called with the frames sent by the other nodes,
+            e.g. ``CanTp.callback_onReceive``
+        :param receive_own_messages: True to also receive the frames sent
+            by the node
+        :return: the connector of the node
+        """
+        node = VirtualCanConnector(self, receive_own_messages)
+        if listener is not None:
+            node.add_listener(listener)
+        self._nodes.append(node)
+        return node
+
+    def frame_duration(self, length: int, arbitration_id: int = 0) -> float:
+        """Time a frame of the bus takes to be transmitted.
+
+        :param length: number of data bytes
+        :param arbitration_id: ID of the frame, 29 bits IDs taking longer
+        :return: the duration in seconds, 0 without bit rate
+        """
+        if self.bitrate is None:
+            return 0.0
+        nominal, data = frame_bits(length, arbitration_id > _CAN_SFF_MAX_ID, self.is_fd)
+        return nominal / self.bitrate + data / self.data_bitrate
+
+    def send(self, sender: VirtualCanConnector, arbitration_id: int, data: bytes) -> None:
+        """Put a frame on the bus, called by the connectors."""
+        message = can.Message(
+            arbitration_id=arbitration_id,
+            is_extended_id=arbitration_id > _CAN_SFF_MAX_ID,
+            data=data,
+            is_fd=self.is_fd,
+            bitrate_switch=self.is_fd and self.data_bitrate != self.bitrate,
+        )
+        with self._condition:
+            self.sent += 1
+            if self.drop_rate and self._random.random() < self.drop_rate:
+                self.dropped += 1
+                return
+            if self.bitrate is None:
+                self._deliver(sender, message)
+                return
+
+            duration = self.frame_duration(len(data), arbitration_id)
+            self._bus_free_at = max(self._bus_free_at, perf_counter()) + duration
+            due = self._bus_free_at + self.latency
+            if self.jitter:
+                due += self._random.uniform(0, self.jitter)
+            if self.reorder_rate and self._random.random() < self.reorder_rate:
+                # behind the next frame, were it sent back to back
+                self.reordered += 1
+                due += 2 * duration
+            heapq.heappush(self._pending, (due, self.sent, sender, message))
+            self._condition.notify()
+
+    def _deliver(self, sender: VirtualCanConnector, message: can.Message) -> None:
+        message.timestamp = time()
+        for node in self._nodes:
+            if node is not sender or node.receive_own_messages:
+                node.deliver(message)
+
+    def _deliver_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed and (not self._pending or self._pending[0][0] > perf_counter()):
+                    timeout = self._pending[0][0] - perf_counter() if self._pending else None
+                    self._condition.wait(timeout)
+                if self._closed:
+                    return
+                _, _, sender, message = heapq.heappop(self._pending)
+            # listeners are called without the lock, they may send frames themselves
+            self._deliver(sender, message)
+
+    def close(self) -> None:
+        """Stop delivering frames."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "VirtualCanBus":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,149 @@
+import queue
+from typing import List, Optional
+
+from uds.config import Config
+from uds.interfaces import TpInterface
+from uds.uds_communications.TransportProtocols.DoIP.DoIPConnection import DoIPConnection
+from uds.uds_communications.TransportProtocols.DoIP.DoIPTypes import (
+    DoIPDiagnosticNackCode,
+    DoIPPayloadType,
+)
+
+
+class DoIP(TpInterface):
+    """Diagnostics over IP transport protocol (ISO 13400-2).
+
+    The UDS messages are sent whole in DoIP diagnostic messages over a
+    TCP connection to the DoIP entity, which routes them to the target
+    ECU. Without segmentation or flow control, TransferData blocks can
+    be as large as the ECU accepts, tens of kilobytes instead of the
+    4095 bytes of CAN.
+
+    The connection is shared by all the transports of a tester talking
+    to the same entity. It is opened and the routing activated by the
+    first one, and with ``keep_alive`` it stays open once the last one
+    is closed, so that the next :class:`Uds` instances skip the TCP
+    handshake and routing activation. The alive checks of the entity
+    are answered in the background.
+
+    The parameters are the ones of ``Config.doip``, ``target_address``
+    may be given to diagnose another ECU behind the same entity.
+
+    :param target_address: logical address of the ECU to diagnose,
+        the configured one if None
+    """
+
+    def __init__(self, target_address: Optional[int] = None, **kwargs):
+        self._config = Config.doip
+        self._target_address = self._config.target_address if target_address is None else target_address
+        self._connection = DoIPConnection.acquire(
+            self._config.host,
+            self._config.port,
+            self._config.source_address,
+            self._config.activation_type,
+            self._config.protocol_version,
+            self._config.connect_timeout,
+        )
+        self._receiver = None
+        try:
+            self._receiver = self._connection.register(self._target_address)
+        except ValueError:
+            self._connection.release(self._config.keep_alive)
+            raise
+
+    @property
+    def targetAddress(self) -> int:
+        return self._target_address
+
+    @property
+    def connection(self) -> DoIPConnection:
+        """Connection to the DoIP entity, possibly shared with other
+        transports.
+        """
+        return self._connection
+
+    def send(self, payload, functionalReq: bool = False, tpWaitTime: float = 0.01) -> None:
+        """Send a message and wait for its acknowledgement by the DoIP
+        entity.
+
+        Functional requests are sent to the configured functional
+        address without waiting for their acknowledgement, the responses
+        of the target ECU only are received afterwards.
+
+        :param payload: the message to send
+        :param functionalReq: True to send the message to the functional
+            address
+        :param tpWaitTime: unused, kept for compatibility with CanTp.send
+        :raises ValueError: for a functional request if no functional
+            address is configured
+        :raises TimeoutError: if the message is not acknowledged in time
+        :raises ConnectionError: if the connection is lost
+        :raises Exception: if the message is refused by the entity
+        """
+        if functionalReq:
+            if self._config.functional_address is None:
+                raise ValueError("No functional address configured")
+            self._connection.send_diagnostic_message(self._config.functional_address, bytes(payload))
+            return
+
+        # acknowledgements left over from an aborted exchange belong to older messages
+        while not self._receiver.acks.empty():
+            self._receiver.acks.get_nowait()
+        self._connection.send_diagnostic_message(self._target_address, bytes(payload))
+
+        try:
+            ack = self._receiver.acks.get(timeout=self._config.ack_timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"Diagnostic message to 0x{self._target_address:04X} not acknowledged "
+                f"within {self._config.ack_timeout} s"
+            ) from None
+        if ack is None:
+            raise ConnectionError("DoIP connection closed")
+        payload_type, code = ack
+        if payload_type == DoIPPayloadType.DIAGNOSTIC_MESSAGE_NACK:
+            try:
+                reason = DoIPDiagnosticNackCode(code).name
+            except ValueError:
+                reason = "UNKNOWN"
+            raise Exception(
+                f"Diagnostic message to 0x{self._target_address:04X} refused with code 0x{code:02X} ({reason})"
+            )
+
+    def recv(self, timeout_s: float = 1) -> List[int]:
+        """Receive a message.
+
+        :param timeout_s: time to wait for the message
+        :return: the received message
+        :raises TimeoutError: if no message is received in time
+        :raises ConnectionError: if the connection is lost
+        """
+        return list(self.decode_isotp_bytes(timeout_s))
+
+    def decode_isotp_bytes(self, timeout_s: float = 1) -> bytes:
+        """Receive a message without converting it to a list.
+
+        :param timeout_s: time to wait for the message
+        :return: the received message
+        :raises TimeoutError: if no message is received in time
+        :raises ConnectionError: if the connection is lost
+        """
+        try:
+            message = self._receiver.messages.get(timeout=timeout_s)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No message received from 0x{self._target_address:04X} within {timeout_s} s"
+            ) from None
+        if message is None:
+            raise ConnectionError("DoIP connection closed")
+        return message
+
+    def close(self) -> None:
+        """Stop using the connection, it is closed unless kept alive
+        or used by other transports.
+        """
+        if self._receiver is None:
+            return
+        self._connection.unregister(self._target_address)
+        self._receiver = None
+        self._connection.release(self._config.keep_alive)
@@ -0,0 +1,298 @@
+import logging
+import queue
+import socket
+import struct
+import threading
+from typing import ClassVar, Dict, Optional, Tuple
+
+from uds.uds_communications.TransportProtocols.DoIP.DoIPTypes import (
+    DOIP_ADDRESSES,
+    DOIP_ADDRESSES_SIZE,
+    DOIP_HEADER,
+    DOIP_HEADER_SIZE,
+    DoIPPayloadType,
+    DoIPRoutingActivationCode,
+)
+
+logger = logging.getLogger(__name__)
+
+#: key of the shared connections: host, port and tester logical address
+ConnectionKey = Tuple[str, int, int]
+
+
+class DoIPReceiver:
+    """Messages and acknowledgements received from one DoIP node."""
+
+    __slots__ = ("messages", "acks")
+
+    def __init__(self) -> None:
+        #: user data of the diagnostic messages, or None once the connection is lost
+        self.messages: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        #: (payload type, acknowledgement code) of the diagnostic message acknowledgements
+        self.acks: "queue.Queue[Optional[Tuple[int, int]]]" = queue.Queue()
+
+
+class DoIPConnection:
+    """TCP connection to a DoIP entity with an activated routing, shared
+    by all the transports of the same tester talking to it.
+
+    A reception thread answers the alive checks of the entity at once
+    and sorts the diagnostic messages and their acknowledgements by
+    source address, so that several transports, each one diagnosing
+    its own ECU behind the entity, can use the connection at the same
+    time.
+    """
+
+    _pool: ClassVar[Dict[ConnectionKey, "DoIPConnection"]] = {}
+    _pool_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        source_address: int,
+        activation_type: int = 0x00,
+        protocol_version: int = 0x02,
+        timeout: float = 2.0,
+    ) -> None:
+        """Connect to the DoIP entity and activate the routing.
+
+        :param host: address of the DoIP entity
+        :param port: TCP port of the DoIP entity
+        :param source_address: logical address of the tester
+        :param activation_type: routing activation type
+        :param protocol_version: DoIP protocol version
+        :param timeout: maximum time to connect and activate the routing
+
+        :raises ConnectionError: if the routing activation is refused
+        :raises OSError: if the connection fails
+        """
+        self.key = (host, port, source_address)
+        self.source_address = source_address
+        self.protocol_version = protocol_version
+        #: logical address of the DoIP entity, known once the routing is activated
+        self.entity_address = None
+        self.closed = False
+        self._users = 0
+        self._receivers: Dict[int, DoIPReceiver] = {}
+        self._send_lock = threading.Lock()
+
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        try:
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            self._activate_routing(activation_type)
+        except BaseException:
+            self._socket.close()
+            raise
+        # the reception thread blocks on the socket, the timeouts are handled by the receivers' queues
+        self._socket.settimeout(None)
+        self._thread = threading.Thread(target=self._receive_loop, name=f"DoIP {host}:{port}", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def acquire(
+        cls,
+        host: str,
+        port: int,
+        source_address: int,
+        activation_type: int = 0x00,
+        protocol_version: int = 0x02,
+        timeout: float = 2.0,
+    ) -> "DoIPConnection":
+        """Return the open connection of the tester to the DoIP entity,
+        connecting first if there is none.
+
+        :param host: address of the DoIP entity
+        :param port: TCP port of the DoIP entity
+        :param source_address: logical address of the tester
+        :param activation_type: routing activation type
+        :param protocol_version: DoIP protocol version
+        :param timeout: maximum time to connect and activate the routing
+        :return: the connection, to be released once not used any longer
+        """
+        key = (host, port, source_address)
+        with cls._pool_lock:
+            connection = cls._pool.get(key)
+            if connection is None or connection.closed:
+                connection = cls(host, port, source_address, activation_type, protocol_version, timeout)
+                cls._pool[key] = connection
+            connection._users += 1
+        return connection
+
+    def release(self, keep_alive: bool = True) -> None:
+        """Give the connection back once a transport does not use it
+        any longer.
+
+        :param keep_alive: False to close the connection if no other
+            transport uses it
+        """
+        with self._pool_lock:
+            self._users -= 1
+            if self._users > 0 or keep_alive:
+                return
+            if self._pool.get(self.key) is self:
+                del self._pool[self.key]
+        self.close()
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Close all the shared connections."""
+        with cls._pool_lock:
+            connections = list(cls._pool.values())
+            cls._pool.clear()
+        for connection in connections:
+            connection.close()
+
+    def register(self, address: int) -> DoIPReceiver:
+        """Collect the messages sent by the given node.
+
+        :param address: logical address of the node
+        :return: the queues the node's messages are put in
+        :raises ValueError: if another transport already collects them
+        """
+        with self._pool_lock:
+            if address in self._receivers:
+                raise ValueError(f"messages from 0x{address:04X} are already collected by another transport")
+            receiver = self._receivers[address] = DoIPReceiver()
+        return receiver
+
+    def unregister(self, address: int) -> None:
+        """Stop collecting the messages sent by the given node.
+
+        :param address: logical address of the node
+        """
+        with self._pool_lock:
+            self._receivers.pop(address, None)
+
+    def send(self, payload_type: int, payload: bytes) -> None:
+        """Send a DoIP message.
+
+        :param payload_type: type of the message
+        :param payload: content of the message
+        :raises ConnectionError: if the connection is closed
+        """
+        if self.closed:
+            raise ConnectionError("DoIP connection closed")
+        header = DOIP_HEADER.pack(self.protocol_version, self.protocol_version ^ 0xFF, payload_type, len(payload))
+        with self._send_lock:
+            self._socket.sendall(header + payload)
+
+    def send_diagnostic_message(self, target_address: int, user_data: bytes) -> None:
+        """Send a diagnostic message to a node behind the DoIP entity.
+
+        :param target_address: logical address of the node
+        :param user_data: the UDS message
+        """
+        self.send(
+            DoIPPayloadType.DIAGNOSTIC_MESSAGE, DOIP_ADDRESSES.pack(self.source_address, target_address) + user_data
+        )
+
+    def close(self) -> None:
+        """Close the connection, the transports waiting for a message
+        are woken up.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        for receiver in list(self._receivers.values()):
+            receiver.messages.put(None)
+            receiver.acks.put(None)
+
+    def _read_exactly(self, length: int) -> bytes:
+        data = bytearray()
+        while len(data) < length:
+            chunk = self._socket.recv(length - len(data))
+            if not chunk:
+                raise ConnectionError("DoIP connection closed by the entity")
+            data += chunk
+        return bytes(data)
+
+    def _read_message(self) -> Tuple[int, bytes]:
+        """Read the next DoIP message from the socket.
+
+        :return: the payload type and payload
+        :raises ConnectionError: if the header is invalid or the
+            connection is closed
+        """
+        version, inverse_version, payload_type, length = DOIP_HEADER.unpack(self._read_exactly(DOIP_HEADER_SIZE))
+        if version ^ 0xFF != inverse_version:
+            raise ConnectionError(f"Invalid DoIP header, protocol version 0x{version:02X}/0x{inverse_version:02X}")
+        return payload_type, self._read_exactly(length)
+
+    def _activate_routing(self, activation_type: int) -> None:
+        """Request the routing of the diagnostic messages.
+
+        :param activation_type: routing activation type
+        :raises ConnectionError: if the activation is refused
+        """
+        self.send(
+            DoIPPayloadType.ROUTING_ACTIVATION_REQUEST,
+            self.source_address.to_bytes(2, "big") + bytes((activation_type, 0, 0, 0, 0)),
+        )
+        while True:
+            payload_type, payload = self._read_message()
+            if payload_type == DoIPPayloadType.ROUTING_ACTIVATION_RESPONSE:
+                break
+            self._handle_message(payload_type, payload)
+
+        self.entity_address = int.from_bytes(payload[2:4], "big")
+        code = payload[4]
+        if code != DoIPRoutingActivationCode.SUCCESS:
+            try:
+                reason = DoIPRoutingActivationCode(code).name
+            except ValueError:
+                reason = "UNKNOWN"
+            raise ConnectionError(f"Routing activation refused with code 0x{code:02X} ({reason})")
+
+    def _receive_loop(self) -> None:
+        try:
+            while not self.closed:
+                payload_type, payload = self._read_message()
+                try:
+                    self._handle_message(payload_type, payload)
+                except (IndexError, struct.error, ValueError) as error:
+                    # the header gave the message's length, the next one is still found
+                    logger.warning(f"Dropped malformed DoIP message of type 0x{payload_type:04X}: {error}")
+        except OSError as error:
+            if not self.closed:
+                logger.warning(f"DoIP connection to {self.key[0]}:{self.key[1]} lost: {error}")
+        except Exception:
+            logger.exception(f"DoIP connection to {self.key[0]}:{self.key[1]} closed on an unexpected error")
+        finally:
+            # wakes up the transports waiting for a message
+            self.close()
+
+    def _handle_message(self, payload_type: int, payload: bytes) -> None:
+        """Answer an alive check or hand a message over to its receiver.
+
+        :param payload_type: type of the message
+        :param payload: content of the message
+        """
+        if payload_type == DoIPPayloadType.ALIVE_CHECK_REQUEST:
+            self.send(DoIPPayloadType.ALIVE_CHECK_RESPONSE, self.source_address.to_bytes(2, "big"))
+            return
+        if payload_type == DoIPPayloadType.GENERIC_NACK:
+            logger.error(f"DoIP message rejected by the entity with code 0x{payload[0]:02X}")
+            return
+        if payload_type not in (
+            DoIPPayloadType.DIAGNOSTIC_MESSAGE,
+            DoIPPayloadType.DIAGNOSTIC_MESSAGE_ACK,
+            DoIPPayloadType.DIAGNOSTIC_MESSAGE_NACK,
+        ):
+            logger.debug(f"Ignored DoIP message of type 0x{payload_type:04X}")
+            return
+
+        source_address, _ = DOIP_ADDRESSES.unpack_from(payload)
+        receiver = self._receivers.get(source_address)
+        if receiver is None:
+            logger.debug(f"Ignored DoIP message from 0x{source_address:04X}, no transport for it")
+        elif payload_type == DoIPPayloadType.DIAGNOSTIC_MESSAGE:
+            receiver.messages.put(payload[DOIP_ADDRESSES_SIZE:])
+        else:
+            receiver.acks.put((payload_type, payload[DOIP_ADDRESSES_SIZE]))
@@ -0,0 +1,209 @@
+import logging
+import socket
+import socketserver
+import threading
+from typing import Callable, Collection, Iterable, List, Optional, Tuple
+
+from uds.uds_communications.TransportProtocols.DoIP.DoIPTypes import (
+    DOIP_ADDRESSES,
+    DOIP_ADDRESSES_SIZE,
+    DOIP_HEADER,
+    DOIP_HEADER_SIZE,
+    DoIPDiagnosticNackCode,
+    DoIPPayloadType,
+    DoIPRoutingActivationCode,
+)
+
+logger = logging.getLogger(__name__)
+
+#: handler of the diagnostic messages: called with the target address and the UDS request, returns the responses
+Handler = Callable[[int, bytes], Iterable[bytes]]
+
+
+class _DoIPRequestHandler(socketserver.BaseRequestHandler):
+    """Serve one tester connection of a DoIPServer."""
+
+    server: "_DoIPTCPServer"
+
+    def setup(self) -> None:
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.send_lock = threading.Lock()
+        self.tester_address = None
+        self.server.entity.add_connection(self)
+
+    def finish(self) -> None:
+        self.server.entity.remove_connection(self)
+
+    def send(self, payload_type: int, payload: bytes) -> None:
+        version = self.server.entity.protocol_version
+        with self.send_lock:
+            self.request.sendall(DOIP_HEADER.pack(version, version ^ 0xFF, payload_type, len(payload)) + payload)
+
+    def _read_exactly(self, length: int) -> Optional[bytes]:
+        data = bytearray()
+        while len(data) < length:
+            chunk = self.request.recv(length - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return bytes(data)
+
+    def handle(self) -> None:
+        entity = self.server.entity
+        try:
+            while True:
+                header = self._read_exactly(DOIP_HEADER_SIZE)
+                if header is None:
+                    return
+                _, _, payload_type, length = DOIP_HEADER.unpack(header)
+                payload = self._read_exactly(length)
+                if payload is None:
+                    return
+
+                if payload_type == DoIPPayloadType.ROUTING_ACTIVATION_REQUEST:
+                    self.tester_address = int.from_bytes(payload[:2], "big")
+                    self.send(
+                        DoIPPayloadType.ROUTING_ACTIVATION_RESPONSE,
+                        DOIP_ADDRESSES.pack(self.tester_address, entity.logical_address)
+                        + bytes((entity.activation_code, 0, 0, 0, 0)),
+                    )
+                elif payload_type == DoIPPayloadType.ALIVE_CHECK_RESPONSE:
+                    entity.alive_check_responses.append(int.from_bytes(payload[:2], "big"))
+                elif payload_type == DoIPPayloadType.DIAGNOSTIC_MESSAGE:
+                    self._handle_diagnostic_message(payload)
+                else:
+                    logger.debug(f"Ignored DoIP message of type 0x{payload_type:04X}")
+        except OSError:
+            pass
+
+    def _handle_diagnostic_message(self, payload: bytes) -> None:
+        entity = self.server.entity
+        source_address, target_address = DOIP_ADDRESSES.unpack_from(payload)
+        reply_addresses = DOIP_ADDRESSES.pack(target_address, source_address)
+        if target_address not in entity.nodes and target_address not in entity.functional_addresses:
+            self.send(
+                DoIPPayloadType.DIAGNOSTIC_MESSAGE_NACK,
+                reply_addresses + bytes((DoIPDiagnosticNackCode.UNKNOWN_TARGET_ADDRESS,)),
+            )
+            return
+
+        request = payload[DOIP_ADDRESSES_SIZE:]
+        entity.received.append((target_address, request))
+        self.send(DoIPPayloadType.DIAGNOSTIC_MESSAGE_ACK, reply_addresses + b"\x00")
+        nodes = entity.nodes if target_address in entity.functional_addresses else (target_address,)
+        for node in nodes:
+            for response in entity.handler(node, request) or ():
+                self.send(
+                    DoIPPayloadType.DIAGNOSTIC_MESSAGE,
+                    DOIP_ADDRESSES.pack(node, source_address) + bytes(response),
+                )
+
+
+class _DoIPTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    entity: "DoIPServer"
+
+
+class DoIPServer:
+    """Minimal DoIP entity listening on a local TCP port, standing in
+    for a vehicle gateway in tests.
+
+    Routing activations are answered with the configured code, the
+    diagnostic messages to the known nodes are acknowledged then given
+    to ``handler``, whose responses are sent back from the addressed
+    node. Messages to a functional address are given to the handler
+    once per node.
+
+    :param handler: called with the target address and the request,
+        returns the responses to send
+    :param nodes: logical addresses of the ECUs behind the entity
+    :param functional_addresses: logical addresses of the functional
+        requests
+    :param host: address to listen on
+    :param port: port to listen on, 0 for any free port
+    :param logical_address: logical address of the entity
+    :param protocol_version: DoIP protocol version
+    :param activation_code: routing activation response code
+    """
+
+    #: time between two checks for a stop request, in seconds
+    poll_interval = 0.01
+
+    def __init__(
+        self,
+        handler: Handler,
+        nodes: Collection[int] = (0x1000,),
+        functional_addresses: Collection[int] = (0xE400,),
+        host: str = "127.0.0.1",
+        port: int = 0,
+        logical_address: int = 0x1000,
+        protocol_version: int = 0x02,
+        activation_code: int = DoIPRoutingActivationCode.SUCCESS,
+    ) -> None:
+        self.handler = handler
+        self.nodes = tuple(nodes)
+        self.functional_addresses = tuple(functional_addresses)
+        self.logical_address = logical_address
+        self.protocol_version = protocol_version
+        self.activation_code = activation_code
+        #: (target address, request) of all the received diagnostic messages
+        self.received: List[Tuple[int, bytes]] = []
+        #: tester addresses of all the received alive check responses
+        self.alive_check_responses: List[int] = []
+        #: number of TCP connections accepted so far
+        self.connection_count = 0
+        self._connections: List[_DoIPRequestHandler] = []
+        self._lock = threading.Lock()
+        self._server = _DoIPTCPServer((host, port), _DoIPRequestHandler, bind_and_activate=True)
+        self._server.entity = self
+        self._thread = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port the entity listens on."""
+        return self._server.server_address[:2]
+
+    def add_connection(self, connection: _DoIPRequestHandler) -> None:
+        with self._lock:
+            self._connections.append(connection)
+            self.connection_count += 1
+
+    def remove_connection(self, connection: _DoIPRequestHandler) -> None:
+        with self._lock:
+            self._connections.remove(connection)
+
+    def send_alive_check(self) -> None:
+        """Send an alive check request on all the open connections."""
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            connection.send(DoIPPayloadType.ALIVE_CHECK_REQUEST, b"")
+
+    def start(self) -> "DoIPServer":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(self.poll_interval,), name="DoIP server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close all the connections."""
+        self._server.shutdown()
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "DoIPServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,54 @@
+import struct
+from enum import IntEnum
+
+#: TCP and UDP port of the DoIP entities
+DOIP_PORT = 13400
+
+#: generic header: protocol version, inverse protocol version, payload type and payload length
+DOIP_HEADER = struct.Struct("!BBHI")
+DOIP_HEADER_SIZE = DOIP_HEADER.size
+
+#: source and target addresses at the beginning of the diagnostic message payloads
+DOIP_ADDRESSES = struct.Struct("!HH")
+DOIP_ADDRESSES_SIZE = DOIP_ADDRESSES.size
+
+
+class DoIPPayloadType(IntEnum):
+    GENERIC_NACK = 0x0000
+    ROUTING_ACTIVATION_REQUEST = 0x0005
+    ROUTING_ACTIVATION_RESPONSE = 0x0006
+    ALIVE_CHECK_REQUEST = 0x0007
+    ALIVE_CHECK_RESPONSE = 0x0008
+    DIAGNOSTIC_MESSAGE = 0x8001
+    DIAGNOSTIC_MESSAGE_ACK = 0x8002
+    DIAGNOSTIC_MESSAGE_NACK = 0x8003
+
+
+class DoIPRoutingActivationCode(IntEnum):
+    UNKNOWN_SOURCE_ADDRESS = 0x00
+    NO_FREE_SOCKET = 0x01
+    SOURCE_ADDRESS_MISMATCH = 0x02
+    SOURCE_ADDRESS_ALREADY_ACTIVE = 0x03
+    MISSING_AUTHENTICATION = 0x04
+    REJECTED_CONFIRMATION = 0x05
+    UNSUPPORTED_ACTIVATION_TYPE = 0x06
+    SUCCESS = 0x10
+    CONFIRMATION_REQUIRED = 0x11
+
+
+class DoIPGenericNackCode(IntEnum):
+    INCORRECT_PATTERN = 0x00
+    UNKNOWN_PAYLOAD_TYPE = 0x01
+    MESSAGE_TOO_LARGE = 0x02
+    OUT_OF_MEMORY = 0x03
+    INVALID_PAYLOAD_LENGTH = 0x04
+
+
+class DoIPDiagnosticNackCode(IntEnum):
+    INVALID_SOURCE_ADDRESS = 0x02
+    UNKNOWN_TARGET_ADDRESS = 0x03
+    MESSAGE_TOO_LARGE = 0x04
+    OUT_OF_MEMORY = 0x05
+    TARGET_UNREACHABLE = 0x06
+    UNKNOWN_NETWORK = 0x07
+    TRANSPORT_PROTOCOL_ERROR = 0x08
@@ -0,0 +1,371 @@
+import asyncio
+import contextvars
+import functools
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from uds.config import Config
+from uds.factories import TpFactory
+from uds.uds_config_tool.IHexFunctions import ihexFile as ihexFileParser
+from uds.uds_config_tool.ISOStandard.ISOStandard import IsoDataFormatIdentifier
+from uds.uds_config_tool.UdsConfigTool import UdsTool
+from uds.uds_communications.Uds.DidCache import DidCache
+from uds.uds_communications.Uds.UdsExchange import (
+    RECEIVE,
+    SEND,
+    Steps,
+    exchange_steps,
+    functional_exchange_steps,
+)
+from uds.uds_communications.Uds.UdsMetrics import UdsMetrics, default_labels
+from uds.uds_communications.Uds.UdsTiming import UdsTiming
+
+#: diagnostic services bound from the ODX containers which are exposed as coroutines
+ASYNC_SERVICES = (
+    "clearDTC",
+    "diagnosticSessionControl",
+    "ecuReset",
+    "inputOutputControl",
+    "readDTC",
+    "readDataByIdentifier",
+    "readDataByIdentifierBatch",
+    "requestDownload",
+    "requestUpload",
+    "routineControl",
+    "securityAccess",
+    "testerPresent",
+    "transferExit",
+    "writeDataByIdentifier",
+)
+
+#: responses of the service call currently replayed in the running task
+_replay = contextvars.ContextVar("_replay")
+
+
+class _RequestPending(BaseException):
+    """Raised by the service host to interrupt a service when it needs a
+    response that was not received yet.
+
+    Derived from BaseException so that the broad exception handlers of
+    the services do not swallow it.
+    """
+
+    def __init__(self, msg, responseRequired: bool, functionalReq: bool, tpWaitTime: float) -> None:
+        super().__init__()
+        self.msg = msg
+        self.responseRequired = responseRequired
+        self.functionalReq = functionalReq
+        self.tpWaitTime = tpWaitTime
+
+
+class _ServiceReplay:
+    """Responses received so far for one call of a bound service."""
+
+    __slots__ = ("responses", "position", "cached")
+
+    def __init__(self) -> None:
+        self.responses = []
+        self.position = 0
+        # DID -> response found in the DID cache by the first run of the call
+        self.cached = {}
+
+
+class _ReplayedDidCache:
+    """DID cache seen by the bound services: the DIDs are looked up once
+    per service call, so that its runs send the same requests and count
+    a single hit or miss.
+    """
+
+    def __init__(self, cache: DidCache, replay: _ServiceReplay) -> None:
+        self._cache = cache
+        self._replay = replay
+
+    def get(self, did: int, semantic: Optional[str] = None) -> Optional[dict]:
+        if did not in self._replay.cached:
+            self._replay.cached[did] = self._cache.get(did, semantic)
+        return self._replay.cached[did]
+
+    def put(self, did: int, value: dict, semantic: Optional[str] = None) -> None:
+        self._cache.put(did, value, semantic)
+
+
+class _ServiceHost:
+    """Object the synchronous ODX services are bound to on behalf of an
+    AsyncUds instance.
+
+    The bound services are plain functions calling ``target.send`` and
+    expecting the response as return value. Instead of blocking, the
+    host's send replays the responses already received for the current
+    call and interrupts the service with the next request to send. The
+    AsyncUds instance then awaits the exchange and runs the service again
+    from the start, until it completes.
+    """
+
+    def __init__(self, uds: "AsyncUds") -> None:
+        self._uds = uds
+
+    def send(self, msg, responseRequired=True, functionalReq=False, tpWaitTime=0.01):
+        replay = _replay.get()
+        if replay.position < len(replay.responses):
+            response = replay.responses[replay.position]
+            replay.position += 1
+            return response
+        raise _RequestPending(msg, responseRequired, functionalReq, tpWaitTime)
+
+    def isTransmitting(self) -> bool:
+        return self._uds.isTransmitting()
+
+    @property
+    def did_cache(self) -> Optional[_ReplayedDidCache]:
+        if self._uds.did_cache is None:
+            return None
+        return _ReplayedDidCache(self._uds.did_cache, _replay.get())
+
+    @property
+    def rdbi_max_dids(self) -> int:
+        return self._uds.rdbi_max_dids
+
+    @property
+    def rdbi_max_response_length(self) -> int:
+        return self._uds.rdbi_max_response_length
+
+
+class AsyncUds:
+    """UDS client for asyncio applications.
+
+    Mirrors :class:`Uds`: the requests are sent with ``await
+    uds.send(...)`` and the diagnostic services created from the ODX file
+    are available as coroutines, e.g. ``await
+    uds.readDataByIdentifier("ECU Serial Number")``.
+
+    The tester present keep alive thread of the synchronous client is not
+    started by diagnosticSessionControl, the application has to schedule
+    testerPresent itself if needed.
+
+    A service sending several requests is replayed from the start after
+    each response, see :meth:`_call_service` for the cost of this.
+    """
+
+    def __init__(self, odx: Optional[Path] = None, ihexFile=None, **kwargs) -> None:
+        """Create the client.
+
+        :param odx: ODX file describing the diagnostic services
+        :param ihexFile: ihex file to transfer with transferFile
+        :param kwargs: named arguments given to the transport protocol
+        """
+        self.__transportProtocol = Config.uds.transport_protocol
+        self.__P2_CAN_Client = Config.uds.p2_can_client
+        # P2 and P2* of the current session, per service overrides and response pending measures
+        self.timing = UdsTiming.from_config(Config.uds)
+
+        self.tp = TpFactory.select_async_transport_protocol(self.__transportProtocol, **kwargs)
+        # latency, response pending, NRC, bytes and frames counts per service
+        self.metrics = UdsMetrics(default_labels(self.tp))
+        # decoded readDataByIdentifier responses, None unless did_cache_size is set
+        self.did_cache = DidCache.from_config(Config.uds)
+        # how readDataByIdentifierBatch packs the DIDs into requests
+        self.rdbi_max_dids = Config.uds.rdbi_max_dids
+        self.rdbi_max_response_length = Config.uds.rdbi_max_response_length
+
+        self.last_resp_time = None
+        self.last_pending_resp_times = []
+
+        self.__transmissionActive_flag = False
+        # created on first use, within the event loop
+        self.__sendLock = None
+
+        self.__ihexFile = ihexFileParser(ihexFile) if ihexFile is not None else None
+        self._services = _ServiceHost(self)
+        self.load_odx(odx)
+
+    def load_odx(self, odx_file: Path) -> None:
+        """Load the given odx file and create the associated UDS
+        diagnostic services as coroutines.
+
+        :param odx_file: odx file full path
+        """
+        if odx_file is None:
+            return
+        UdsTool.create_service_containers(odx_file)
+        UdsTool.bind_containers(self._services)
+        # the keep alive thread would send outside of any event loop
+        self._services.testerPresentThread = lambda *args, **kwargs: None
+        for name in ASYNC_SERVICES:
+            if hasattr(self._services, name):
+                setattr(self, name, functools.partial(self._call_service, name))
+
+    @property
+    def ihexFile(self):
+        return self.__ihexFile
+
+    @ihexFile.setter
+    def ihexFile(self, value):
+        if value is not None:
+            self.__ihexFile = ihexFileParser(value)
+
+    async def _call_service(self, name: str, *args, **kwargs):
+        """Run a bound ODX service, awaiting every exchange it requests.
+
+        The synchronous service is run again from the start after each
+        response, replaying the responses already received, until it
+        returns. A service sending n requests, e.g.
+        readDataByIdentifierBatch over several DIDs, therefore encodes its
+        requests and decodes its responses O(n²) times in total: prefer a
+        few larger requests over many small ones when the decoding cost
+        matters.
+
+        :param name: name of the service, e.g. readDataByIdentifier
+        :return: what the service returns
+        """
+        service = getattr(self._services, name)
+        replay = _ServiceReplay()
+        token = _replay.set(replay)
+        try:
+            while True:
+                replay.position = 0
+                try:
+                    return service(*args, **kwargs)
+                except _RequestPending as request:
+                    response = await self.send(
+                        request.msg,
+                        request.responseRequired,
+                        request.functionalReq,
+                        request.tpWaitTime,
+                    )
+                    replay.responses.append(response)
+        finally:
+            _replay.reset(token)
+
+    async def transferData(
+        self,
+        blockSequenceCounter=None,
+        transferRequestParameterRecord=None,
+        transferBlock=None,
+        transferBlocks=None,
+        **kwargs,
+    ):
+        """Coroutine version of the bound transferData service.
+
+        The chunks of a block are sent one service call at a time rather
+        than through the service's own loop, which would be replayed from
+        the first chunk for every response.
+        """
+        blocks = transferBlock if transferBlock is not None else transferBlocks
+        if blocks is None:
+            return await self._call_service(
+                "transferData", blockSequenceCounter, transferRequestParameterRecord, **kwargs
+            )
+        retval = None
+        for index, chunk in enumerate(blocks.transmitChunks()):
+            retval = await self._call_service("transferData", index + 1, chunk)
+        return retval
+
+    async def transferIHexFile(self, transmitChunkSize=None, compressionMethod=None):
+        """Coroutine version of Uds.transferIHexFile."""
+        if transmitChunkSize is not None:
+            self.__ihexFile.transmitChunksize = transmitChunkSize
+        if compressionMethod is None:
+            compressionMethod = IsoDataFormatIdentifier.noCompressionMethod
+        await self.requestDownload(
+            [compressionMethod],
+            self.__ihexFile.transmitAddress,
+            self.__ihexFile.transmitLength,
+        )
+        await self.transferData(transferBlocks=self.__ihexFile)
+        return await self.transferExit()
+
+    async def transferFile(self, fileName=None, transmitChunkSize=None, compressionMethod=None):
+        """Coroutine version of Uds.transferFile."""
+        if fileName is None and self.__ihexFile is None:
+            raise FileNotFoundError("file to transfer has not been specified")
+
+        if fileName[-4:] == ".hex" or fileName[-5:] == ".ihex":
+            self.__ihexFile = ihexFileParser(fileName)
+            return await self.transferIHexFile(transmitChunkSize, compressionMethod)
+        else:
+            raise FileNotFoundError(
+                "file to transfer has not been recognised as a supported type ['.hex','.ihex']"
+            )
+
+    async def send(
+        self, msg, responseRequired: bool = True, functionalReq: bool = False, tpWaitTime: float = 0.01
+    ) -> Optional[List[int]]:
+        """Send a request and await its response.
+
+        Request and response are exchanged under a lock so that the
+        concurrent tasks sharing a client do not pick up each other's
+        response.
+
+        :param msg: the request
+        :param responseRequired: False if no response is expected
+        :param functionalReq: True for a functional request, no response
+            is awaited then
+        :param tpWaitTime: given to the transport protocol's send
+        :return: the final response, skipping the response pending ones
+        """
+        return await self._exchange(exchange_steps(self, msg, responseRequired, functionalReq, tpWaitTime))
+
+    async def send_functional(
+        self, msg, responseRequired: bool = True, tpWaitTime: float = 0.01
+    ) -> Dict[int, List[int]]:
+        """Send a request on the functional ID and await the responses of
+        all the ECUs answering it.
+
+        :param msg: the request, it has to fit in a single frame
+        :param responseRequired: False to only send the request
+        :param tpWaitTime: given to the transport protocol's send
+        :return: the final response of each ECU, per response ID
+        :raises NotImplementedError: if a response is required and the
+            transport protocol cannot collect the responses of several
+            ECUs
+        """
+        return await self._exchange(functional_exchange_steps(self, msg, responseRequired, tpWaitTime))
+
+    async def _exchange(self, steps: Steps):
+        """Perform an exchange under the send lock.
+
+        :param steps: generator from exchange_steps or
+            functional_exchange_steps
+        :return: the value returned by the generator
+        """
+        if self.__sendLock is None:
+            self.__sendLock = asyncio.Lock()
+
+        async with self.__sendLock:
+            self.__transmissionActive_flag = True
+            result = await self._run_exchange(steps)
+
+            if hasattr(self._services, "sessionSetLastSend"):
+                self._services.sessionSetLastSend()
+
+            self.__transmissionActive_flag = False
+        return result
+
+    async def _run_exchange(self, steps: Steps):
+        """Perform the I/O steps of an exchange generator without blocking
+        the event loop.
+
+        :param steps: generator from exchange_steps or
+            functional_exchange_steps
+        :return: the value returned by the generator
+        """
+        result = None
+        error = None
+        try:
+            while True:
+                step, argument = steps.send(result) if error is None else steps.throw(error)
+                error = None
+                try:
+                    if step is SEND:
+                        result = await self.tp.send(*argument)
+                    elif step is RECEIVE:
+                        result = await self.tp.recv(argument)
+                    else:
+                        result = await self.tp.recv_functional(*argument)
+                except TimeoutError as timeout:
+                    error = timeout
+        except StopIteration as stop:
+            return stop.value
+
+    def isTransmitting(self) -> bool:
+        return self.__transmissionActive_flag
@@ -0,0 +1,180 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+#: TTL of the DIDs read once and kept until invalidated
+STATIC = None
+#: TTL of the DIDs never cached
+VOLATILE = 0.0
+
+WRITE_DATA_BY_IDENTIFIER = 0x2E
+WRITE_DATA_BY_IDENTIFIER_RESPONSE = 0x6E
+#: positive responses after which no cached DID can be trusted anymore
+SESSION_RESPONSES = frozenset({0x50, 0x51})
+#: requests after which no cached DID can be trusted anymore, when their response is not awaited
+SESSION_REQUESTS = frozenset({0x10, 0x11})
+
+#: ISO 14229-1 identification DIDs (0xF180 - 0xF19F) are static, but the active diagnostic session
+DEFAULT_POLICIES: Dict[int, Optional[float]] = {did: STATIC for did in range(0xF180, 0xF1A0)}
+DEFAULT_POLICIES[0xF186] = VOLATILE
+
+
+class DidCache:
+    """Cache of the decoded ReadDataByIdentifier responses, per DID.
+
+    The time a DID stays in the cache is given by its policy: ``None``
+    for a static DID kept until invalidated, ``0`` for a volatile DID
+    never cached, or a TTL in seconds. The DIDs without policy take
+    the one of their ODX service semantic, if listed in
+    ``semantic_policies``, else ``default_ttl``. Once ``max_entries``
+    DIDs are cached, the least recently read one is evicted.
+
+    The cache follows the requests sent by its Uds instance: a positive
+    WriteDataByIdentifier response removes the written DID, a positive
+    DiagnosticSessionControl or ECUReset response clears the cache. The
+    requests whose response is not awaited, e.g. with the suppress
+    positive response bit or sent functionally, are assumed to succeed.
+
+    :param max_entries: maximum number of cached DIDs
+    :param default_ttl: TTL of the DIDs without policy
+    :param policies: DID -> TTL, taking precedence over
+        :data:`DEFAULT_POLICIES`
+    :param semantic_policies: ODX DIAG-SERVICE semantic -> TTL, e.g.
+        ``{"IDENTIFICATION": None}``
+    :param clock: time source of the TTLs, in seconds
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        default_ttl: Optional[float] = VOLATILE,
+        policies: Optional[Dict[int, Optional[float]]] = None,
+        semantic_policies: Optional[Dict[str, Optional[float]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.semantic_policies = dict(semantic_policies or {})
+        self._clock = clock
+        # DID -> (expiry time or None, decoded response), least recently read first
+        self._entries: "OrderedDict[int, Tuple[Optional[float], dict]]" = OrderedDict()
+        # the tester present thread sends along with the tests
+        self._lock = threading.Lock()
+        #: number of reads served from the cache
+        self.hits = 0
+        #: number of reads of a cacheable DID sent to the ECU
+        self.misses = 0
+        #: number of DIDs removed to stay within max_entries
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, config) -> Optional["DidCache"]:
+        """Create the cache described by a :class:`UdsConfig`, None if
+        its ``did_cache_size`` is 0.
+        """
+        if not config.did_cache_size:
+            return None
+        return cls(
+            config.did_cache_size,
+            config.did_cache_ttl,
+            config.did_cache_policies,
+            config.did_cache_semantic_policies,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ttl(self, did: int, semantic: Optional[str] = None) -> Optional[float]:
+        """TTL of a DID.
+
+        :param did: the data identifier
+        :param semantic: the semantic of its ODX DIAG-SERVICE
+        :return: None for a static DID, 0 for a volatile one, else the
+            TTL in seconds
+        """
+        if did in self.policies:
+            return self.policies[did]
+        if semantic in self.semantic_policies:
+            return self.semantic_policies[semantic]
+        return self.default_ttl
+
+    def cacheable(self, did: int, semantic: Optional[str] = None) -> bool:
+        return self.max_entries > 0 and self.ttl(did, semantic) != VOLATILE
+
+    def get(self, did: int, semantic: Optional[str] = None) -> Optional[dict]:
+        """Return a copy of the cached response of a DID, None if it has
+        to be read from the ECU.
+        """
+        if not self.cacheable(did, semantic):
+            return None
+        with self._lock:
+            entry = self._entries.get(did)
+            if entry is not None and entry[0] is not None and entry[0] <= self._clock():
+                del self._entries[did]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(did)
+            self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, did: int, value: dict, semantic: Optional[str] = None) -> None:
+        """Cache the decoded response of a DID, if its policy allows it."""
+        ttl = self.ttl(did, semantic)
+        if self.max_entries <= 0 or ttl == VOLATILE:
+            return
+        expiry = None if ttl is STATIC else self._clock() + ttl
+        with self._lock:
+            self._entries[did] = (expiry, copy.deepcopy(value))
+            self._entries.move_to_end(did)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, dids: Optional[Iterable[int]] = None) -> None:
+        """Remove the given DIDs from the cache, all of them if None."""
+        with self._lock:
+            if dids is None:
+                self._entries.clear()
+                return
+            for did in dids:
+                self._entries.pop(did, None)
+
+    def observe(self, request: Sequence[int], response: Optional[Sequence[int]]) -> None:
+        """Invalidate the DIDs a request may have changed, given its final
+        response.
+        """
+        if not response:
+            return
+        if response[0] in SESSION_RESPONSES:
+            self.invalidate()
+        elif response[0] == WRITE_DATA_BY_IDENTIFIER_RESPONSE and len(request) >= 3:
+            self.invalidate([(request[1] << 8) | request[2]])
+
+    def observe_request(self, request: Sequence[int]) -> None:
+        """Invalidate the DIDs a request may have changed, its response
+        not being awaited.
+        """
+        if not request:
+            return
+        if request[0] in SESSION_REQUESTS:
+            self.invalidate()
+        elif request[0] == WRITE_DATA_BY_IDENTIFIER and len(request) >= 3:
+            self.invalidate([(request[1] << 8) | request[2]])
+
+    def statistics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def reset_statistics(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
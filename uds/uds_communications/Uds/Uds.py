@@ -9,16 +9,25 @@ __maintainer__ = "Richard Clubb"
 __email__ = "richard.clubb@embeduk.com"
 __status__ = "Development"
 
-import time
 import threading
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Dict, List
 
 from uds.config import Config
 from uds.factories import TpFactory
 from uds.uds_config_tool.IHexFunctions import ihexFile as ihexFileParser
 from uds.uds_config_tool.ISOStandard.ISOStandard import IsoDataFormatIdentifier
 from uds.uds_config_tool.UdsConfigTool import UdsTool
+from uds.uds_communications.Uds.DidCache import DidCache
+from uds.uds_communications.Uds.UdsExchange import (
+    RECEIVE,
+    SEND,
+    Steps,
+    exchange_steps,
+    functional_exchange_steps,
+)
+from uds.uds_communications.Uds.UdsMetrics import UdsMetrics, default_labels
+from uds.uds_communications.Uds.UdsTiming import UdsTiming
 
 
 ##
@@ -34,10 +43,19 @@ class Uds(object):
         self.__transportProtocol = Config.uds.transport_protocol
         self.__P2_CAN_Client = Config.uds.p2_can_client
         self.__P2_CAN_Server = Config.uds.p2_can_server
+        # P2 and P2* of the current session, per service overrides and response pending measures
+        self.timing = UdsTiming.from_config(Config.uds)
 
         self.tp = TpFactory.select_transport_protocol(
             self.__transportProtocol, **kwargs
         )
+        # latency, response pending, NRC, bytes and frames counts per service
+        self.metrics = UdsMetrics(default_labels(self.tp))
+        # decoded readDataByIdentifier responses, None unless did_cache_size is set
+        self.did_cache = DidCache.from_config(Config.uds)
+        # how readDataByIdentifierBatch packs the DIDs into requests
+        self.rdbi_max_dids = Config.uds.rdbi_max_dids
+        self.rdbi_max_response_length = Config.uds.rdbi_max_response_length
 
         self.last_resp_time = None
         self.last_pending_resp_times = []
@@ -46,7 +64,8 @@ class Uds(object):
         self.__transmissionActive_flag = False
 
         # The above flag should prevent testerPresent operation, but in case of race conditions, this lock prevents actual overlapo in the sending
-        self.sendLock = threading.Lock()
+        # re-entrant, so that a whole service can be run under it (UdsExecutor)
+        self.sendLock = threading.RLock()
 
         # Process any ihex file that has been associated with the ecu at initialisation
         self.__ihexFile = ihexFileParser(ihexFile) if ihexFile is not None else None
@@ -66,9 +85,19 @@ class Uds(object):
     def overwrite_transmit_method(self, func: Callable):
         """override transmit method from the asscociated __connection
 
+        The frames are given to func as lists of integers, unless it
+        declares an ``accepts_bytes = True`` attribute, in which case it
+        gets them as bytes-like objects like a connector declaring it.
+
         :param func: callable use to replace the current configured
             transmit method
         """
+        if getattr(func, "accepts_bytes", False) is not True:
+            transmit = func
+
+            def func(data, req_id):
+                return transmit(list(data), req_id)
+
         self.tp.connection.transmit = func
 
     def overwrite_receive_method(self, func: Callable):
@@ -126,34 +155,9 @@ class Uds(object):
         # sets a current transmission in progress - tester present (if running) will not send if this flag is set to true
         self.__transmissionActive_flag = True
 
-        before_send_time = time.perf_counter()
-        # We're moving to threaded operation, so putting a lock around the send operation.
-        with self.sendLock:
-            self.tp.send(msg, functionalReq, tpWaitTime)
-
-        if functionalReq is True:
-            responseRequired = False
-
         # Note: in automated mode (unlikely to be used any other way), there is no response from tester present, so threading is not an issue here.
-        response = None
-        previous_time = None
-        self.last_resp_time = None
-        self.last_pending_resp_times = []
+        response = self._run_exchange(exchange_steps(self, msg, responseRequired, functionalReq, tpWaitTime))
 
-        if responseRequired:
-            while True:
-                response = self.tp.recv(self.__P2_CAN_Client)
-                current_time = time.perf_counter() - before_send_time
-                if not ((response[0] == 0x7F) and (response[2] == 0x78)):
-                    self.last_resp_time = current_time
-                    break
-                else:
-                    if previous_time is None:
-                        self.last_pending_resp_times.append(current_time)
-                        previous_time = current_time
-                    else:
-                        self.last_pending_resp_times.append(current_time - previous_time)
-                
         # If the diagnostic session control service is supported, record the sending time for possible use by the tester present functionality (again, if present) ...
         if hasattr(self, "sessionSetLastSend"):
             self.sessionSetLastSend()
@@ -162,6 +166,60 @@ class Uds(object):
         self.__transmissionActive_flag = False
         return response
 
+    def send_functional(self, msg, responseRequired=True, tpWaitTime=0.01) -> Dict[int, List[int]]:
+        """Send a request on the functional ID and collect the responses of
+        all the ECUs answering it.
+
+        Responses are accepted during P2 client or until every configured
+        functional responder answered, and for P2* for as long as some ECU
+        keeps answering with response pending.
+
+        :param msg: the request, it has to fit in a single frame
+        :param responseRequired: False to only send the request
+        :param tpWaitTime: given to the transport protocol's send
+        :return: the final response of each ECU, per response ID
+        :raises NotImplementedError: if a response is required and the
+            transport protocol cannot collect the responses of several
+            ECUs
+        """
+        steps = functional_exchange_steps(self, msg, responseRequired, tpWaitTime)
+        self.__transmissionActive_flag = True
+        responses = self._run_exchange(steps)
+
+        if hasattr(self, "sessionSetLastSend"):
+            self.sessionSetLastSend()
+
+        self.__transmissionActive_flag = False
+        return responses
+
+    def _run_exchange(self, steps: Steps):
+        """Perform the I/O steps of an exchange generator, blocking the
+        calling thread.
+
+        :param steps: generator from exchange_steps or
+            functional_exchange_steps
+        :return: the value returned by the generator
+        """
+        result = None
+        error = None
+        try:
+            while True:
+                step, argument = steps.send(result) if error is None else steps.throw(error)
+                error = None
+                try:
+                    if step is SEND:
+                        # We're moving to threaded operation, so putting a lock around the send operation.
+                        with self.sendLock:
+                            result = self.tp.send(*argument)
+                    elif step is RECEIVE:
+                        result = self.tp.recv(argument)
+                    else:
+                        result = self.tp.recv_functional(*argument)
+                except TimeoutError as timeout:
+                    error = timeout
+        except StopIteration as stop:
+            return stop.value
+
     ##
     # @brief
     def isTransmitting(self):
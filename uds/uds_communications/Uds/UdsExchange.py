@@ -0,0 +1,148 @@
+import time
+from typing import Any, Dict, Generator, List, Optional, Sequence, Tuple
+
+from uds.uds_communications.Uds.UdsMetrics import frame_counts, frames_since
+from uds.uds_communications.Uds.UdsTiming import is_response_pending
+
+# I/O steps yielded by the exchange generators, along with their argument:
+#: send a request, the argument is a (request, functionalReq, tpWaitTime) tuple
+SEND = "send"
+#: wait for the next response, the argument is the timeout, the response is sent back
+#: and a TimeoutError raised by the transport protocol is thrown into the generator
+RECEIVE = "receive"
+#: wait for the responses to a functional request, the argument is a (timeout, responders)
+#: tuple, the messages per response ID are sent back
+RECEIVE_FUNCTIONAL = "receive_functional"
+
+#: generator of (step, argument) tuples, performed by Uds._run_exchange and AsyncUds._run_exchange
+Steps = Generator[Tuple[str, Any], Any, Any]
+
+
+def exchange_steps(client, msg: Sequence[int], responseRequired: bool, functionalReq: bool, tpWaitTime: float) -> Steps:
+    """Send a request and receive its final response, as a sequence of
+    I/O steps.
+
+    The bookkeeping of the exchange is done here for both Uds and
+    AsyncUds: the response pending are followed with P2*, the session
+    timing and the DID cache follow the request and its response, and
+    the exchange is recorded in the metrics.
+
+    :param client: Uds or AsyncUds instance sending the request
+    :param msg: the request
+    :param responseRequired: False if no response is expected
+    :param functionalReq: True for a functional request, no response is
+        awaited then
+    :param tpWaitTime: given to the transport protocol's send
+    :return: a generator of the steps to perform, returning the final
+        response, None if no response is awaited
+    """
+    frames = frame_counts(client.tp)
+    before_send_time = time.perf_counter()
+    yield SEND, (msg, functionalReq, tpWaitTime)
+    transmit_time = time.perf_counter() - before_send_time
+
+    if functionalReq is True:
+        responseRequired = False
+
+    response = None
+    previous_time = None
+    client.last_resp_time = None
+    client.last_pending_resp_times = []
+
+    if responseRequired:
+        sid = msg[0]
+        pending_time = None
+        # P2 for the first response, P2* once the ECU asked for more time
+        timeout = client.timing.timeout(sid)
+        try:
+            while True:
+                response = yield RECEIVE, timeout
+                current_time = time.perf_counter() - before_send_time
+                if pending_time is not None:
+                    client.timing.record_pending(sid, current_time - pending_time)
+                if not is_response_pending(response):
+                    client.last_resp_time = current_time
+                    break
+                if previous_time is None:
+                    client.last_pending_resp_times.append(current_time)
+                    previous_time = current_time
+                else:
+                    client.last_pending_resp_times.append(current_time - previous_time)
+                pending_time = current_time
+                timeout = client.timing.timeout(sid, pending=True)
+        except TimeoutError:
+            client.metrics.record(
+                msg,
+                None,
+                transmit_time,
+                pending=len(client.last_pending_resp_times),
+                frames=frames_since(client.tp, frames),
+                timeout=True,
+            )
+            raise
+        client.timing.update(response)
+        if client.did_cache is not None:
+            client.did_cache.observe(msg, response)
+    else:
+        # e.g. suppressed positive response, the request is assumed to succeed
+        _observe_request(client, msg)
+
+    pending = len(client.last_pending_resp_times)
+    client.metrics.record(msg, response, transmit_time, client.last_resp_time, pending, frames_since(client.tp, frames))
+    return response
+
+
+def functional_exchange_steps(client, msg: Sequence[int], responseRequired: bool, tpWaitTime: float) -> Steps:
+    """Send a functional request and receive the final response of every
+    ECU answering it, as a sequence of I/O steps.
+
+    Responses are accepted during P2 or until every functional responder
+    answered, and for P2* for as long as some ECU keeps answering with
+    response pending.
+
+    :param client: Uds or AsyncUds instance sending the request
+    :param msg: the request, it has to fit in a single frame
+    :param responseRequired: False to only send the request
+    :param tpWaitTime: given to the transport protocol's send
+    :return: a generator of the steps to perform, returning the final
+        response per response ID
+    :raises NotImplementedError: if a response is required and the
+        transport protocol cannot collect the responses of several ECUs,
+        before anything is sent
+    """
+    if responseRequired and not hasattr(client.tp, "recv_functional"):
+        raise NotImplementedError(
+            f"{type(client.tp).__name__} does not collect the responses to functional requests, "
+            "send them with responseRequired=False"
+        )
+    return _functional_exchange_steps(client, msg, responseRequired, tpWaitTime)
+
+
+def _functional_exchange_steps(client, msg: Sequence[int], responseRequired: bool, tpWaitTime: float) -> Steps:
+    yield SEND, (msg, True, tpWaitTime)
+    # the responses come from several ECUs, the request is assumed to succeed
+    _observe_request(client, msg)
+
+    responses: Dict[int, List[int]] = {}
+    if responseRequired:
+        # first wait for all the configured responders, then for the ones which asked for more time
+        waitingFor: Optional[List[int]] = None
+        timeout = client.timing.timeout(msg[0])
+        while True:
+            received = yield RECEIVE_FUNCTIONAL, (timeout, waitingFor)
+            for resId, messages in received.items():
+                responses[resId] = messages[-1]
+            waitingFor = [resId for resId, response in responses.items() if is_response_pending(response)]
+            timeout = client.timing.timeout(msg[0], pending=True)
+            if not received or not waitingFor:
+                break
+    return responses
+
+
+def _observe_request(client, msg: Sequence[int]) -> None:
+    """Follow the session and DID changes of a request whose response is
+    not awaited.
+    """
+    client.timing.update_request(msg)
+    if client.did_cache is not None:
+        client.did_cache.observe_request(msg)
@@ -0,0 +1,183 @@
+import asyncio
+import contextlib
+import inspect
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Hashable, Iterable, Iterator, List, Mapping, NamedTuple, Optional
+
+
+class EcuJob(NamedTuple):
+    """Call of a service of an ECU, e.g.
+    ``EcuJob("BCM", "readDataByIdentifier", ("ECU Serial Number",))``.
+    """
+
+    #: key of the Uds or AsyncUds instance of the ECU
+    ecu: Hashable
+    #: name of the method to call, an ODX service or send
+    service: str
+    args: tuple = ()
+    kwargs: Optional[dict] = None
+
+
+class JobResult(NamedTuple):
+    """Outcome of an :class:`EcuJob`."""
+
+    job: EcuJob
+    #: what the service returned
+    result: Any = None
+    #: exception raised by the service, None if it succeeded
+    error: Optional[BaseException] = None
+    #: time taken by the service, in seconds
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _bus_of(uds) -> Hashable:
+    # ECUs sharing a connector are on the same bus, the connection being
+    # the CAN connector or the DoIP connection to the gateway
+    connection = getattr(uds.tp, "connection", None)
+    return uds if connection is None else id(connection)
+
+
+class UdsExecutor:
+    """Run the services of several ECUs concurrently, each one having its
+    own Uds (or AsyncUds) instance.
+
+    The jobs of an ECU are run one after the other, in the given order,
+    while the ECUs are served in parallel, by a thread pool with
+    :meth:`run` or by the running event loop with :meth:`run_async`. A
+    Uds instance's ``sendLock`` is held for the whole service, so that
+    its tester present does not slip a request in between. At most
+    ``max_per_bus`` ECUs of the same bus have a service running at the
+    same time, the ECUs sharing a connector being on the same bus unless
+    ``buses`` tells otherwise.
+
+    The results are yielded as the services complete, an exception
+    raised by a service being returned in its :class:`JobResult`.
+
+    :param ecus: ECU key -> its Uds or AsyncUds instance
+    :param max_workers: maximum number of threads of :meth:`run`, one
+        per ECU by default
+    :param max_per_bus: maximum number of ECUs of a bus served at the
+        same time, 0 for no limit
+    :param buses: ECU key -> bus key, overriding the shared connectors
+    """
+
+    def __init__(
+        self,
+        ecus: Mapping[Hashable, Any],
+        max_workers: Optional[int] = None,
+        max_per_bus: int = 0,
+        buses: Optional[Mapping[Hashable, Hashable]] = None,
+    ) -> None:
+        self.ecus = dict(ecus)
+        self.max_workers = max_workers
+        self.max_per_bus = max_per_bus
+        buses = buses or {}
+        self.buses = {ecu: buses[ecu] if ecu in buses else _bus_of(uds) for ecu, uds in self.ecus.items()}
+
+    def _group(self, jobs: Iterable) -> Dict[Hashable, List[EcuJob]]:
+        grouped: Dict[Hashable, List[EcuJob]] = {}
+        for job in jobs:
+            job = EcuJob(*job)
+            if job.ecu not in self.ecus:
+                raise KeyError(f"no Uds instance for ECU {job.ecu!r}")
+            grouped.setdefault(job.ecu, []).append(job)
+        return grouped
+
+    @staticmethod
+    def _call(uds, job: EcuJob) -> JobResult:
+        start = time.perf_counter()
+        try:
+            # held by Uds.send too, for each request of the service
+            lock = getattr(uds, "sendLock", None)
+            with lock if lock is not None else contextlib.nullcontext():
+                result = getattr(uds, job.service)(*job.args, **(job.kwargs or {}))
+        except Exception as error:
+            return JobResult(job, error=error, duration=time.perf_counter() - start)
+        return JobResult(job, result, duration=time.perf_counter() - start)
+
+    def run(self, jobs: Iterable) -> Iterator[JobResult]:
+        """Run the jobs on a thread pool.
+
+        :param jobs: :class:`EcuJob` or (ecu, service, args) tuples
+        :return: the results, in the order the jobs complete
+        :raises KeyError: if a job names an unknown ECU
+        """
+        grouped = self._group(jobs)
+        if not grouped:
+            return
+        results: "queue.SimpleQueue[JobResult]" = queue.SimpleQueue()
+        # the jobs not started yet are dropped once the results are not consumed anymore
+        stop = threading.Event()
+        semaphores = {}
+        if self.max_per_bus:
+            semaphores = {bus: threading.Semaphore(self.max_per_bus) for bus in set(self.buses.values())}
+
+        def run_ecu(ecu: Hashable, ecu_jobs: List[EcuJob]) -> None:
+            uds = self.ecus[ecu]
+            semaphore = semaphores.get(self.buses[ecu])
+            for job in ecu_jobs:
+                if stop.is_set():
+                    return
+                with semaphore if semaphore is not None else contextlib.nullcontext():
+                    result = self._call(uds, job)
+                results.put(result)
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers or len(grouped), thread_name_prefix="UdsExecutor")
+        try:
+            for ecu, ecu_jobs in grouped.items():
+                pool.submit(run_ecu, ecu, ecu_jobs)
+            for _ in range(sum(len(ecu_jobs) for ecu_jobs in grouped.values())):
+                yield results.get()
+        finally:
+            stop.set()
+            pool.shutdown(wait=True)
+
+    async def run_async(self, jobs: Iterable) -> AsyncIterator[JobResult]:
+        """Run the jobs on the running event loop, the services of the
+        AsyncUds instances being awaited and the ones of the Uds instances
+        run in the loop's default executor.
+
+        :param jobs: :class:`EcuJob` or (ecu, service, args) tuples
+        :return: the results, in the order the jobs complete
+        :raises KeyError: if a job names an unknown ECU
+        """
+        grouped = self._group(jobs)
+        loop = asyncio.get_running_loop()
+        results: "asyncio.Queue[JobResult]" = asyncio.Queue()
+        semaphores = {}
+        if self.max_per_bus:
+            semaphores = {bus: asyncio.Semaphore(self.max_per_bus) for bus in set(self.buses.values())}
+
+        async def call(uds, job: EcuJob) -> JobResult:
+            service = getattr(uds, job.service, None)
+            if not inspect.iscoroutinefunction(service):
+                return await loop.run_in_executor(None, self._call, uds, job)
+            start = time.perf_counter()
+            try:
+                result = await service(*job.args, **(job.kwargs or {}))
+            except Exception as error:
+                return JobResult(job, error=error, duration=time.perf_counter() - start)
+            return JobResult(job, result, duration=time.perf_counter() - start)
+
+        async def run_ecu(ecu: Hashable, ecu_jobs: List[EcuJob]) -> None:
+            uds = self.ecus[ecu]
+            semaphore = semaphores.get(self.buses[ecu])
+            for job in ecu_jobs:
+                async with semaphore if semaphore is not None else contextlib.AsyncExitStack():
+                    result = await call(uds, job)
+                results.put_nowait(result)
+
+        tasks = [asyncio.ensure_future(run_ecu(ecu, ecu_jobs)) for ecu, ecu_jobs in grouped.items()]
+        try:
+            for _ in range(sum(len(ecu_jobs) for ecu_jobs in grouped.values())):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,278 @@
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from uds.uds_communications.Utilities.Histogram import LatencyHistogram
+
+#: services whose second byte is a sub-function, the suppress positive response bit being ignored
+SUB_FUNCTION_SERVICES = frozenset({0x10, 0x11, 0x19, 0x27, 0x28, 0x29, 0x2C, 0x31, 0x3E, 0x83, 0x85, 0x86, 0x87})
+#: services followed by a 2 bytes data identifier
+DATA_IDENTIFIER_SERVICES = frozenset({0x22, 0x24, 0x2E, 0x2F})
+ROUTINE_CONTROL = 0x31
+NEGATIVE_RESPONSE = 0x7F
+
+#: percentiles exported, as Prometheus quantiles
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class ServiceKey(NamedTuple):
+    """Service the metrics of a request are counted for."""
+
+    sid: int
+    sub_function: Optional[int] = None
+    #: data identifier, or routine identifier for RoutineControl
+    did: Optional[int] = None
+
+    @classmethod
+    def of(cls, request: Sequence[int]) -> "ServiceKey":
+        """Key of a request."""
+        sid = request[0]
+        sub_function = did = None
+        if sid in SUB_FUNCTION_SERVICES and len(request) >= 2:
+            sub_function = request[1] & 0x7F
+        if sid == ROUTINE_CONTROL and len(request) >= 4:
+            did = (request[2] << 8) | request[3]
+        elif sid in DATA_IDENTIFIER_SERVICES and len(request) >= 3:
+            did = (request[1] << 8) | request[2]
+        return cls(sid, sub_function, did)
+
+    def labels(self) -> Dict[str, str]:
+        labels = {"sid": f"0x{self.sid:02X}"}
+        if self.sub_function is not None:
+            labels["sub_function"] = f"0x{self.sub_function:02X}"
+        if self.did is not None:
+            labels["did"] = f"0x{self.did:04X}"
+        return labels
+
+
+class ServiceMetrics:
+    """Counters and histograms of the requests of a service."""
+
+    __slots__ = (
+        "latency",
+        "transmit",
+        "requests",
+        "pending",
+        "negative_responses",
+        "timeouts",
+        "request_bytes",
+        "response_bytes",
+        "frames_sent",
+        "frames_received",
+    )
+
+    def __init__(self) -> None:
+        #: time from sending the request to its final response, in seconds
+        self.latency = LatencyHistogram()
+        #: time taken by the transport protocol to send the request, in seconds
+        self.transmit = LatencyHistogram()
+        self.requests = 0
+        #: number of response pending (NRC 0x78) received
+        self.pending = 0
+        #: NRC -> number of final negative responses
+        self.negative_responses: Dict[int, int] = {}
+        #: number of requests left without response
+        self.timeouts = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        #: frames sent and received by the transport protocol, if it counts them
+        self.frames_sent = 0
+        self.frames_received = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "pending": self.pending,
+            "negative_responses": dict(self.negative_responses),
+            "timeouts": self.timeouts,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "frames_sent": self.frames_sent,
+            "frames_received": self.frames_received,
+            "latency": _histogram_snapshot(self.latency),
+            "transmit": _histogram_snapshot(self.transmit),
+        }
+
+
+def _histogram_snapshot(histogram: LatencyHistogram) -> dict:
+    snapshot = {
+        "count": histogram.count,
+        "mean": histogram.mean,
+        "min": histogram.min if histogram.count else 0.0,
+        "max": histogram.max,
+    }
+    for quantile in QUANTILES:
+        snapshot[f"p{quantile * 100:g}"] = histogram.percentile(quantile * 100)
+    return snapshot
+
+
+def frame_counts(tp) -> Optional[Tuple[int, int]]:
+    """Frames sent and received so far by a transport protocol, None if
+    it does not count them.
+    """
+    sent = getattr(tp, "frames_sent", None)
+    if not isinstance(sent, int):
+        return None
+    return sent, tp.frames_received
+
+
+def frames_since(tp, counts: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+    """Frames sent and received by a transport protocol since
+    :func:`frame_counts` returned the given counts.
+    """
+    if counts is None:
+        return None
+    return tp.frames_sent - counts[0], tp.frames_received - counts[1]
+
+
+def default_labels(tp) -> Dict[str, str]:
+    """Labels identifying the ECU a transport protocol talks to: its
+    request ID or DoIP target address.
+    """
+    for attribute in ("reqIdAddress", "targetAddress"):
+        address = getattr(tp, attribute, None)
+        if isinstance(address, int):
+            return {"ecu": f"0x{address:X}"}
+    return {}
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    escaped = (
+        name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _sort_key(item: Tuple[ServiceKey, ServiceMetrics]) -> Tuple[int, int, int]:
+    # no sub-function or identifier first
+    return tuple(-1 if value is None else value for value in item[0])
+
+
+class UdsMetrics:
+    """Metrics of the requests sent by a Uds instance, per service ID,
+    sub-function and data identifier.
+
+    For every service, the latency of the requests and the time taken to
+    send them are counted in :class:`LatencyHistogram`, along with the
+    number of requests, response pending, negative responses per NRC and
+    timeouts, the bytes of the requests and responses and, for the
+    transport protocols counting them, the frames sent and received.
+
+    The metrics are read as a list of dictionaries with
+    :meth:`snapshot`, or in the Prometheus text exposition format with
+    :meth:`prometheus`.
+
+    :param labels: labels added to every Prometheus sample, e.g. the ECU
+    """
+
+    def __init__(self, labels: Optional[Dict[str, str]] = None) -> None:
+        self.labels = dict(labels or {})
+        self.services: Dict[ServiceKey, ServiceMetrics] = {}
+        # the tester present thread sends along with the tests
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        request: Sequence[int],
+        response: Optional[Sequence[int]],
+        transmit_time: float,
+        latency: Optional[float] = None,
+        pending: int = 0,
+        frames: Optional[Tuple[int, int]] = None,
+        timeout: bool = False,
+    ) -> None:
+        """Count a request.
+
+        :param request: the request
+        :param response: its final response, None if none was awaited or
+            received
+        :param transmit_time: time taken to send the request, in seconds
+        :param latency: time from sending the request to its final
+            response, in seconds
+        :param pending: number of response pending received
+        :param frames: frames sent and received for the request
+        :param timeout: True if the response was not received in time
+        """
+        key = ServiceKey.of(request)
+        with self._lock:
+            metrics = self.services.get(key)
+            if metrics is None:
+                metrics = self.services[key] = ServiceMetrics()
+            metrics.requests += 1
+            metrics.request_bytes += len(request)
+            metrics.transmit.record(transmit_time)
+            metrics.pending += pending
+            if frames is not None:
+                metrics.frames_sent += frames[0]
+                metrics.frames_received += frames[1]
+            if timeout:
+                metrics.timeouts += 1
+            if response is not None:
+                metrics.response_bytes += len(response)
+                if latency is not None:
+                    metrics.latency.record(latency)
+                if response[0] == NEGATIVE_RESPONSE and len(response) >= 3:
+                    nrc = response[2]
+                    metrics.negative_responses[nrc] = metrics.negative_responses.get(nrc, 0) + 1
+
+    def snapshot(self) -> List[dict]:
+        """Return the metrics of every service, ordered by service."""
+        with self._lock:
+            return [
+                {**key._asdict(), **metrics.snapshot()}
+                for key, metrics in sorted(self.services.items(), key=_sort_key)
+            ]
+
+    def reset(self) -> None:
+        """Forget all the recorded requests."""
+        with self._lock:
+            self.services.clear()
+
+    def prometheus(self, prefix: str = "uds") -> str:
+        """Render the metrics in the Prometheus text exposition format.
+
+        :param prefix: prefix of the metric names
+        :return: the exposition text
+        """
+        counters = (
+            ("requests_total", "Requests sent.", lambda m: m.requests),
+            ("response_pending_total", "Response pending (NRC 0x78) received.", lambda m: m.pending),
+            ("timeouts_total", "Requests left without response.", lambda m: m.timeouts),
+            ("request_bytes_total", "Bytes of the requests.", lambda m: m.request_bytes),
+            ("response_bytes_total", "Bytes of the final responses.", lambda m: m.response_bytes),
+            ("frames_sent_total", "Frames sent by the transport protocol.", lambda m: m.frames_sent),
+            ("frames_received_total", "Frames received by the transport protocol.", lambda m: m.frames_received),
+        )
+        summaries = (
+            ("request_latency_seconds", "Time from sending a request to its final response.", "latency"),
+            ("transmit_seconds", "Time taken by the transport protocol to send a request.", "transmit"),
+        )
+        with self._lock:
+            services = [({**self.labels, **key.labels()}, metrics) for key, metrics in sorted(self.services.items(), key=_sort_key)]
+
+        lines = []
+        for name, description, value in counters:
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for labels, metrics in services:
+                lines.append(f"{prefix}_{name}{_format_labels(labels)} {value(metrics)}")
+
+        name = f"{prefix}_negative_responses_total"
+        lines.append(f"# HELP {name} Final negative responses, per NRC.")
+        lines.append(f"# TYPE {name} counter")
+        for labels, metrics in services:
+            for nrc, count in sorted(metrics.negative_responses.items()):
+                lines.append(f"{name}{_format_labels({**labels, 'nrc': f'0x{nrc:02X}'})} {count}")
+
+        for name, description, attribute in summaries:
+            name = f"{prefix}_{name}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} summary")
+            for labels, metrics in services:
+                histogram = getattr(metrics, attribute)
+                for quantile in QUANTILES:
+                    quantile_labels = _format_labels({**labels, "quantile": f"{quantile:g}"})
+                    lines.append(f"{name}{quantile_labels} {histogram.percentile(quantile * 100):.6f}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
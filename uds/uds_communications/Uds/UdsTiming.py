@@ -0,0 +1,148 @@
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from uds.config import UdsConfig
+
+logger = logging.getLogger(__name__)
+
+DIAGNOSTIC_SESSION_CONTROL_RESPONSE = 0x50
+ECU_RESET = 0x11
+ECU_RESET_RESPONSE = 0x51
+NEGATIVE_RESPONSE = 0x7F
+RESPONSE_PENDING = 0x78
+
+# resolution of P2Server_max and P2*Server_max in the DiagnosticSessionControl response (ISO 14229-1)
+P2_RESOLUTION = 0.001
+P2_STAR_RESOLUTION = 0.01
+
+
+def is_response_pending(response: Sequence[int]) -> bool:
+    """Tell whether a response is the negative response 0x78
+    (requestCorrectlyReceived-ResponsePending).
+    """
+    return len(response) >= 3 and response[0] == NEGATIVE_RESPONSE and response[2] == RESPONSE_PENDING
+
+
+class UdsTiming:
+    """Client side P2 and P2* timing of the UDS requests.
+
+    The first response to a request is awaited for P2, the responses
+    following a response pending (NRC 0x78) for P2*. Both come from the
+    configuration until the ECU announces its P2Server_max and
+    P2*Server_max in a DiagnosticSessionControl positive response, the
+    margin being added to them for the network delays. An ECUReset
+    positive response, or request whose response is not awaited, brings
+    the ECU back to its default session, and the timing back to the
+    configuration. Timings set per service ID take
+    precedence over both.
+
+    In measurement mode, the time from each response pending to the next
+    response is recorded per service ID, to tune P2* against the actual
+    behaviour of the ECU.
+
+    :param p2: P2 client of the configuration, in seconds
+    :param p2_star: P2* client of the configuration, in seconds
+    :param session_timing: use the timing announced by the ECU
+    :param margin: added to the timing announced by the ECU, in seconds
+    :param service_timing: service ID -> (P2, P2*) in seconds
+    :param measure_pending: record the response pending durations
+    """
+
+    def __init__(
+        self,
+        p2: float,
+        p2_star: float,
+        session_timing: bool = True,
+        margin: float = 0.1,
+        service_timing: Optional[Dict[int, Tuple[float, float]]] = None,
+        measure_pending: bool = False,
+    ) -> None:
+        self.default_p2 = p2
+        self.default_p2_star = p2_star
+        self.session_timing = session_timing
+        self.margin = margin
+        self.service_timing = dict(service_timing or {})
+        self.measure_pending = measure_pending
+        #: P2Server_max and P2*Server_max announced by the ECU, None until then
+        self.server_p2: Optional[float] = None
+        self.server_p2_star: Optional[float] = None
+        #: service ID -> time from each response pending to the next response, in seconds
+        self.pending_durations: Dict[int, List[float]] = {}
+
+    @classmethod
+    def from_config(cls, config: UdsConfig) -> "UdsTiming":
+        return cls(
+            p2=config.p2_can_client,
+            p2_star=config.p2_star_can_client,
+            session_timing=config.session_timing,
+            margin=config.p2_margin,
+            service_timing=config.service_timing,
+            measure_pending=config.measure_pending,
+        )
+
+    @property
+    def p2(self) -> float:
+        """P2 client of the current session, in seconds."""
+        if self.server_p2 is None:
+            return self.default_p2
+        return self.server_p2 + self.margin
+
+    @property
+    def p2_star(self) -> float:
+        """P2* client of the current session, in seconds."""
+        if self.server_p2_star is None:
+            return self.default_p2_star
+        return self.server_p2_star + self.margin
+
+    def timeout(self, sid: int, pending: bool = False) -> float:
+        """Time to wait for the next response to a request.
+
+        :param sid: service ID of the request
+        :param pending: True if the last response was a response pending
+        :return: P2 or P2* in seconds
+        """
+        timing = self.service_timing.get(sid)
+        if timing is not None:
+            return timing[1] if pending else timing[0]
+        return self.p2_star if pending else self.p2
+
+    def update(self, response: Optional[Sequence[int]]) -> None:
+        """Follow the session changes announced by a final response.
+
+        :param response: the final response to a request
+        """
+        if not response or not self.session_timing:
+            return
+        if response[0] == DIAGNOSTIC_SESSION_CONTROL_RESPONSE and len(response) >= 6:
+            self.server_p2 = ((response[2] << 8) | response[3]) * P2_RESOLUTION
+            self.server_p2_star = ((response[4] << 8) | response[5]) * P2_STAR_RESOLUTION
+            logger.debug(
+                f"Session 0x{response[1]:02X}: P2Server_max {self.server_p2 * 1e3:.0f} ms, "
+                f"P2*Server_max {self.server_p2_star * 1e3:.0f} ms"
+            )
+        elif response[0] == ECU_RESET_RESPONSE:
+            self.reset_session()
+
+    def update_request(self, request: Sequence[int]) -> None:
+        """Follow the session changes of a request whose response is not
+        awaited, e.g. with the suppress positive response bit.
+
+        :param request: the request sent
+        """
+        if request and self.session_timing and request[0] == ECU_RESET:
+            self.reset_session()
+
+    def reset_session(self) -> None:
+        """Go back to the timing of the configuration."""
+        self.server_p2 = None
+        self.server_p2_star = None
+
+    def record_pending(self, sid: int, duration: float) -> None:
+        """Record the time from a response pending to the next response,
+        in measurement mode.
+
+        :param sid: service ID of the request
+        :param duration: the time in seconds
+        """
+        if self.measure_pending:
+            self.pending_durations.setdefault(sid, []).append(duration)
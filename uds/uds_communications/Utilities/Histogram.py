@@ -0,0 +1,115 @@
+from typing import Iterator, Tuple
+
+# values are recorded in microseconds, with 64 buckets per power of two above
+# 128 us: the bucket of a value is within 1/64 (1.6 %) of it
+_SUB_BUCKET_BITS = 7
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT >> 1
+_UNIT = 1e-6
+
+
+def _bucket_index(value: int) -> int:
+    if value < _SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - _SUB_BUCKET_BITS
+    return _SUB_BUCKET_COUNT + (shift - 1) * _SUB_BUCKET_HALF + (value >> shift) - _SUB_BUCKET_HALF
+
+
+def _bucket_bounds(index: int) -> Tuple[int, int]:
+    """Lowest and highest value of a bucket, in microseconds."""
+    if index < _SUB_BUCKET_COUNT:
+        return index, index
+    shift = (index - _SUB_BUCKET_COUNT) // _SUB_BUCKET_HALF + 1
+    sub_bucket = (index - _SUB_BUCKET_COUNT) % _SUB_BUCKET_HALF + _SUB_BUCKET_HALF
+    return sub_bucket << shift, ((sub_bucket + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Histogram of durations with a constant relative precision, in the
+    manner of HdrHistogram.
+
+    Durations are counted in microsecond buckets, exact up to 128 us and
+    then 64 buckets per power of two, so that any percentile is known
+    within 1.6 % whatever the spread of the durations, from microseconds
+    up to ``max_value`` seconds. The buckets are allocated once, recording
+    a duration is an index computation and an increment.
+
+    :param max_value: longest duration tracked in seconds, longer ones
+        are counted as this value
+    """
+
+    __slots__ = ("_counts", "_max_index", "count", "total", "min", "max")
+
+    def __init__(self, max_value: float = 3600.0) -> None:
+        self._max_index = _bucket_index(int(max_value / _UNIT))
+        self._counts = [0] * (self._max_index + 1)
+        #: number of recorded durations
+        self.count = 0
+        #: sum of the recorded durations, in seconds
+        self.total = 0.0
+        #: shortest and longest recorded durations, in seconds
+        self.min = float("inf")
+        self.max = 0.0
+
+    def record(self, duration: float) -> None:
+        """Count a duration.
+
+        :param duration: the duration in seconds
+        """
+        index = _bucket_index(max(int(duration / _UNIT), 0))
+        self._counts[min(index, self._max_index)] += 1
+        self.count += 1
+        self.total += duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Duration below which the given percentage of the recorded
+        durations are.
+
+        :param percent: the percentage, between 0 and 100
+        :return: the highest value of the bucket holding the percentile,
+            bounded by the longest duration, in seconds, 0 if nothing was
+            recorded
+        """
+        if not self.count:
+            return 0.0
+        rank = max(int(percent / 100 * self.count + 0.5), 1)
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_bounds(index)[1] * _UNIT, self.max)
+        return self.max
+
+    def buckets(self) -> Iterator[Tuple[float, int]]:
+        """Iterate over the non empty buckets.
+
+        :return: the highest value of each bucket in seconds and its count
+        """
+        for index, count in enumerate(self._counts):
+            if count:
+                yield _bucket_bounds(index)[1] * _UNIT, count
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add the durations of another histogram to this one."""
+        for index, count in enumerate(other._counts):
+            if count:
+                self._counts[min(index, self._max_index)] += count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def reset(self) -> None:
+        self._counts[:] = [0] * len(self._counts)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
@@ -0,0 +1,117 @@
+import asyncio
+import math
+import sys
+import time
+from dataclasses import dataclass
+from time import perf_counter
+
+#: remaining time under which the scheduler stops sleeping and spins, the
+#: resolution of time.sleep being much coarser on Windows
+DEFAULT_SPIN_THRESHOLD = 0.002 if sys.platform == "win32" else 0.0002
+
+
+@dataclass
+class PacingStatistics:
+    """Measured deviation of the actual intervals from the requested one,
+    all values are in seconds.
+    """
+
+    samples: int
+    mean: float
+    minimum: float
+    maximum: float
+    stdev: float
+
+
+class PacingScheduler:
+    """Space out events by a minimum interval, e.g. the STmin between two
+    consecutive frames.
+
+    Instead of polling a timer in a tight loop, the scheduler sleeps for
+    most of the interval and only spins, yielding the GIL, for the last
+    ``spin_threshold`` seconds. This keeps a good precision for sub
+    millisecond intervals without pinning a core for the whole transfer.
+    """
+
+    def __init__(self, interval: float = 0.0, spin_threshold: float = DEFAULT_SPIN_THRESHOLD) -> None:
+        """Create the scheduler.
+
+        :param interval: minimum time between two events in seconds
+        :param spin_threshold: remaining time under which the scheduler
+            spins instead of sleeping
+        """
+        self.interval = interval
+        self.spin_threshold = spin_threshold
+        self._last_event = None
+        self._deadline = 0.0
+        self.reset_statistics()
+
+    def start(self) -> None:
+        """Start a new sequence of events, the first event will occur one
+        interval from now.
+        """
+        self._last_event = perf_counter()
+        self._deadline = self._last_event + self.interval
+
+    def wait(self) -> None:
+        """Block until the interval since the previous event has elapsed,
+        and record the time of the event.
+        """
+        remaining = self._deadline - perf_counter()
+        if remaining > self.spin_threshold:
+            time.sleep(remaining - self.spin_threshold)
+        now = perf_counter()
+        while now < self._deadline:
+            # yield the GIL to the other channels while spinning
+            time.sleep(0)
+            now = perf_counter()
+        self._record(now)
+
+    async def wait_async(self) -> None:
+        """Same as :meth:`wait`, but lets the event loop run the other
+        tasks instead of blocking the thread.
+        """
+        remaining = self._deadline - perf_counter()
+        if remaining > self.spin_threshold:
+            await asyncio.sleep(remaining - self.spin_threshold)
+        now = perf_counter()
+        while now < self._deadline:
+            await asyncio.sleep(0)
+            now = perf_counter()
+        self._record(now)
+
+    def _record(self, now: float) -> None:
+        if self._last_event is not None:
+            jitter = now - self._last_event - self.interval
+            # Welford's online algorithm, avoids keeping all the samples
+            self._samples += 1
+            delta = jitter - self._mean
+            self._mean += delta / self._samples
+            self._m2 += delta * (jitter - self._mean)
+            self._minimum = min(self._minimum, jitter)
+            self._maximum = max(self._maximum, jitter)
+        self._last_event = now
+        self._deadline = now + self.interval
+
+    def reset_statistics(self) -> None:
+        """Forget all the jitter measured so far."""
+        self._samples = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._minimum = math.inf
+        self._maximum = -math.inf
+
+    def statistics(self) -> PacingStatistics:
+        """Return the jitter measured since the last reset.
+
+        :return: the inter-event jitter statistics
+        """
+        if self._samples == 0:
+            return PacingStatistics(0, 0.0, 0.0, 0.0, 0.0)
+        return PacingStatistics(
+            samples=self._samples,
+            mean=self._mean,
+            minimum=self._minimum,
+            maximum=self._maximum,
+            stdev=math.sqrt(self._m2 / self._samples),
+        )
@@ -0,0 +1,263 @@
+import asyncio
+import threading
+from collections import deque
+from time import perf_counter
+from typing import Any, Optional, Tuple
+
+
+class FrameRingBuffer:
+    """Bounded single producer, single consumer buffer for received frames.
+
+    The producer (e.g. the python-can notifier thread) only moves the tail
+    and the consumer only moves the head, so that no lock is taken on the
+    hot path. The producer only signals the consumer when the latter is
+    actually waiting for data.
+
+    Frames received while the buffer is full are dropped and counted.
+    """
+
+    def __init__(self, capacity: int = 4096) -> None:
+        """Create the buffer.
+
+        :param capacity: minimum number of frames the buffer can hold,
+            rounded up to the next power of two
+        """
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self._mask = size - 1
+        self._frames = [None] * size
+        self._timestamps = [0.0] * size
+        # monotonic counters, the slot index is the counter masked by the size
+        self._head = 0
+        self._tail = 0
+        self._data_available = threading.Event()
+        self._consumer_waiting = False
+        self._overrun = False
+        #: number of frames discarded because the buffer was full
+        self.dropped = 0
+        #: number of times the buffer ran full
+        self.overruns = 0
+        #: maximum number of frames buffered at once
+        self.high_watermark = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._mask + 1
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    def put(self, frame: Any, timestamp: float = 0.0) -> bool:
+        """Store a frame, to be called by the producer only.
+
+        :param frame: the received frame
+        :param timestamp: reception time of the frame
+        :return: False if the frame was dropped because the buffer is full
+        """
+        tail = self._tail
+        fill_level = tail - self._head
+        if fill_level > self._mask:
+            self.dropped += 1
+            if not self._overrun:
+                self._overrun = True
+                self.overruns += 1
+            return False
+        self._overrun = False
+        index = tail & self._mask
+        self._frames[index] = frame
+        self._timestamps[index] = timestamp
+        self._tail = tail + 1
+        if fill_level >= self.high_watermark:
+            self.high_watermark = fill_level + 1
+        if self._consumer_waiting:
+            self._data_available.set()
+        return True
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Take the oldest frame, to be called by the consumer only.
+
+        :param timeout: time to wait for a frame in seconds, wait forever
+            if None
+        :return: the frame, or None if no frame arrived in time
+        """
+        return self.get_with_timestamp(timeout)[0]
+
+    def get_with_timestamp(self, timeout: Optional[float] = None) -> Tuple[Any, Optional[float]]:
+        """Take the oldest frame along with its reception time.
+
+        :param timeout: time to wait for a frame in seconds, wait forever
+            if None
+        :return: the frame and its timestamp, or (None, None) if no frame
+            arrived in time
+        """
+        deadline = None if timeout is None else perf_counter() + timeout
+        return self.get_until(deadline)
+
+    def get_until(self, deadline: Optional[float]) -> Tuple[Any, Optional[float]]:
+        """Take the oldest frame along with its reception time, waiting
+        at most until the given deadline.
+
+        :param deadline: time.perf_counter() value after which to give up,
+            wait forever if None
+        :return: the frame and its timestamp, or (None, None) if no frame
+            arrived in time
+        """
+        head = self._head
+        if head == self._tail and not self._wait_until(deadline):
+            return None, None
+        index = head & self._mask
+        frame = self._frames[index]
+        timestamp = self._timestamps[index]
+        # release the reference to the frame
+        self._frames[index] = None
+        self._head = head + 1
+        return frame, timestamp
+
+    def _wait_until(self, deadline: Optional[float]) -> bool:
+        self._consumer_waiting = True
+        try:
+            while self._head == self._tail:
+                self._data_available.clear()
+                # the producer may have stored a frame before seeing the consumer waiting
+                if self._head != self._tail:
+                    break
+                if deadline is None:
+                    self._data_available.wait()
+                    continue
+                remaining = deadline - perf_counter()
+                if remaining <= 0:
+                    return False
+                self._data_available.wait(remaining)
+        finally:
+            self._consumer_waiting = False
+        return True
+
+    def clear(self) -> None:
+        """Discard all the buffered frames, to be called by the consumer only."""
+        tail = self._tail
+        for counter in range(self._head, tail):
+            self._frames[counter & self._mask] = None
+        self._head = tail
+
+    def reset_statistics(self) -> None:
+        """Reset the dropped frames, overruns and high watermark counters."""
+        self.dropped = 0
+        self.overruns = 0
+        self.high_watermark = 0
+
+
+class AsyncFrameBuffer:
+    """Bounded buffer for received frames consumed by an asyncio task.
+
+    Frames can be stored from any thread, the python-can notifier either
+    calls the listeners from the event loop (buses with a file
+    descriptor) or from its own thread. The event loop is only woken up
+    when the consumer is actually waiting for data.
+
+    Frames received while the buffer is full are dropped and counted.
+    """
+
+    def __init__(self, capacity: int = 4096) -> None:
+        """Create the buffer.
+
+        :param capacity: maximum number of frames the buffer can hold
+        """
+        self._capacity = capacity
+        # deque appends and pops are atomic, no lock is needed between the producer and the loop
+        self._frames = deque()
+        self._loop = None
+        self._loop_thread = None
+        self._waiter = None
+        self._overrun = False
+        #: number of frames discarded because the buffer was full
+        self.dropped = 0
+        #: number of times the buffer ran full
+        self.overruns = 0
+        #: maximum number of frames buffered at once
+        self.high_watermark = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def put(self, frame: Any, timestamp: float = 0.0) -> bool:
+        """Store a frame, may be called from any thread.
+
+        :param frame: the received frame
+        :param timestamp: reception time of the frame
+        :return: False if the frame was dropped because the buffer is full
+        """
+        fill_level = len(self._frames)
+        if fill_level >= self._capacity:
+            self.dropped += 1
+            if not self._overrun:
+                self._overrun = True
+                self.overruns += 1
+            return False
+        self._overrun = False
+        self._frames.append((frame, timestamp))
+        if fill_level >= self.high_watermark:
+            self.high_watermark = fill_level + 1
+        if self._waiter is not None:
+            if threading.get_ident() == self._loop_thread:
+                self._wake_up()
+            else:
+                self._loop.call_soon_threadsafe(self._wake_up)
+        return True
+
+    def _wake_up(self) -> None:
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Any:
+        """Take the oldest frame, to be awaited from the consumer task only.
+
+        :param timeout: time to wait for a frame in seconds, wait forever
+            if None
+        :return: the frame, or None if no frame arrived in time
+        """
+        return (await self.get_with_timestamp(timeout))[0]
+
+    async def get_with_timestamp(self, timeout: Optional[float] = None) -> Tuple[Any, Optional[float]]:
+        """Take the oldest frame along with its reception time.
+
+        :param timeout: time to wait for a frame in seconds, wait forever
+            if None
+        :return: the frame and its timestamp, or (None, None) if no frame
+            arrived in time
+        """
+        if not self._frames:
+            if self._loop is None:
+                self._loop = asyncio.get_running_loop()
+                self._loop_thread = threading.get_ident()
+            deadline = None if timeout is None else perf_counter() + timeout
+            # a late wake up meant for a previous call may end the wait early, hence the loop
+            while not self._frames:
+                remaining = None if deadline is None else deadline - perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return None, None
+                self._waiter = self._loop.create_future()
+                try:
+                    # the producer may have stored a frame before seeing the consumer waiting
+                    if not self._frames:
+                        await asyncio.wait_for(self._waiter, remaining)
+                except asyncio.TimeoutError:
+                    return None, None
+                finally:
+                    self._waiter = None
+        return self._frames.popleft()
+
+    def clear(self) -> None:
+        """Discard all the buffered frames."""
+        self._frames.clear()
+
+    def reset_statistics(self) -> None:
+        """Reset the dropped frames, overruns and high watermark counters."""
+        self.dropped = 0
+        self.overruns = 0
+        self.high_watermark = 0
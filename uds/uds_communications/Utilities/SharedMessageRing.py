@@ -0,0 +1,145 @@
+import multiprocessing
+import struct
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+from typing import Optional, Tuple, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# write and read counters at the beginning of the shared memory, each one moved by one side only
+_COUNTERS = struct.Struct("=QQ")
+# header of every record: length of the message and kind of record
+_RECORD = struct.Struct("=IB")
+
+
+class SharedMessageRing:
+    """Bounded single producer, single consumer ring of variable length
+    messages in shared memory, passing whole messages between two
+    processes.
+
+    The messages are copied once into the ring by the producer and once
+    out of it by the consumer, without pickling. The producer only moves
+    the write counter and the consumer only moves the read counter, the
+    two semaphores are only used to wake up a waiting side.
+
+    The ring is created by one process and handed over to the other one
+    as an argument of ``multiprocessing.Process``, the creator unlinks
+    the shared memory when closing it.
+    """
+
+    def __init__(self, capacity: int = 1 << 20, context=None) -> None:
+        """Create the ring.
+
+        :param capacity: size of the ring in bytes, each message taking
+            its length plus 5 bytes
+        :param context: multiprocessing context the processes are
+            started with, the default one if None
+        """
+        context = multiprocessing.get_context() if context is None else context
+        self._capacity = capacity
+        self._shm = SharedMemory(create=True, size=_COUNTERS.size + capacity)
+        _COUNTERS.pack_into(self._shm.buf, 0, 0, 0)
+        self._owner = True
+        # number of records written and not yet waited for by the consumer
+        self._written = context.Semaphore(0)
+        # released by the consumer after every read, for a producer waiting for space
+        self._freed = context.Semaphore(0)
+        self._write_counter = 0
+        self._read_counter = 0
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_shm"] = self._shm.name
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._shm = SharedMemory(name=state["_shm"])
+        self._owner = False
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self._shm.name
+
+    def _counters(self) -> Tuple[int, int]:
+        return _COUNTERS.unpack_from(self._shm.buf, 0)
+
+    def _copy_in(self, position: int, data: BytesLike) -> None:
+        buf = self._shm.buf
+        start = _COUNTERS.size + position % self._capacity
+        first = min(len(data), _COUNTERS.size + self._capacity - start)
+        buf[start : start + first] = data[:first]
+        if first < len(data):
+            buf[_COUNTERS.size : _COUNTERS.size + len(data) - first] = data[first:]
+
+    def _copy_out(self, position: int, destination: memoryview) -> None:
+        buf = self._shm.buf
+        start = _COUNTERS.size + position % self._capacity
+        first = min(len(destination), _COUNTERS.size + self._capacity - start)
+        destination[:first] = buf[start : start + first]
+        if first < len(destination):
+            destination[first:] = buf[_COUNTERS.size : _COUNTERS.size + len(destination) - first]
+
+    def put(self, message: BytesLike, kind: int = 0, timeout: Optional[float] = None) -> None:
+        """Store a message, to be called by the producer only.
+
+        :param message: the message to store
+        :param kind: kind of record, between 0 and 255, given back along
+            with the message
+        :param timeout: time to wait for enough free space in seconds,
+            wait forever if None
+
+        :raises ValueError: if the message can never fit in the ring
+        :raises TimeoutError: if not enough space was freed in time
+        """
+        message = memoryview(message).cast("B")
+        size = _RECORD.size + len(message)
+        if size > self._capacity:
+            raise ValueError(f"Message of {len(message)} bytes too large for a ring of {self._capacity} bytes")
+
+        deadline = None if timeout is None else perf_counter() + timeout
+        while self._write_counter + size - self._counters()[1] > self._capacity:
+            remaining = None if deadline is None else deadline - perf_counter()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError(f"No space freed for a message of {len(message)} bytes within {timeout} s")
+            self._freed.acquire(timeout=remaining)
+
+        position = self._write_counter
+        self._copy_in(position, _RECORD.pack(len(message), kind))
+        self._copy_in(position + _RECORD.size, message)
+        self._write_counter = position + size
+        # the counter is published after the record, so that the consumer never sees a partial one
+        struct.pack_into("=Q", self._shm.buf, 0, self._write_counter)
+        self._written.release()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[int, bytearray]]:
+        """Take the oldest message, to be called by the consumer only.
+
+        :param timeout: time to wait for a message in seconds, wait
+            forever if None
+        :return: the kind of record and the message, or None if nothing
+            arrived in time
+        """
+        if not self._written.acquire(timeout=timeout):
+            return None
+        header = bytearray(_RECORD.size)
+        self._copy_out(self._read_counter, memoryview(header))
+        length, kind = _RECORD.unpack(header)
+        message = bytearray(length)
+        self._copy_out(self._read_counter + _RECORD.size, memoryview(message))
+        self._read_counter += _RECORD.size + length
+        struct.pack_into("=Q", self._shm.buf, _COUNTERS.size // 2, self._read_counter)
+        self._freed.release()
+        return kind, message
+
+    def close(self) -> None:
+        """Detach from the shared memory, the creator also unlinks it."""
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+            self._owner = False
@@ -11,12 +11,16 @@ __email__ = "richard.clubb@embeduk.com"
 __status__ = "Development"
 
 
+import threading
 from types import MethodType
 from typing import List
 
 from uds.uds_config_tool.odx.pos_response import PosResponse
 from uds.uds_config_tool.SupportedServices.iContainer import iContainer
 
+# incorrectMessageLengthOrInvalidFormat and responseTooLong, a request with fewer DIDs may pass
+SPLIT_NRCS = (0x13, 0x14)
+
 
 class ReadDataByIdentifierContainer(object):
 
@@ -35,6 +39,12 @@ class ReadDataByIdentifierContainer(object):
 
         self.negativeResponseFunctions = {}
 
+        # semantic of the DIAG-SERVICE of each DID, e.g. IDENTIFICATION
+        self.semantics = {}
+
+        # the PosResponses hold the parsed data until decoded, and the container is shared by all Uds instances
+        self.parseLock = threading.Lock()
+
     ##
     # @brief this method is bound to an external Uds object so that it call be called
     # as one of the in-built methods. uds.readDataByIdentifier("something") It does not operate
@@ -46,23 +56,128 @@ class ReadDataByIdentifierContainer(object):
         if type(dids) is not list:
             dids = [dids]
 
+        container = target.readDataByIdentifierContainer
+        results = container.lookup(target, dids)
+        missing = [did for did in dids if did not in results]
+
+        if missing:
+            response = container.read(target, missing)
+            if type(response) is not tuple:
+                # negative response
+                return response
+            results.update(zip(missing, response))
+            container.store(target, missing, response)
+
+        return_value = tuple(results[did] for did in dids)
+
+        if len(return_value) == 1:
+            return_value = return_value[
+                0
+            ]  # only send back a tuple if there were multiple DIDs
+        return return_value
+
+    ##
+    # @brief this method is bound to an external Uds object as uds.readDataByIdentifierBatch([...]). The DIDs are
+    # packed into as few requests as max_dids and max_response_length allow, using the response lengths known
+    # from the ODX, a request rejected with NRC 0x13 or 0x14 being split in two and sent again.
+    # @return a dictionary with the decoded response, or the negative response details, of each DID
+    @staticmethod
+    def __readDataByIdentifierBatch(target, parameter, max_dids=None, max_response_length=None):
+
+        if max_dids is None:
+            max_dids = getattr(target, "rdbi_max_dids", 0)
+        if max_response_length is None:
+            max_response_length = getattr(target, "rdbi_max_response_length", 0)
+
+        container = target.readDataByIdentifierContainer
+        dids = list(dict.fromkeys(parameter))  # ... each DID is read once
+        results = container.lookup(target, dids)
+        missing = [did for did in dids if did not in results]
+
+        pending = container.pack(missing, max_dids, max_response_length)
+        while pending:
+            request_dids = pending.pop(0)
+            response = container.read(target, request_dids)
+            if type(response) is tuple:
+                results.update(zip(request_dids, response))
+                container.store(target, request_dids, response)
+            elif response.get("NRC") in SPLIT_NRCS and len(request_dids) > 1:
+                # ... the ECU could not handle that many DIDs at once
+                half = len(request_dids) // 2
+                pending[:0] = [request_dids[:half], request_dids[half:]]
+            else:
+                for did in request_dids:
+                    results[did] = dict(response)
+
+        return {did: results[did] for did in dids}
+
+    ##
+    # @brief group DIDs into requests, the DIDs with the longest responses first, each one going in the first request
+    # it fits in (first fit decreasing). The DIDs whose response length is not bounded are read on their own.
+    # @param max_dids maximum number of DIDs per request, 0 for no limit
+    # @param max_response_length maximum length of a response, SID included, 0 for no limit
+    # @return the DIDs of each request
+    def pack(self, dids, max_dids=0, max_response_length=0):
+        lengths = {did: self.pos_response_objects[did].calculate_max_length() for did in dids}
+        unbounded = [[did] for did in dids if lengths[did] is None]
+        requests = []
+        for did in sorted(
+            (did for did in dids if lengths[did] is not None),
+            key=lengths.get,
+            reverse=True,
+        ):
+            for request in requests:
+                if max_dids and len(request[0]) >= max_dids:
+                    continue
+                if max_response_length and request[1] + lengths[did] > max_response_length:
+                    continue
+                request[0].append(did)
+                request[1] += lengths[did]
+                break
+            else:
+                sid_length = self.pos_response_objects[did].sid_length
+                requests.append([[did], sid_length + lengths[did]])
+        return [request_dids for request_dids, _ in requests] + unbounded
+
+    ##
+    # @brief look the given DIDs up in the target's DID cache, if it has one
+    # @return DID -> cached decoded response
+    def lookup(self, target, dids):
+        # opt-in cache of the decoded responses, per DID
+        cache = getattr(target, "did_cache", None)
+        results = {}
+        if cache is not None:
+            for did in dids:
+                value = cache.get(self.identifier(did), self.semantics.get(did))
+                if value is not None:
+                    results[did] = value
+        return results
+
+    ##
+    # @brief store the decoded responses of the given DIDs in the target's DID cache, if it has one
+    def store(self, target, dids, values):
+        cache = getattr(target, "did_cache", None)
+        if cache is not None:
+            for did, value in zip(dids, values):
+                cache.put(self.identifier(did), value, self.semantics.get(did))
+
+    ##
+    # @brief send a single request reading the given DIDs
+    # @return a tuple of the decoded responses, one per DID, or the negative response details
+    def read(self, target, dids):
         # Adding acceptance of lists at this point, as the spec allows for multiple rdbi request to be concatenated ...
-        requestSIDFunction = target.readDataByIdentifierContainer.requestSIDFunctions[
+        requestSIDFunction = self.requestSIDFunctions[
             dids[0]
         ]  # ... the SID should be the same for all DIDs, so just use the first
-        requestDIDFunctions = [
-            target.readDataByIdentifierContainer.requestDIDFunctions[did]
-            for did in dids
-        ]
+        requestDIDFunctions = [self.requestDIDFunctions[did] for did in dids]
         expected_response_objects: List[PosResponse] = [
-            target.readDataByIdentifierContainer.pos_response_objects[did]
-            for did in dids
+            self.pos_response_objects[did] for did in dids
         ]
 
         # This is the same for all RDBI responses, irrespective of list or single input
-        negativeResponseFunction = (
-            target.readDataByIdentifierContainer.negativeResponseFunctions[dids[0]]
-        )  # ... single code irrespective of list use, so just use the first
+        negativeResponseFunction = self.negativeResponseFunctions[
+            dids[0]
+        ]  # ... single code irrespective of list use, so just use the first
 
         # Call the sequence of functions to execute the RDBI request/response action ...
         # ==============================================================================
@@ -89,28 +204,31 @@ class ReadDataByIdentifierContainer(object):
         sid_length = expected_response_objects[0].sid_length
         # remove SID from response for further parsing the response per DID/ PosResponse
         response_remaining = response[sid_length:]
-        # parse each expected DID response of the response and store its part of the data
-        for positive_response in expected_response_objects:
-            response_length = positive_response.parse_did_response_length(
-                response_remaining
+        with self.parseLock:
+            # parse each expected DID response of the response and store its part of the data
+            for positive_response in expected_response_objects:
+                response_length = positive_response.parse_did_response_length(
+                    response_remaining
+                )
+                response_remaining = response_remaining[response_length:]
+
+            # after parsing each PARAM has its data and can decode it
+            return tuple(
+                [response.decode() for response in expected_response_objects]
             )
-            response_remaining = response_remaining[response_length:]
-
-        # after parsing each PARAM has its data and can decode it
-        return_value = tuple(
-            [response.decode() for response in expected_response_objects]
-        )
 
-        if len(return_value) == 1:
-            return_value = return_value[
-                0
-            ]  # only send back a tuple if there were multiple DIDs
-        return return_value
+    ##
+    # @brief the numeric data identifier of a DID
+    def identifier(self, dictionaryEntry):
+        return int.from_bytes(bytes(self.requestDIDFunctions[dictionaryEntry]()), "big")
 
     def bind_function(self, bindObject):
         bindObject.readDataByIdentifier = MethodType(
             self.__readDataByIdentifier, bindObject
         )
+        bindObject.readDataByIdentifierBatch = MethodType(
+            self.__readDataByIdentifierBatch, bindObject
+        )
 
     ##
     # @brief method to add function to container - requestSIDFunction handles the SID component of the request message
@@ -137,6 +255,11 @@ class ReadDataByIdentifierContainer(object):
     def add_negativeResponseFunction(self, aFunction, dictionaryEntry):
         self.negativeResponseFunctions[dictionaryEntry] = aFunction
 
+    ##
+    # @brief method to record the ODX semantic of the DIAG-SERVICE of a DID, used by the DID cache policies
+    def add_semantic(self, semantic, dictionaryEntry):
+        self.semantics[dictionaryEntry] = semantic
+
 
 if __name__ == "__main__":
 
@@ -299,6 +299,9 @@ class UdsTool:
                         value, xmlElements
                     )
                     cls.rdbiContainer.add_posResponseObject(posResponse, humanName)
+                    cls.rdbiContainer.add_semantic(
+                        value.attrib.get("SEMANTIC"), humanName
+                    )
 
                     if cls.rdbiContainer not in UdsContainerAccess.containers:
                         UdsContainerAccess.containers.append(cls.rdbiContainer)
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import List
+from typing import List, Optional
 
 
 class DiagCodedType(ABC):
@@ -18,6 +18,10 @@ class DiagCodedType(ABC):
     def calculate_length(self, response: List[int]) -> int:
         """ """
 
+    @abstractmethod
+    def calculate_max_length(self) -> Optional[int]:
+        """ """
+
 
 class StandardLengthType(DiagCodedType):
     """Represents the DIAG-CODED-TYPE of a PARAM with a static length"""
@@ -39,6 +43,13 @@ class StandardLengthType(DiagCodedType):
         """
         return self.byte_length
 
+    def calculate_max_length(self) -> Optional[int]:
+        """Returns the static length of StandardLengthType (excluding DID)
+
+        :return: length in bytes as int
+        """
+        return self.byte_length
+
     def __repr__(self):
         return f"{self.__class__.__name__}: base_data_type={self.base_data_type} byte_length={self.byte_length}"
 
@@ -125,6 +136,17 @@ class MinMaxLengthType(DiagCodedType):
             # go through response till end or max length (whichever comes first)
             return min(self.max_length, len(response))
 
+    def calculate_max_length(self) -> Optional[int]:
+        """Returns the longest length of MinMaxLengthType in a response (excluding DID),
+        termination char included
+
+        :return: length in bytes as int, None if there is no maximum length or if the
+            param ends with the response (END-OF-PDU)
+        """
+        if self.max_length is None or self.termination.value == "END-OF-PDU":
+            return None
+        return self.max_length + self.get_termination_length()
+
     def __repr__(self):
         return f"{self.__class__.__name__}: base-data-type={self.base_data_type}, min={self.min_length}, \
             max={self.max_length}, termination={self.termination}"
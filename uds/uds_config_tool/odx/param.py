@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from uds.uds_config_tool import DecodeFunctions
 from uds.uds_config_tool.odx.diag_coded_types import DiagCodedType, MinMaxLengthType
@@ -37,6 +37,13 @@ class Param:
         """
         return self.diag_coded_type.calculate_length(response)
 
+    def calculate_max_length(self) -> Optional[int]:
+        """calculate the params longest byte length in a response based on its DIAG CODED TYPE
+
+        :return: the calculated byte length, None if it is not bounded
+        """
+        return self.diag_coded_type.calculate_max_length()
+
     def decode(self) -> str:
         """decode Param's internal data that is set after parsing a uds response
 
@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from uds.uds_config_tool import DecodeFunctions
 from uds.uds_config_tool.odx.param import Param
@@ -57,6 +57,20 @@ class PosResponse:
             start_position = end_position
         return end_position  # this is the total length
 
+    def calculate_max_length(self) -> Optional[int]:
+        """calculate the longest byte length of this PosResponses (DID) part of a response, as known
+        from the ODX
+
+        :return: byte length of the DID and its PARAMs, None if a PARAM's length is not bounded
+        """
+        max_length = self.did_length
+        for param in self.params:
+            param_length = param.calculate_max_length()
+            if param_length is None:
+                return None
+            max_length += param_length
+        return max_length
+
     def check_DID_in_response(self, did_response: List[int]) -> None:
         """compare PosResponse's DID with the DID at beginning of a response
 